@@ -0,0 +1,243 @@
+"""
+Album Art for Music Player Application
+Finds a song's cover (embedded in its tags via mutagen, or a cover image in
+its folder) on a background thread and stores thumbnails at fixed display
+sizes in a content-addressed cache: the file name is the hash of the source
+image, so a cover shared by every song of an album is decoded and scaled
+only once. mutagen and Pillow are optional; without Pillow only PNG and GIF
+covers can be shown (Tk reads those natively).
+"""
+
+import hashlib
+import io
+import os
+import pickle
+import queue
+import threading
+
+from instrumentation import traced
+from paths import normalize_path
+
+ARTWORK_DIR = "music_player_artwork"
+INDEX_NAME = "index"
+SMALL_SIZE = 96  # library views
+LARGE_SIZE = 160  # now playing panel
+THUMBNAIL_SIZES = (SMALL_SIZE, LARGE_SIZE)
+COVER_FILE_NAMES = ('cover', 'folder', 'front', 'album')
+COVER_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+_TK_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a")
+
+mutagen = None  # optional modules, imported on first use
+Image = None
+_optional_checked = False
+
+
+def _load_optional():
+    global mutagen, Image, _optional_checked
+    if not _optional_checked:
+        _optional_checked = True
+        try:
+            import mutagen as _mutagen
+            mutagen = _mutagen
+        except ImportError:  # only folder covers are found
+            mutagen = None
+        try:
+            from PIL import Image as _image
+            Image = _image
+        except ImportError:  # PNG/GIF covers are kept unscaled; Tk subsamples them
+            Image = None
+
+
+# ========== EXTRACTION ==========
+
+def extract_embedded_art(file_path):
+    """Return the embedded cover image bytes (front cover preferred), or None."""
+    _load_optional()
+    if mutagen is None:
+        return None
+    try:
+        audio = mutagen.File(file_path)
+    except Exception:
+        return None
+    if audio is None:
+        return None
+    tags = audio.tags
+    if tags is not None and hasattr(tags, 'getall'):
+        # ID3: APIC frames; picture type 3 is the front cover
+        frames = sorted(tags.getall('APIC'), key=lambda frame: frame.type != 3)
+        if frames:
+            return frames[0].data
+    if tags is not None and 'covr' in tags:
+        return bytes(tags['covr'][0])  # MP4
+    pictures = getattr(audio, 'pictures', None)  # FLAC
+    if pictures:
+        return pictures[0].data
+    return None
+
+
+def find_folder_art(directory):
+    """Return the bytes of a cover.jpg/folder.png/... in a directory, or None."""
+    try:
+        entries = {name.lower(): name for name in os.listdir(directory)}
+    except OSError:
+        return None
+    for base in COVER_FILE_NAMES:
+        for ext in COVER_EXTENSIONS:
+            name = entries.get(base + ext)
+            if name:
+                with open(os.path.join(directory, name), 'rb') as f:
+                    return f.read()
+    return None
+
+
+def thumbnail_path(digest, size, directory=ARTWORK_DIR):
+    return os.path.join(directory, f"{digest}-{size}.thumb")
+
+
+@traced("artwork.thumbnail")
+def make_thumbnails(image_bytes, directory=ARTWORK_DIR):
+    """
+    Store thumbnails of a cover for every THUMBNAIL_SIZES entry, unless a
+    previous song already did.
+
+    Returns:
+        Content digest naming the thumbnails, or None if the image cannot be shown
+    """
+    digest = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+    if all(os.path.exists(thumbnail_path(digest, size, directory)) for size in THUMBNAIL_SIZES):
+        return digest
+    _load_optional()
+    os.makedirs(directory, exist_ok=True)
+    if Image is None:
+        if not image_bytes.startswith(_TK_SIGNATURES):
+            return None
+        scaled = {size: image_bytes for size in THUMBNAIL_SIZES}
+    else:
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                image = image.convert('RGB')
+                scaled = {}
+                for size in sorted(THUMBNAIL_SIZES, reverse=True):
+                    image.thumbnail((size, size))  # each size is scaled from the previous one
+                    buffer = io.BytesIO()
+                    image.save(buffer, 'PNG')
+                    scaled[size] = buffer.getvalue()
+        except Exception as e:
+            print(f"Gambar sampul tidak dapat dibaca: {e}")
+            return None
+    for size, data in scaled.items():
+        path = thumbnail_path(digest, size, directory)
+        with open(path + ".tmp", 'wb') as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+    return digest
+
+
+class ArtworkWorker(threading.Thread):
+    """Background worker that resolves songs to cover thumbnails."""
+
+    def __init__(self, directory=ARTWORK_DIR):
+        super().__init__(name="ArtworkWorker", daemon=True)
+        self.directory = directory
+        self._pending = queue.Queue()
+        self._queued_paths = set()
+        self._lock = threading.Lock()
+        self.files = {}  # normalized path -> (size, mtime_ns, digest or None)
+        self.albums = {}  # (artis, album) -> digest of the first cover found for it
+        self._folder_covers = {}  # directory -> digest or None, for this session (worker thread only)
+        self._dirty = False
+        self._load_index()
+
+    def _index_path(self):
+        return os.path.join(self.directory, INDEX_NAME)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), 'rb') as f:
+                index = pickle.load(f)
+            self.files, self.albums = index['files'], index['albums']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Indeks sampul tidak dapat dibaca, dibuat ulang: {e}")
+
+    def save_index(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            index = {'files': dict(self.files), 'albums': dict(self.albums)}
+            self._dirty = False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._index_path() + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(index, f)
+            os.replace(tmp_path, self._index_path())
+        except OSError as e:
+            print(f"Error saat menyimpan indeks sampul: {e}")
+
+    def submit(self, lagu):
+        """Queue a song for (re)checking unless it is already queued."""
+        key = normalize_path(lagu.audio_path)
+        if key is None:
+            return
+        with self._lock:
+            if key in self._queued_paths:
+                return
+            self._queued_paths.add(key)
+        self._pending.put((key, lagu.artis, lagu.album))
+
+    def thumbnail(self, lagu, size):
+        """
+        Return the thumbnail file for a song, falling back to the cover of its
+        album; None while it is unknown (the song is queued) or has no cover.
+        Only in-memory lookups, so it is safe on the UI thread.
+        """
+        key = normalize_path(lagu.audio_path)
+        with self._lock:
+            entry = self.files.get(key)
+            digest = entry[2] if entry else None
+            if digest is None:
+                digest = self.albums.get((lagu.artis, lagu.album))
+        if entry is None and digest is None:
+            self.submit(lagu)
+        return thumbnail_path(digest, size, self.directory) if digest else None
+
+    def _resolve(self, key, artis, album):
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return
+        with self._lock:
+            entry = self.files.get(key)
+        if entry and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            return
+        image_bytes = extract_embedded_art(key)
+        if image_bytes:
+            digest = make_thumbnails(image_bytes, self.directory)
+        else:
+            digest = self._folder_cover(os.path.dirname(key))
+        with self._lock:
+            self.files[key] = (stat.st_size, stat.st_mtime_ns, digest)
+            if digest and album:
+                self.albums.setdefault((artis, album), digest)
+            self._dirty = True
+
+    def _folder_cover(self, directory):
+        if directory not in self._folder_covers:
+            image_bytes = find_folder_art(directory)
+            self._folder_covers[directory] = make_thumbnails(image_bytes, self.directory) if image_bytes else None
+        return self._folder_covers[directory]
+
+    def run(self):
+        while True:
+            key, artis, album = self._pending.get()
+            try:
+                self._resolve(key, artis, album)
+            except Exception as e:
+                print(f"Error saat mencari sampul {key}: {e}")
+            finally:
+                with self._lock:
+                    self._queued_paths.discard(key)
+            if self._pending.empty():
+                self.save_index()
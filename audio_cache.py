@@ -0,0 +1,100 @@
+"""
+Audio Buffer Cache for Music Player Application
+Keeps the current, predicted-next and previous audio files in memory under
+a byte budget, so replaying, going back through history or skipping ahead
+starts from RAM instead of re-reading the file from disk. Only the prefetch thread reads
+files into the cache, and files larger than the budget are never read; on a
+miss the engine streams straight from the path.
+"""
+
+import collections
+import os
+import queue
+import threading
+
+import instrumentation
+
+DEFAULT_BUDGET_BYTES = 64 * 1024 * 1024
+
+
+class AudioBufferCache:
+    """Thread-safe LRU cache of file contents bounded by a total byte size."""
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # path -> (size, mtime, data)
+        self._lock = threading.Lock()
+        self._prefetch_queue = None
+
+    def _current(self, path, stat):
+        entry = self._entries.get(path)
+        return entry if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime else None
+
+    def get(self, path):
+        """Return cached bytes for a path if still current, else None (a miss)."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        with self._lock:
+            entry = self._current(path, stat) if stat else None
+            if entry:
+                self._entries.move_to_end(path)
+                self.hits += 1
+            else:
+                self.misses += 1
+        instrumentation.count("audio_cache.hit" if entry else "audio_cache.miss")
+        return entry[2] if entry else None
+
+    def _fill(self, path):
+        """Read a file into the cache unless it is already current or over budget."""
+        stat = os.stat(path)
+        if stat.st_size > self.max_bytes:
+            return
+        with self._lock:
+            if self._current(path, stat):
+                return
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.put(path, data, stat.st_size, stat.st_mtime)
+
+    def put(self, path, data, size, mtime):
+        """Insert file contents, evicting least recently used entries over budget."""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old:
+                self.current_bytes -= len(old[2])
+            self._entries[path] = (size, mtime, data)
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted[2])
+
+    def prefetch(self, path):
+        """Load a file into the cache on a background thread."""
+        if not path:
+            return
+        if self._prefetch_queue is None:
+            self._prefetch_queue = queue.Queue()
+            threading.Thread(target=self._prefetch_worker, name="AudioPrefetch", daemon=True).start()
+        self._prefetch_queue.put(path)
+
+    def _prefetch_worker(self):
+        while True:
+            path = self._prefetch_queue.get()
+            try:
+                if os.path.isfile(path):
+                    self._fill(path)
+            except OSError as e:
+                print(f"Gagal memuat awal {path}: {e}")
+
+    def clear(self):
+        """Drop every cached buffer."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
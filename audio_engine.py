@@ -0,0 +1,354 @@
+"""
+Audio Engine for Music Player Application
+Runs pygame.mixer.music on its own thread. The GUI sends commands through a
+queue and receives state-change events back, so a slow load or decode never
+blocks the Tk event loop.
+"""
+
+import collections
+import io
+import os
+import queue
+import threading
+import time
+
+import instrumentation
+
+pygame = None  # imported when the first engine is created, off the startup path
+
+
+def _import_pygame():
+    global pygame
+    if pygame is None:
+        import pygame as pygame_module
+        pygame = pygame_module
+    return pygame
+
+# Event kinds published on AudioEngine.events
+EVENT_STARTED = 'started'  # (EVENT_STARTED, item)
+EVENT_PAUSED = 'paused'  # (EVENT_PAUSED, item)
+EVENT_RESUMED = 'resumed'  # (EVENT_RESUMED, item)
+EVENT_STOPPED = 'stopped'  # (EVENT_STOPPED, item)
+EVENT_ENDED = 'ended'  # (EVENT_ENDED, item) - track finished on its own
+EVENT_ADVANCED = 'advanced'  # (EVENT_ADVANCED, item) - engine moved on to an enqueued track
+EVENT_ERROR = 'error'  # (EVENT_ERROR, item, message)
+EVENT_DURATION = 'duration'  # (EVENT_DURATION, item, seconds)
+
+
+class PlaybackPosition:
+    """
+    Position model for the current track, anchored on the mixer clock.
+
+    pygame.mixer.music.get_pos() counts milliseconds played since the last
+    play() and freezes while paused, but knows nothing about set_pos(). The
+    model stores the track position at the last anchor (play or seek) and the
+    mixer clock at that moment, so the position stays correct across seek,
+    pause and resume.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._anchor_seconds = 0.0  # track position at the anchor
+        self._anchor_ms = 0  # get_pos() value at the anchor
+        self._active = False
+
+    def reset(self, start_seconds=0.0):
+        """Anchor after play()/play(start=...), which restarts the mixer clock."""
+        with self._lock:
+            self._anchor_seconds = float(start_seconds)
+            self._anchor_ms = 0
+            self._active = True
+
+    def rebase(self, seconds, mixer_ms):
+        """Anchor after set_pos(), which leaves the mixer clock running."""
+        with self._lock:
+            self._anchor_seconds = float(seconds)
+            self._anchor_ms = max(0, mixer_ms)
+
+    def clear(self):
+        """Forget the position once playback stops."""
+        with self._lock:
+            self._anchor_seconds = 0.0
+            self._anchor_ms = 0
+            self._active = False
+
+    def seconds(self):
+        """Current position in seconds; safe to call from any thread."""
+        with self._lock:
+            if not self._active:
+                return 0.0
+            mixer_ms = pygame.mixer.music.get_pos()
+            if mixer_ms < 0:
+                return self._anchor_seconds
+            return self._anchor_seconds + max(0, mixer_ms - self._anchor_ms) / 1000.0
+
+
+class AudioEngine(threading.Thread):
+    """Dedicated playback thread driven by a command queue."""
+
+    POLL_INTERVAL = 0.05  # seconds between end-of-track checks when idle
+    TRANSITION_WINDOW = 2.0  # a play this soon after a track end counts as a transition
+
+    def __init__(self, duration_probe=None, buffer_cache=None):
+        super().__init__(name="AudioEngine", daemon=True)
+        _import_pygame()
+        self.commands = queue.Queue()
+        self.events = queue.Queue()
+        self._duration_probe = duration_probe  # callable(path) -> seconds or None
+        self.buffer_cache = buffer_cache  # optional AudioBufferCache of file contents
+        self._upcoming = collections.deque()  # (path, item, gain_scalar) for gapless enqueue
+        self._state = 'stopped'
+        self._current_item = None
+        self._current_duration = None  # seconds, once the probe has reported it
+        self._running = True
+        self._volume = 1.0  # user volume before per-track gain
+        self._gain_scalar = 1.0  # cached loudness normalization of the current track
+        self._crossfade_seconds = 0.0
+        self._last_track_end = None  # monotonic time of the last natural track end
+        self.position = PlaybackPosition()
+
+    # ----- public, thread-safe API -----
+
+    def play(self, path, item=None, gain_scalar=1.0):
+        """Load and play a file; item is echoed back in every related event."""
+        self.commands.put(('play', path, item, gain_scalar))
+
+    def pause(self):
+        """Pause the current track."""
+        self.commands.put(('pause',))
+
+    def resume(self):
+        """Resume the paused track."""
+        self.commands.put(('resume',))
+
+    def stop(self):
+        """Stop playback and drop any enqueued tracks."""
+        self.commands.put(('stop',))
+
+    def seek(self, seconds):
+        """Jump to an absolute position in the current track."""
+        self.commands.put(('seek', seconds))
+
+    def skip(self, delta_seconds):
+        """Jump forward (positive) or backward (negative) relative to the current position."""
+        self.commands.put(('skip', delta_seconds))
+
+    def enqueue(self, path, item=None, gain_scalar=1.0):
+        """Play a file right after the current one finishes."""
+        self.commands.put(('enqueue', path, item, gain_scalar))
+
+    def set_volume(self, volume):
+        """Set the user volume (0.0 - 1.0); per-track gain is applied on top."""
+        self.commands.put(('set_volume', volume))
+
+    def set_crossfade(self, seconds):
+        """Fade tracks out and the next one in over this many seconds (0 disables)."""
+        self.commands.put(('set_crossfade', seconds))
+
+    def shutdown(self):
+        """Stop the engine thread."""
+        self.commands.put(('shutdown',))
+
+    def drain_events(self):
+        """Return every pending event without blocking (call from the Tk thread)."""
+        pending = []
+        while True:
+            try:
+                pending.append(self.events.get_nowait())
+            except queue.Empty:
+                return pending
+
+    # ----- engine thread -----
+
+    def run(self):
+        while self._running:
+            try:
+                command = self.commands.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                command = None
+            if command:
+                try:
+                    getattr(self, '_cmd_' + command[0])(*command[1:])
+                except pygame.error as e:
+                    self._publish(EVENT_ERROR, self._current_item, str(e))
+                except Exception as e:
+                    print(f"Audio engine error: {e}")
+            self._apply_fade_out()
+            self._check_track_end()
+
+    def _publish(self, *event):
+        self.events.put(event)
+
+    def _cmd_play(self, path, item, gain_scalar=1.0):
+        self._upcoming.clear()
+        self._start(path, item, EVENT_STARTED, gain_scalar)
+
+    def _start(self, path, item, event_kind, gain_scalar=1.0):
+        self._current_item = item
+        self._current_duration = None
+        self._gain_scalar = gain_scalar
+        # Fade in only when following a track that just ended (autoplay/queue)
+        is_transition = (self._last_track_end is not None
+                         and time.monotonic() - self._last_track_end < self.TRANSITION_WINDOW)
+        fade_ms = int(self._crossfade_seconds * 1000) if is_transition else 0
+        try:
+            with instrumentation.span("audio.load", path=path):
+                # Prefetched tracks play from memory; anything else streams from
+                # the path, so a miss never reads a whole file up front
+                data = self.buffer_cache.get(path) if self.buffer_cache is not None else None
+                if data is not None:
+                    pygame.mixer.music.load(io.BytesIO(data), os.path.splitext(path)[1].lstrip('.'))
+                else:
+                    pygame.mixer.music.load(path)
+                pygame.mixer.music.set_volume(self._volume * self._gain_scalar)
+                pygame.mixer.music.play(fade_ms=fade_ms)
+            self.position.reset()
+        except (pygame.error, OSError) as e:
+            self._state = 'stopped'
+            self.position.clear()
+            print(f"Pygame error saat memutar {path}: {e}")
+            self._publish(EVENT_ERROR, item, str(e))
+            return
+        self._state = 'playing'
+        self._publish(event_kind, item)
+        if self._duration_probe:
+            # Probing may decode the whole file; keep it off the command loop
+            threading.Thread(target=self._probe_duration, args=(path, item), daemon=True).start()
+
+    def _probe_duration(self, path, item):
+        try:
+            duration = self._duration_probe(path)
+            if item is self._current_item:
+                self._current_duration = duration
+            self._publish(EVENT_DURATION, item, duration)
+        except Exception as e:
+            print(f"Gagal membaca durasi {path}: {e}")
+
+    def _cmd_pause(self):
+        if self._state == 'playing':
+            pygame.mixer.music.pause()
+            self._state = 'paused'
+            self._publish(EVENT_PAUSED, self._current_item)
+
+    def _cmd_resume(self):
+        if self._state == 'paused':
+            pygame.mixer.music.unpause()
+            self._state = 'playing'
+            self._publish(EVENT_RESUMED, self._current_item)
+
+    def _cmd_stop(self):
+        self._upcoming.clear()
+        if self._state != 'stopped':
+            pygame.mixer.music.stop()
+            self._state = 'stopped'
+            self.position.clear()
+            self._publish(EVENT_STOPPED, self._current_item)
+
+    def _cmd_seek(self, seconds):
+        if self._state == 'stopped':
+            return
+        seconds = max(0.0, float(seconds))
+        if self._current_duration:
+            seconds = min(seconds, max(0.0, self._current_duration - 1))
+        try:
+            # set_pos repositions the open stream; no reload, effective on the next buffer
+            pygame.mixer.music.set_pos(seconds)
+            self.position.rebase(seconds, pygame.mixer.music.get_pos())
+        except pygame.error:
+            # Formats without set_pos support restart the stream at the offset
+            pygame.mixer.music.play(start=seconds)
+            self.position.reset(seconds)
+            if self._state == 'paused':
+                pygame.mixer.music.pause()
+        # Undo any fade-out in progress; _apply_fade_out re-applies it if still needed
+        pygame.mixer.music.set_volume(self._volume * self._gain_scalar)
+
+    def _cmd_skip(self, delta_seconds):
+        self._cmd_seek(self.position.seconds() + delta_seconds)
+
+    def _cmd_enqueue(self, path, item, gain_scalar=1.0):
+        if self._state == 'stopped':
+            self._start(path, item, EVENT_STARTED, gain_scalar)
+        else:
+            self._upcoming.append((path, item, gain_scalar))
+
+    def _cmd_set_volume(self, volume):
+        self._volume = max(0.0, min(1.0, float(volume)))
+        pygame.mixer.music.set_volume(self._volume * self._gain_scalar)
+
+    def _cmd_set_crossfade(self, seconds):
+        self._crossfade_seconds = max(0.0, float(seconds))
+
+    def _apply_fade_out(self):
+        """Ramp the volume down over the last crossfade seconds of the track."""
+        if self._state != 'playing' or not self._crossfade_seconds or not self._current_duration:
+            return
+        remaining = self._current_duration - self.position.seconds()
+        if remaining < self._crossfade_seconds:
+            factor = max(0.0, remaining / self._crossfade_seconds)
+            pygame.mixer.music.set_volume(self._volume * self._gain_scalar * factor)
+
+    def _cmd_shutdown(self):
+        self._running = False
+        if self._state != 'stopped':
+            pygame.mixer.music.stop()
+            self._state = 'stopped'
+
+    def _check_track_end(self):
+        if self._state != 'playing' or pygame.mixer.music.get_busy():
+            return
+        self._state = 'stopped'
+        self.position.clear()
+        self._last_track_end = time.monotonic()
+        if self._upcoming:
+            path, item, gain_scalar = self._upcoming.popleft()
+            self._start(path, item, EVENT_ADVANCED, gain_scalar)
+        else:
+            self._publish(EVENT_ENDED, self._current_item)
+
+
+class _SilentPosition:
+    def seconds(self):
+        return 0.0
+
+
+class NullAudioEngine:
+    """Silent stand-in for AudioEngine, for running the player headless (scripts, benchmarks)."""
+
+    buffer_cache = None
+
+    def __init__(self):
+        self.position = _SilentPosition()
+
+    def play(self, path, item=None, gain_scalar=1.0):
+        pass
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def seek(self, seconds):
+        pass
+
+    def skip(self, delta_seconds):
+        pass
+
+    def enqueue(self, path, item=None, gain_scalar=1.0):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+    def set_crossfade(self, seconds):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def drain_events(self):
+        return []
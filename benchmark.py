@@ -0,0 +1,231 @@
+"""
+Benchmark Suite for Music Player Application
+Times the data-structure hot paths (linked lists, queue, stack, persistence,
+cascading delete and recommendation) on synthetic libraries of growing size
+and writes the results as JSON, so runs from different commits can be compared.
+
+Usage:
+    python benchmark.py                              # 1k, 10k, 100k, 1M songs
+    python benchmark.py --sizes 1000,10000 -o hasil.json
+    python benchmark.py --sizes 10000 --compare hasil_lama.json
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import utils
+from models import Lagu, SinglyLinkedList, DoublyLinkedList, Queue, Stack
+from core import MusicPlayerCore
+from audio_engine import NullAudioEngine
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+REGRESSION_THRESHOLD = 1.2  # slower than this ratio counts as a regression in --compare
+
+GENRES = ("Pop", "Rock", "Jazz", "Electronic", "Ambient", "K-Pop", "Dangdut", "Hip Hop",
+          "Klasik", "Indie", "R&B", "Metal")
+
+
+def generate_library(size, artists=None, genres=None, seed=0, file_path=None):
+    """
+    Create synthetic songs with a controlled number of distinct artists and genres.
+
+    Args:
+        size: Number of songs
+        artists: Distinct artists (default: one per 20 songs)
+        genres: Distinct genres (default: 12)
+        seed: Random seed, so every run measures the same library
+        file_path: Path stored on every song (None = songs without a file)
+
+    Returns:
+        List of Lagu objects with ids S0000000, S0000001, ...
+    """
+    rng = random.Random(seed)
+    artists = artists or max(1, size // 20)
+    genres = genres or len(GENRES)
+    artist_names = [f"Artis {i}" for i in range(artists)]
+    genre_names = [GENRES[i] if i < len(GENRES) else f"Genre {i}" for i in range(genres)]
+    songs = []
+    for i in range(size):
+        artis = rng.choice(artist_names)
+        songs.append(Lagu(f"S{i:07d}", f"Lagu {i}", artis, f"Album {artis} {rng.randint(1, 5)}",
+                          rng.choice(genre_names), rng.randint(1970, 2025), file_path,
+                          rng.randint(90, 420)))
+    return songs
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the player's progress prints inside timed sections."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _measure(fn, ops):
+    """Run fn once with the garbage collector paused and return a result entry."""
+    gc.collect()
+    gc.disable()
+    try:
+        with _quiet():
+            start = time.perf_counter()
+            fn()
+            seconds = time.perf_counter() - start
+    finally:
+        gc.enable()
+    return {'seconds': round(seconds, 6), 'ops': ops,
+            'per_op_us': round(seconds / ops * 1e6, 3) if ops else None}
+
+
+def run_size(size, lookups, artists=None, genres=None, seed=0):
+    """Run every benchmark on one library size and return {name: result}."""
+    rng = random.Random(seed + 1)
+    placeholder = os.path.abspath("synthetic.mp3")
+    with open(placeholder, 'wb'):
+        pass  # play_file only needs the path to exist; the null engine never reads it
+    songs = generate_library(size, artists, genres, seed, placeholder)
+    results = {}
+
+    library = SinglyLinkedList()
+    results['library_append'] = _measure(lambda: [library.append(l) for l in songs], size)
+
+    playlist = DoublyLinkedList()
+    results['playlist_append'] = _measure(lambda: [playlist.append(l) for l in songs], size)
+    nodes = [playlist.find_node_by_lagu_id(l.id) for l in rng.sample(songs, min(size, lookups))]
+    results['playlist_remove_node'] = _measure(lambda: [playlist.remove_node(n) for n in nodes], len(nodes))
+
+    queue = Queue()
+    results['queue_enqueue_dequeue'] = _measure(
+        lambda: ([queue.enqueue(l) for l in songs], [queue.dequeue() for _ in range(size)]), 2 * size)
+    stack = Stack()
+    results['stack_push_pop'] = _measure(
+        lambda: ([stack.push(l) for l in songs], [stack.pop() for _ in range(size)]), 2 * size)
+
+    ids = [songs[rng.randrange(size)].id for _ in range(lookups)]
+    results['find_by_id'] = _measure(lambda: [library.find_by_id(i) for i in ids], lookups)
+    artis = [songs[rng.randrange(size)].artis for _ in range(max(1, lookups // 10))]
+    results['find_by_criteria'] = _measure(lambda: [library.find_by_criteria(artis=a) for a in artis], len(artis))
+
+    # Persistence goes through the real save_data/load_data (cwd is a temp dir)
+    playlists = {f"Playlist {i}": DoublyLinkedList() for i in range(10)}
+    for name, pl in playlists.items():
+        for lagu in rng.sample(songs, min(size, max(1, size // 100))):
+            pl.append(lagu)
+    results['save_data'] = _measure(lambda: utils.save_data(library, playlists), size)
+    results['save_data']['bytes'] = os.path.getsize(utils.DATA_FILE)
+    loaded = {}
+    results['load_data'] = _measure(lambda: loaded.update(utils.load_data()), size)
+    del loaded
+
+    # Recommendation and cascading delete run through the headless core
+    core = MusicPlayerCore(library, playlists, engine=NullAudioEngine())
+    results['library_table_build'] = _measure(core.get_library_table, size)
+    with _quiet():
+        core.play_song(songs[0])
+    results['next_similar'] = _measure(lambda: [core.next_similar() for _ in range(lookups)], lookups)
+    for lagu in rng.sample(songs, min(size, lookups)):
+        core.enqueue(lagu.id)
+    victims = [l.id for l in rng.sample(songs, min(size, max(1, lookups // 10)))]
+    results['cascading_delete'] = _measure(lambda: [core.delete_song(i) for i in victims], len(victims))
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(sizes, lookups=50, artists=None, genres=None, seed=0):
+    """Run the benchmarks for every size inside a scratch directory."""
+    report = {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'lookups': lookups,
+        'seed': seed,
+        'results': {},
+    }
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="musicplayer-bench-") as scratch:
+        os.chdir(scratch)  # data, stats log and placeholder audio stay out of the repo
+        try:
+            for size in sizes:
+                print(f"Benchmark {size} lagu...", file=sys.stderr)
+                report['results'][str(size)] = run_size(size, lookups, artists, genres, seed)
+        finally:
+            os.chdir(cwd)
+    return report
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare two reports and return rows (size, name, old_s, new_s, ratio, regressed).
+    """
+    rows = []
+    for size, benches in new['results'].items():
+        for name, result in benches.items():
+            before = old.get('results', {}).get(size, {}).get(name)
+            if not before or not before['seconds']:
+                continue
+            ratio = result['seconds'] / before['seconds']
+            rows.append((size, name, before['seconds'], result['seconds'], ratio, ratio > threshold))
+    return rows
+
+
+def print_report(report):
+    for size, benches in report['results'].items():
+        print(f"\n{size} lagu")
+        for name, result in benches.items():
+            per_op = f"{result['per_op_us']:>12.3f} us/op" if result['per_op_us'] is not None else ""
+            print(f"  {name:<24}{result['seconds']:>12.6f} s{per_op}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark struktur data music player")
+    parser.add_argument('--sizes', default=",".join(map(str, DEFAULT_SIZES)),
+                        help="ukuran library, dipisah koma (default: %(default)s)")
+    parser.add_argument('--lookups', type=int, default=50, help="jumlah pencarian/rekomendasi per ukuran")
+    parser.add_argument('--artists', type=int, default=None, help="jumlah artis berbeda (default: ukuran/20)")
+    parser.add_argument('--genres', type=int, default=None, help="jumlah genre berbeda (default: 12)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="tulis hasil JSON ke file ini")
+    parser.add_argument('--compare', help="hasil JSON sebelumnya untuk dibandingkan")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="rasio waktu yang dianggap regresi (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    report = run_suite(sizes, args.lookups, args.artists, args.genres, args.seed)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nHasil disimpan ke {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        rows = compare(old, report, args.threshold)
+        print(f"\nPerbandingan dengan {old.get('commit') or args.compare}")
+        for size, name, before, after, ratio, regressed in rows:
+            flag = "  REGRESI" if regressed else ""
+            print(f"  {size:>8} {name:<24}{before:>12.6f} -> {after:>12.6f} s  x{ratio:.2f}{flag}")
+        if any(row[5] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
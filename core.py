@@ -0,0 +1,990 @@
+"""
+Headless Core for Music Player Application
+MusicPlayerCore owns the library, playlists, queue, history and playback
+state and implements every operation on them without touching Tk, so the
+player can be scripted, tested and profiled with no display. The GUI is a
+thin client that turns user input into core calls and results into widgets.
+"""
+
+import os
+import random
+import time
+
+from models import SinglyLinkedList, DoublyLinkedList, SmartPlaylist, Queue, Stack
+from oplog import CHECKPOINT_OPS, SONG_STEPS, Operation, OperationLog, song_state, playlist_state
+from utils import (save_data, play_file, stop_file, pause_file, resume_file, seek_file, skip_file,
+                   get_position, set_crossfade)
+from stats import PlayStats, save_stats
+from profiles import DEFAULT_PROFILE, PROFILE_SETTINGS, load_profile, save_profile, rewrite_song_ids
+from library_table import LibraryTable
+from paths import portable_path, resolve_path
+from instrumentation import traced
+from state import StateStore, writes
+from audio_engine import EVENT_STARTED, EVENT_ENDED, EVENT_ADVANCED, EVENT_ERROR, EVENT_DURATION
+
+
+class PlayerError(Exception):
+    """An operation could not be carried out; the message is shown to the user."""
+
+
+def _print_error(title, message):
+    print(f"{title}: {message}")
+
+
+class MusicPlayerCore:
+    """Library, playlist, queue and playback logic, independent of any UI."""
+
+    AUTOPLAY_COOLDOWN = 2  # seconds between autoplay triggers
+
+    def __init__(self, library=None, playlists=None, stats=None, engine=None, loudness_analyzer=None,
+                 waveform_worker=None, oplog=None, availability_monitor=None, fulltext_indexer=None,
+                 on_error=None):
+        """
+        Args:
+            library: SinglyLinkedList of songs (empty if None)
+            playlists: Dictionary of playlist names to DoublyLinkedList/SmartPlaylist
+            stats: PlayStats object (a fresh one if None)
+            engine: Audio engine to use; None uses the shared AudioEngine,
+                pass an audio_engine.NullAudioEngine to run without sound
+            loudness_analyzer: Optional LoudnessAnalyzer fed with new or changed songs
+            waveform_worker: Optional WaveformWorker fed with imported and played songs
+            oplog: OperationLog recording every library and playlist change;
+                None keeps undo/redo in memory without a journal
+            availability_monitor: Optional AvailabilityMonitor whose cache
+                tells playback which song files are missing
+            fulltext_indexer: Optional FullTextIndexer kept current with the
+                library; enables search(criteria='teks')
+            on_error: Optional callable(title, message) told when saving
+                fails; None only prints, so no display is needed
+
+        Mutating methods run as writes of self.state (one writer at a
+        time); other threads read through snapshot().
+        """
+        self.state = StateStore(self)
+        self.library = library if library is not None else SinglyLinkedList()
+        self.playlists = playlists if playlists is not None else {}
+        self.play_stats = stats if stats is not None else PlayStats()
+        self.play_stats.add_listener(self._on_song_played)
+        self.loudness_analyzer = loudness_analyzer
+        self.waveform_worker = waveform_worker
+        self.oplog = oplog if oplog is not None else OperationLog(path=None)
+        self.availability_monitor = availability_monitor
+        self.fulltext_indexer = fulltext_indexer
+        self.on_error = on_error or _print_error
+
+        self.playback_state = {
+            'current_playing': None,
+            'current_file_path': None,
+            'is_playing': False,
+            '_previous_playing': None,
+            'history': Stack(),
+            'autoplay_enabled': True,  # Autoplay enabled by default
+            'stats': self.play_stats,
+            'normalize_loudness': True,  # Apply each song's cached gain
+            'crossfade_seconds': 0,
+            'engine': engine,
+        }
+        self.playback_queue = Queue()
+        self.current_playlist = None
+        self.current_playlist_node = None
+        self.is_playlist_mode = False  # Track if playing from playlist
+        self._library_table = None  # Columnar view, rebuilt lazily after mutations
+        self._song_index = None  # (library version, {id: Lagu}) for resolving profile IDs
+        self._last_autoplay_time = None
+        # Playlists stored with the library; the active profile's replace them in self.playlists
+        self.shared_playlists = self.playlists
+        self.profile = None
+
+    def snapshot(self):
+        """Immutable view of the library, playlists, queue and playback state (state.Snapshot); any thread."""
+        return self.state.snapshot()
+
+    @writes
+    def install_data(self, loaded_data, stats=None):
+        """Replace library/playlists (and optionally stats) with freshly loaded data."""
+        self.library = loaded_data.get('library', SinglyLinkedList())
+        self.playlists = self.shared_playlists = loaded_data.get('playlists', {})
+        self._library_table = None
+        self._song_index = None
+        self.oplog.clear_history()
+        replayed = self.oplog.replay(self)
+        if replayed:
+            print(f"{replayed} catatan jurnal diterapkan ulang")
+        if stats is not None:
+            self.play_stats = stats
+            self.play_stats.add_listener(self._on_song_played)
+            self.playback_state['stats'] = stats
+        if hasattr(self.library, 'add_load_listener'):
+            # Shards reach the workers as they are loaded, so startup loads none
+            self.library.add_load_listener(self._watch_songs)
+            self._watch_songs(self.library.loaded_lagu())
+        else:
+            self._watch_songs(self.library.get_all_lagu())
+
+    def _watch_songs(self, songs):
+        """Hand loaded songs to the background workers that track every song."""
+        if self.loudness_analyzer:
+            self.loudness_analyzer.submit_many(songs)
+        if self.availability_monitor:
+            self.availability_monitor.submit_many(songs)
+        if self.fulltext_indexer:
+            self.fulltext_indexer.submit_many(songs)
+
+    def save(self):
+        """
+        Write a full snapshot: the library and shared playlists, plus the
+        active profile or the global statistics. The journal it supersedes
+        is truncated.
+        """
+        saved = save_data(self.library, self.shared_playlists, on_error=self.on_error)
+        if self.profile is not None:
+            self.save_profile()
+        else:
+            save_stats(self.play_stats)
+        if saved:
+            self.oplog.checkpoint()
+
+    def commit(self):
+        """
+        Make recorded changes durable after an edit. They already are, as
+        journal records; a full snapshot is only written once the journal
+        holds CHECKPOINT_OPS records.
+        """
+        if self.oplog.path is None or self.oplog.records >= CHECKPOINT_OPS:
+            self.save()
+
+    def _record(self, label, steps):
+        self.oplog.record(Operation(label, steps, self.profile.name if self.profile is not None else None))
+
+    @writes
+    def undo(self):
+        """Revert the last library or playlist change; returns its label."""
+        operation = self.oplog.undo(self)
+        if operation is None:
+            raise PlayerError("Tidak ada perubahan yang bisa dibatalkan.")
+        self._reindex(operation.steps)
+        return operation.label
+
+    @writes
+    def redo(self):
+        """Re-apply the last undone change; returns its label."""
+        operation = self.oplog.redo(self)
+        if operation is None:
+            raise PlayerError("Tidak ada perubahan yang bisa diulang.")
+        self._reindex(operation.steps)
+        return operation.label
+
+    def _reindex(self, steps):
+        """Bring the full-text index in line with songs that undo/redo touched."""
+        if not self.fulltext_indexer:
+            return
+        for id_lagu in {step[1][0] if step[0] != 'song_update' else step[1]
+                        for step in steps if step[0] in SONG_STEPS}:
+            lagu = self.resolve_song(id_lagu)
+            if lagu is not None:
+                self.fulltext_indexer.submit(lagu)
+            else:
+                self.fulltext_indexer.remove(id_lagu)
+
+    # ========== PROFILES ==========
+
+    def resolve_song(self, id_lagu):
+        """Map a song ID to the shared library's Lagu object (None if deleted)."""
+        if self._song_index is None or self._song_index[0] != self.library.version:
+            self._song_index = (self.library.version, {l.id: l for l in self.library.get_all_lagu()})
+        lagu = self._song_index[1].get(id_lagu)
+        if lagu is None and hasattr(self.library, 'shard_of'):
+            # Songs in inactive shards are outside the merged view
+            lagu = self.library.find_by_id(id_lagu)
+        return lagu
+
+    @writes
+    def switch_profile(self, name):
+        """
+        Make `name` the active profile, saving the current one first.
+
+        Only the profile's own files are read; the library is shared and
+        stays in memory. A new "default" profile takes over the playlists
+        and statistics that existed before profiles were introduced.
+        """
+        name = name.strip()
+        if not name:
+            raise PlayerError("Nama profil tidak boleh kosong.")
+        if self.profile is not None:
+            if self.profile.name == name:
+                return self.profile
+            self.save_profile()
+        self.stop()
+
+        profile = load_profile(name, self.resolve_song)
+        if name == DEFAULT_PROFILE and not profile.exists() and not profile.playlists:
+            profile.playlists = self.shared_playlists
+            if self.play_stats.total_plays and not profile.stats.total_plays:
+                self.play_stats.log_path, self.play_stats.log_offset = profile.log_path, 0
+                profile.stats = self.play_stats
+
+        self.profile = profile
+        self.playlists = profile.playlists
+        self.playback_queue = profile.queue
+        self.playback_state['history'] = profile.history
+        self.playback_state['_previous_playing'] = None
+        for key in PROFILE_SETTINGS:
+            if key in profile.settings:
+                self.playback_state[key] = profile.settings[key]
+        if 'crossfade_seconds' in profile.settings:
+            set_crossfade(self.playback_state, profile.settings['crossfade_seconds'] or 0)
+        self.play_stats = profile.stats
+        self.play_stats.add_listener(self._on_song_played)
+        self.playback_state['stats'] = self.play_stats
+        # Undo entries refer to the previous profile's playlists
+        self.oplog.clear_history()
+        self.oplog.replay_profile(self, name)
+        return profile
+
+    def save_profile(self):
+        """Write the active profile's playlists, queue, history, settings and statistics."""
+        profile = self.profile
+        if profile is None:
+            return
+        profile.playlists = self.playlists
+        profile.queue = self.playback_queue
+        profile.history = self.playback_state['history']
+        profile.settings = {key: self.playback_state.get(key) for key in PROFILE_SETTINGS}
+        profile.stats = self.play_stats
+        save_profile(profile)
+
+    @property
+    def current_playing(self):
+        return self.playback_state['current_playing']
+
+    # ========== LIBRARY ==========
+
+    def get_library_table(self):
+        """Return the columnar library table, rebuilding it only after library mutations."""
+        if self._library_table is None or self._library_table.version != self.library.version:
+            self._library_table = LibraryTable.from_library(self.library)
+        return self._library_table
+
+    @writes
+    def add_song(self, lagu, check_file=True):
+        """
+        Add a new song to the library; raises PlayerError on duplicate ID or
+        missing file. A path inside a library root is stored root-relative.
+        """
+        if self.library.find_by_id(lagu.id):
+            raise PlayerError(f"ID lagu '{lagu.id}' sudah ada di library.")
+        lagu.file_path = portable_path(lagu.file_path)
+        if check_file and not os.path.isfile(lagu.audio_path or ""):
+            raise PlayerError(f"File audio '{lagu.file_path}' tidak ditemukan.")
+        self.library.append(lagu)
+        self._sync_smart_playlists(lagu)
+        self._record(f"Tambah lagu '{lagu.judul}'", [('song_insert', song_state(lagu), None)])
+        if self.loudness_analyzer:
+            self.loudness_analyzer.submit(lagu)
+        if self.waveform_worker:
+            self.waveform_worker.submit(lagu)
+        if self.availability_monitor:
+            self.availability_monitor.submit(lagu, force=True)
+        if self.fulltext_indexer:
+            self.fulltext_indexer.submit(lagu)
+        return lagu
+
+    @writes
+    def add_songs(self, songs):
+        """
+        Append a batch of songs whose IDs the caller has already checked
+        for uniqueness (e.g. against an import index); no per-song lookups.
+        """
+        for lagu in songs:
+            self.library.append(lagu)
+            self._sync_smart_playlists(lagu)
+        self._record(f"Impor {len(songs)} lagu", [('song_insert', song_state(lagu), None) for lagu in songs])
+        if self.loudness_analyzer:
+            self.loudness_analyzer.submit_many(songs)
+        if self.waveform_worker:
+            self.waveform_worker.submit_many(songs)
+        if self.availability_monitor:
+            self.availability_monitor.submit_many(songs)
+        if self.fulltext_indexer:
+            self.fulltext_indexer.submit_many(songs)
+
+    @writes
+    def edit_song(self, id_lagu, check_file=True, **fields):
+        """Update a song's metadata everywhere it appears and return it."""
+        lagu = self.library.find_by_id(id_lagu)
+        if not lagu:
+            raise PlayerError(f"Lagu dengan ID '{id_lagu}' tidak ditemukan.")
+        if 'file_path' in fields:
+            fields['file_path'] = portable_path(fields['file_path'])
+        file_baru = fields.get('file_path', lagu.file_path)
+        if check_file and not os.path.isfile(resolve_path(file_baru) or ""):
+            raise PlayerError(f"File audio '{file_baru}' tidak ditemukan.")
+        before = {key: getattr(lagu, key) for key in fields}
+        if file_baru != lagu.file_path:
+            # A different file needs its own loudness measurement
+            before['gain'] = lagu.gain
+            lagu.gain = None
+        lagu.update(**fields)
+        self.state.touch(lagu)
+        self._record(f"Ubah lagu '{lagu.judul}'",
+                     [('song_update', id_lagu, before, {key: getattr(lagu, key) for key in before})])
+        self.library.mark_changed(lagu)
+        # Update in all playlists
+        for playlist in self.playlists.values():
+            node = playlist.find_node_by_lagu_id(id_lagu)
+            if node:
+                node.data.update(**fields)
+                playlist.mark_changed()
+        self._sync_smart_playlists(lagu)
+        if self.loudness_analyzer:
+            self.loudness_analyzer.submit(lagu)
+        if self.waveform_worker:
+            self.waveform_worker.submit(lagu)
+        if self.availability_monitor:
+            self.availability_monitor.submit(lagu, force=True)
+        if self.fulltext_indexer:
+            self.fulltext_indexer.submit(lagu)
+        return lagu
+
+    @writes
+    def relocate_songs(self, moves):
+        """
+        Point songs at new file locations in one batch (e.g. the moves of a
+        paths.RelocationPlan), undoable as a single operation.
+
+        Args:
+            moves: Dictionary of song ID to new stored path
+
+        Returns:
+            Number of songs updated
+        """
+        songs = {lagu.id: lagu for lagu in self.library} if moves else {}
+        steps = []
+        relocated = []
+        for id_lagu, path in moves.items():
+            lagu = songs.get(id_lagu) or self.library.find_by_id(id_lagu)
+            if lagu is None or lagu.file_path == path:
+                continue
+            steps.append(('song_update', id_lagu, {'file_path': lagu.file_path}, {'file_path': path}))
+            lagu.file_path = path  # the same file, so its gain stays valid
+            self.state.touch(lagu)
+            self.library.mark_changed(lagu)
+            relocated.append(lagu)
+        if not steps:
+            return 0
+        for playlist in self.playlists.values():
+            playlist.mark_changed()
+        self._record(f"Relokasi {len(steps)} file lagu", steps)
+        if self.availability_monitor:
+            self.availability_monitor.submit_many(relocated, force=True)
+        if self.waveform_worker:
+            self.waveform_worker.submit_many(relocated)
+        if self.fulltext_indexer:
+            self.fulltext_indexer.submit_many(relocated)
+        return len(steps)
+
+    @writes
+    def delete_song(self, id_lagu):
+        """
+        Remove a song from the library, every playlist (the active
+        profile's and those stored with the library) and the queue.
+
+        Returns:
+            Tuple (removed Lagu, number of playlists it was removed from,
+            whether playback of it was stopped)
+        """
+        index = self.library.index_of(id_lagu)
+        lagu_dihapus = self.library.remove_by_id(id_lagu)
+        if not lagu_dihapus:
+            raise PlayerError(f"Lagu dengan ID '{id_lagu}' tidak ditemukan.")
+        steps = []
+
+        # Remove from all playlists
+        playlists = [(name, playlist, True) for name, playlist in self.playlists.items()]
+        if self.shared_playlists is not self.playlists:
+            playlists.extend((name, playlist, False) for name, playlist in self.shared_playlists.items())
+        removed_from = 0
+        for name, playlist, active in playlists:
+            node = playlist.find_node_by_lagu_id(id_lagu)
+            if node:
+                position = None if isinstance(playlist, SmartPlaylist) else playlist.position_of(id_lagu)
+                playlist.remove_node(node)
+                steps.append(('playlist_remove' if active else 'shared_playlist_remove', name, id_lagu, position))
+                removed_from += 1
+
+        # Remove from queue, back to front so each recorded position stays valid
+        items = self.playback_queue.items
+        for position in reversed([i for i, lagu in enumerate(items) if lagu.id == id_lagu]):
+            del items[position]
+            steps.append(('queue_remove', id_lagu, position))
+
+        steps.append(('song_remove', song_state(lagu_dihapus), index))
+        self._record(f"Hapus lagu '{lagu_dihapus.judul}'", steps)
+        if self.fulltext_indexer:
+            self.fulltext_indexer.remove(id_lagu)
+
+        # Stop playback if currently playing
+        stopped = False
+        if self.current_playing and self.current_playing.id == id_lagu:
+            self.stop()
+            stopped = True
+        return lagu_dihapus, removed_from, stopped
+
+    @writes
+    def merge_songs(self, keep_id, duplicate_ids):
+        """
+        Merge duplicate songs into the one that is kept: playlist, queue and
+        history references (in memory and in every saved profile) are pointed
+        at the keeper, then the duplicates leave the library. Undo restores
+        the duplicates, the active and shared playlists and the queue; other
+        profiles keep pointing at the keeper.
+
+        Returns:
+            Tuple (number of songs removed, number of playlist entries rewritten)
+        """
+        keeper = self.library.find_by_id(keep_id)
+        if not keeper:
+            raise PlayerError(f"Lagu dengan ID '{keep_id}' tidak ditemukan.")
+        duplicates = {id_lagu for id_lagu in duplicate_ids if id_lagu != keep_id}
+
+        playlists = [(name, playlist, True) for name, playlist in self.playlists.items()]
+        if self.shared_playlists is not self.playlists:
+            playlists.extend((name, playlist, False) for name, playlist in self.shared_playlists.items())
+        steps = []
+        rewritten = 0
+        for name, playlist, active in playlists:
+            has_keeper = playlist.find_node_by_lagu_id(keep_id) is not None
+            smart = isinstance(playlist, SmartPlaylist)
+            remove_kind, insert_kind = (('playlist_remove', 'playlist_insert') if active
+                                        else ('shared_playlist_remove', 'shared_playlist_insert'))
+            node = playlist.head
+            position = 0
+            while node:
+                following = node.next
+                if node.data.id in duplicates:
+                    steps.append((remove_kind, name, node.data.id, None if smart else position))
+                    if has_keeper or smart:
+                        # Smart playlists pick the keeper up through their rules below
+                        playlist.remove_node(node)
+                        position -= 1
+                    else:
+                        node.data = keeper
+                        playlist.mark_changed()
+                        has_keeper = True
+                        steps.append((insert_kind, name, keep_id, position))
+                    rewritten += 1
+                node = following
+                position += 1
+        self._sync_smart_playlists(keeper)
+
+        for position, lagu in enumerate(self.playback_queue.items):
+            if lagu.id in duplicates:
+                steps.append(('queue_remove', lagu.id, position))
+                steps.append(('queue_insert', keep_id, position))
+        for container in (self.playback_queue, self.playback_state['history']):
+            container.items = type(container.items)(
+                keeper if lagu.id in duplicates else lagu for lagu in container.items)
+        if self.current_playing and self.current_playing.id in duplicates:
+            self.stop()
+
+        removed = 0
+        for id_lagu in sorted(duplicates):
+            index = self.library.index_of(id_lagu)
+            lagu = self.library.remove_by_id(id_lagu)
+            if lagu:
+                steps.append(('song_remove', song_state(lagu), index))
+                removed += 1
+                if self.fulltext_indexer:
+                    self.fulltext_indexer.remove(id_lagu)
+        self._record(f"Gabungkan {removed} duplikat ke '{keeper.judul}'", steps)
+        rewrite_song_ids({id_lagu: keep_id for id_lagu in duplicates},
+                         skip=self.profile.name if self.profile is not None else None)
+        return removed, rewritten
+
+    def is_playable(self, lagu):
+        """
+        Whether a song can be played: it has a file path and its file was
+        not found missing. A file the monitor has not checked yet counts as
+        playable (it is queued for a check). O(1); never touches the disk.
+        """
+        if not lagu or not lagu.file_path or not str(lagu.file_path).strip():
+            return False
+        if self.availability_monitor is None:
+            return True
+        available = self.availability_monitor.available(lagu.audio_path)
+        if available is None:
+            self.availability_monitor.submit(lagu)
+        return available is not False
+
+    def song_references(self):
+        """Yield (description, songs) for every playlist, the queue and the history."""
+        for name, playlist in self.playlists.items():
+            yield f"playlist '{name}'", playlist
+        if self.shared_playlists is not self.playlists:
+            for name, playlist in self.shared_playlists.items():
+                yield f"playlist bersama '{name}'", playlist
+        yield "antrian", self.playback_queue.items
+        yield "riwayat", self.playback_state['history'].items
+
+    @writes
+    def repair_references(self):
+        """
+        Point playlist, queue and history entries at the library's own song
+        objects and drop entries whose song is no longer in the library.
+
+        Returns:
+            Tuple (entries re-pointed, entries removed)
+        """
+        repointed = removed = 0
+        playlists = list(self.playlists.values())
+        if self.shared_playlists is not self.playlists:
+            playlists.extend(self.shared_playlists.values())
+        for playlist in playlists:
+            node = playlist.head
+            while node:
+                following = node.next
+                lagu = self.resolve_song(node.data.id)
+                if lagu is None:
+                    if self.current_playlist_node is node:
+                        self.current_playlist_node = None
+                    playlist.remove_node(node)
+                    removed += 1
+                elif lagu is not node.data:
+                    node.data = lagu
+                    playlist.mark_changed()
+                    repointed += 1
+                node = following
+        for container in (self.playback_queue, self.playback_state['history']):
+            kept = []
+            for lagu in container.items:
+                library_lagu = self.resolve_song(lagu.id)
+                if library_lagu is None:
+                    removed += 1
+                    continue
+                if library_lagu is not lagu:
+                    repointed += 1
+                kept.append(library_lagu)
+            container.items = type(container.items)(kept)
+        return repointed, removed
+
+    @traced("search.query")
+    def search(self, criteria, value):
+        """
+        Search the library.
+
+        Args:
+            criteria: 'id', 'judul', 'artis', 'genre', 'tahun' (value 'YYYY' or
+                'YYYY-YYYY') or 'teks' (words in the title, artist, album,
+                lyrics, composer or comments; best match first)
+            value: Search value as typed by the user
+
+        Returns:
+            List of matching Lagu objects
+        """
+        if criteria == 'teks':
+            if not self.fulltext_indexer:
+                raise PlayerError("Pencarian lirik & tag tidak tersedia.")
+            # IDs of songs deleted since they were indexed resolve to None
+            songs = (self.resolve_song(id_lagu) for id_lagu in self.fulltext_indexer.search(value))
+            return [lagu for lagu in songs if lagu is not None]
+        if criteria in ('artis', 'genre', 'tahun'):
+            # Column filters run on the columnar table instead of walking the list
+            table = self.get_library_table()
+            if criteria == 'tahun':
+                try:
+                    bounds = [int(part) for part in value.split('-', 1)]
+                except ValueError:
+                    raise PlayerError("Tahun harus berupa angka atau rentang, mis. 2020-2024.")
+                return table.songs(table.filter(tahun_min=bounds[0], tahun_max=bounds[-1]))
+            return table.songs(table.filter(**{criteria: value}))
+        return self.library.find_by_criteria(**{criteria: value})
+
+    @traced("search.similar")
+    def find_similar(self, current):
+        """Return playable songs similar to current: same artist first, then same genre."""
+        table = self.get_library_table()
+        # The column masks replace a scan over every song; missing files are skipped
+        similar_lagu = [l for l in table.songs(table.filter(artis=current.artis, has_file=True))
+                        if l.id != current.id and self.is_playable(l)]
+        if not similar_lagu:
+            similar_lagu = [l for l in table.songs(table.filter(genre=current.genre, has_file=True))
+                            if l.id != current.id and self.is_playable(l)]
+        return similar_lagu
+
+    @writes
+    def set_active_shards(self, names):
+        """Limit a sharded library's merged view to the given shards (None = all)."""
+        if not hasattr(self.library, 'set_active'):
+            raise PlayerError("Library tidak menggunakan shard.")
+        if names is not None and not names:
+            raise PlayerError("Pilih minimal satu shard.")
+        # Newly active shards reach the workers through the load listener
+        self.library.set_active(names)
+
+    # ========== PLAYLISTS ==========
+
+    @writes
+    def create_playlist(self, name):
+        """Create an empty manual playlist."""
+        if name in self.playlists:
+            raise PlayerError(f"Playlist dengan nama '{name}' sudah ada.")
+        self.playlists[name] = DoublyLinkedList()
+        self._record(f"Buat playlist '{name}'", [('playlist_create', name, ['manual', []])])
+        return self.playlists[name]
+
+    @writes
+    def create_smart_playlist(self, name, rules_text):
+        """Create a rule-based playlist, evaluating its rules over the library once."""
+        if name in self.playlists:
+            raise PlayerError(f"Playlist dengan nama '{name}' sudah ada.")
+        try:
+            rules = SmartPlaylist.parse_rules(rules_text)
+        except ValueError as e:
+            raise PlayerError(f"Aturan tidak valid.\n{e}")
+        smart = SmartPlaylist(rules)
+        # Full evaluation happens only once; afterwards updates are per song
+        smart.rebuild(self.library.get_all_lagu(), self.play_stats.get_play_count)
+        self.playlists[name] = smart
+        self._record(f"Buat smart playlist '{name}'", [('playlist_create', name, playlist_state(smart))])
+        return smart
+
+    @writes
+    def delete_playlist(self, name):
+        """Delete a playlist; returns True if it was playing and playback was stopped."""
+        playlist = self.playlists.get(name)
+        stopped = False
+        # If the deleted playlist is currently playing, stop playback and reset state
+        if playlist is not None and self.current_playlist is playlist:
+            self.stop()
+            stopped = True
+        if self.playlists.pop(name, None) is not None:
+            self._record(f"Hapus playlist '{name}'", [('playlist_drop', name, playlist_state(playlist))])
+        return stopped
+
+    @writes
+    def add_to_playlist(self, name, id_lagu):
+        """Append a library song to a manual playlist."""
+        playlist = self.playlists[name]
+        lagu = self.library.find_by_id(id_lagu)
+        if not lagu:
+            raise PlayerError(f"Lagu dengan ID '{id_lagu}' tidak ditemukan.")
+        if playlist.find_node_by_lagu_id(lagu.id):
+            raise PlayerError(f"Lagu '{lagu.judul}' sudah ada di playlist ini.")
+        self._record(f"Tambah '{lagu.judul}' ke '{name}'", [('playlist_insert', name, lagu.id, playlist.size)])
+        playlist.append(lagu)
+        return lagu
+
+    @writes
+    def extend_playlist(self, name, songs):
+        """Append library songs the caller has checked are not in the manual playlist yet."""
+        playlist = self.playlists[name]
+        steps = []
+        for lagu in songs:
+            steps.append(('playlist_insert', name, lagu.id, playlist.size))
+            playlist.append(lagu)
+        self._record(f"Tambah {len(steps)} lagu ke '{name}'", steps)
+
+    @writes
+    def remove_from_playlist(self, name, id_lagu):
+        """Remove a song from a playlist and return it (None if absent)."""
+        playlist = self.playlists[name]
+        node = playlist.find_node_by_lagu_id(id_lagu)
+        if not node:
+            return None
+        position = None if isinstance(playlist, SmartPlaylist) else playlist.position_of(id_lagu)
+        playlist.remove_node(node)
+        self._record(f"Hapus '{node.data.judul}' dari '{name}'", [('playlist_remove', name, id_lagu, position)])
+        return node.data
+
+    def _sync_smart_playlists(self, lagu):
+        """Re-evaluate every smart playlist for a single added or edited song."""
+        for playlist in self.playlists.values():
+            if isinstance(playlist, SmartPlaylist):
+                playlist.update_song(lagu, self.play_stats.get_play_count(lagu.id))
+
+    def _on_song_played(self, lagu):
+        """Keep play-count based smart playlists current after each play."""
+        for playlist in self.playlists.values():
+            if isinstance(playlist, SmartPlaylist) and playlist.uses_play_count():
+                playlist.update_song(lagu, self.play_stats.get_play_count(lagu.id))
+
+    # ========== QUEUE AND PLAYBACK ==========
+
+    @writes
+    def enqueue(self, id_lagu):
+        """Add a library song to the playback queue and return it."""
+        lagu = self.library.find_by_id(id_lagu)
+        if not lagu:
+            raise PlayerError(f"Lagu dengan ID '{id_lagu}' tidak ditemukan.")
+        self.playback_queue.enqueue(lagu)
+        return lagu
+
+    @writes
+    def play_song(self, lagu):
+        """Play a single song outside of any playlist."""
+        self.is_playlist_mode = False
+        return play_file(lagu, self.playback_state)
+
+    @writes
+    def play_playlist(self, name):
+        """Start playing a playlist from its first song and return that song."""
+        playlist = self.playlists[name]
+        if playlist.size == 0:
+            raise PlayerError("Playlist kosong. Tidak ada lagu untuk diputar.")
+        self.current_playlist = playlist
+        self.current_playlist_node = playlist.head
+        self.is_playlist_mode = True
+        first_lagu = self.current_playlist_node.data
+        play_file(first_lagu, self.playback_state)
+        return first_lagu
+
+    @writes
+    def stop(self):
+        """Stop playback and leave playlist mode."""
+        stop_file(self.playback_state)
+        self.playback_state['current_playing'] = None
+        self.playback_state['current_file_path'] = None
+        self.playback_state['is_playing'] = False
+        self.current_playlist = None
+        self.current_playlist_node = None
+        self.is_playlist_mode = False
+
+    @writes
+    def pause(self):
+        pause_file(self.playback_state)
+
+    @writes
+    def resume(self):
+        resume_file(self.playback_state)
+
+    @writes
+    def seek(self, seconds):
+        seek_file(self.playback_state, seconds)
+
+    @writes
+    def skip(self, delta_seconds):
+        skip_file(self.playback_state, delta_seconds)
+
+    def position(self):
+        """Seconds played of the current song (0 when nothing plays)."""
+        return get_position(self.playback_state)
+
+    @writes
+    def set_crossfade(self, seconds):
+        set_crossfade(self.playback_state, seconds)
+
+    @writes
+    def toggle_autoplay(self):
+        """Flip autoplay and return the new setting."""
+        self.playback_state['autoplay_enabled'] = not self.playback_state.get('autoplay_enabled', True)
+        return self.playback_state['autoplay_enabled']
+
+    @writes
+    def toggle_normalize(self):
+        """Flip loudness normalization and return the new setting."""
+        self.playback_state['normalize_loudness'] = not self.playback_state.get('normalize_loudness', True)
+        return self.playback_state['normalize_loudness']
+
+    @writes
+    def next_similar(self):
+        """
+        Play the next similar song based on artist or genre.
+
+        Returns:
+            Tuple (played Lagu, True if it is a random fallback)
+        """
+        current = self.current_playing
+        if not current:
+            raise PlayerError("Tidak ada lagu yang sedang diputar.")
+
+        table = self.get_library_table()
+        # Only songs with valid file paths can be played
+        if table.count_with_file() <= 1:
+            self.playback_state['is_playing'] = False
+            raise PlayerError("Tidak cukup lagu dengan file audio untuk mencari lagu berikutnya.")
+
+        similar_lagu = self.find_similar(current)
+        if similar_lagu:
+            # Autoplay: langsung memutar lagu mirip tanpa notifikasi
+            play_file(similar_lagu[0], self.playback_state)
+            return similar_lagu[0], False
+        candidates = [l for l in table.rows if l.id != current.id and self.is_playable(l)]
+        if not candidates:
+            self.playback_state['is_playing'] = False
+            raise PlayerError("Tidak ada lagu lain dengan file audio yang tersedia.")
+        fallback_lagu = random.choice(candidates)
+        play_file(fallback_lagu, self.playback_state)
+        return fallback_lagu, True
+
+    def _playable_neighbour(self, node, direction):
+        """The nearest node after `node` (direction 'next' or 'prev') whose file is available."""
+        node = getattr(node, direction) if node else None
+        while node and not self.is_playable(node.data):
+            node = getattr(node, direction)
+        return node
+
+    @writes
+    def next_in_playlist(self):
+        """Play the next song in the current playlist, skipping missing files."""
+        node = self._playable_neighbour(self.current_playlist_node, 'next') if self.current_playlist else None
+        if not node:
+            raise PlayerError("Tidak ada lagu berikutnya dalam playlist.")
+        self.current_playlist_node = node
+        play_file(self.current_playlist_node.data, self.playback_state)
+        return self.current_playlist_node.data
+
+    @writes
+    def prev_in_playlist(self):
+        """Play the previous song in the current playlist, skipping missing files."""
+        node = self._playable_neighbour(self.current_playlist_node, 'prev') if self.current_playlist else None
+        if not node:
+            raise PlayerError("Tidak ada lagu sebelumnya dalam playlist.")
+        self.current_playlist_node = node
+        play_file(self.current_playlist_node.data, self.playback_state)
+        return self.current_playlist_node.data
+
+    @writes
+    def prev_from_history(self):
+        """Play the previous song from playback history."""
+        lagu_sebelumnya = self.playback_state['history'].pop()
+        if not lagu_sebelumnya:
+            raise PlayerError("Tidak ada lagu sebelumnya dalam riwayat.")
+        play_file(lagu_sebelumnya, self.playback_state)
+        self.playback_state['_previous_playing'] = lagu_sebelumnya
+        return lagu_sebelumnya
+
+    def _skip_unplayable_queued(self):
+        """Drop songs with missing files from the front of the queue."""
+        while not self.playback_queue.is_empty() and not self.is_playable(self.playback_queue.peek()):
+            lagu = self.playback_queue.dequeue()
+            print(f"Lagu '{lagu.judul}' dilewati: file audio tidak tersedia")
+
+    @writes
+    def next_in_queue(self):
+        """Play the next song from the playback queue, skipping missing files."""
+        if self.playback_queue.is_empty():
+            raise PlayerError("Antrian pemutaran kosong.")
+        self._skip_unplayable_queued()
+        if self.playback_queue.is_empty():
+            raise PlayerError("Tidak ada lagu di antrian yang file audionya tersedia.")
+        lagu_berikutnya = self.playback_queue.dequeue()
+        play_file(lagu_berikutnya, self.playback_state)
+        return lagu_berikutnya
+
+    @traced("playback.autoplay")
+    @writes
+    def handle_song_end(self):
+        """
+        Handle autoplay when a song ends.
+
+        Returns:
+            Tuple (played Lagu, True if it is a random fallback) or None if
+            nothing was started
+        """
+        # Cooldown check: prevent rapid autoplay triggers
+        current_time = time.time()
+        if self._last_autoplay_time is not None and current_time - self._last_autoplay_time < self.AUTOPLAY_COOLDOWN:
+            print("Autoplay cooldown active, skipping trigger")
+            return None
+        self._last_autoplay_time = current_time
+        print("Song ended, autoplay triggered")
+
+        # Priority 1: Play from queue if available
+        self._skip_unplayable_queued()
+        if not self.playback_queue.is_empty():
+            return self.next_in_queue(), False
+
+        # Priority 2: Play next in playlist if in playlist mode
+        if self.is_playlist_mode and self._playable_neighbour(self.current_playlist_node, 'next'):
+            return self.next_in_playlist(), False
+
+        # Priority 3: Play similar song (only if not in playlist mode)
+        if not self.is_playlist_mode:
+            # Need at least 2 songs with a file (current + next)
+            if self.get_library_table().count_with_file() > 1:
+                return self.next_similar()
+            print("No valid songs for autoplay, stopping")
+            self.playback_state['is_playing'] = False
+        return None
+
+    def predict_next(self):
+        """Return the song autoplay would most likely pick next (same priority order)."""
+        queued = next((lagu for lagu in self.playback_queue.items if self.is_playable(lagu)), None)
+        if queued:
+            return queued
+        if self.is_playlist_mode:
+            node = self._playable_neighbour(self.current_playlist_node, 'next')
+            if node:
+                return node.data
+        current = self.current_playing
+        candidates = self.find_similar(current) if current else []
+        return candidates[0] if candidates else None
+
+    def prefetch_neighbours(self, engine):
+        """Warm the engine's buffer cache with the current, the previous and the likely next song."""
+        cache = engine.buffer_cache
+        if cache is None:
+            return
+        current = self.current_playing
+        if current:
+            # A miss streams from disk; cached now, replaying it is served from memory
+            cache.prefetch(current.audio_path)
+        previous = self.playback_state['history'].peek()
+        if previous:
+            cache.prefetch(previous.audio_path)
+        upcoming = self.predict_next()
+        if upcoming:
+            cache.prefetch(upcoming.audio_path)
+
+    @writes
+    def handle_audio_event(self, event, engine):
+        """
+        Apply one audio engine event to the playback state.
+
+        Returns:
+            For a finished track, the result of handle_song_end(); for a load
+            error, the error message; otherwise None
+        """
+        kind, lagu = event[0], event[1]
+        current = self.current_playing
+        result = None
+        if kind == EVENT_ENDED:
+            if lagu is current and current:
+                # The track played to its end; close its play even if nothing follows
+                self.play_stats.record_stop()
+                # Simple autoplay
+                if self.playback_state.get('autoplay_enabled'):
+                    result = self.handle_song_end()
+        elif kind == EVENT_ERROR:
+            if lagu is current:
+                self.playback_state['is_playing'] = False
+                # play_file counted the play when it was queued; the file never played
+                if lagu is not None and self.play_stats.discard_play(lagu):
+                    self._on_song_played(lagu)
+            path = lagu.audio_path if lagu else None
+            result = f"Tidak dapat memutar file {path}.\nError: {event[2]}"
+        elif kind == EVENT_DURATION:
+            if lagu is current and event[2]:
+                self.playback_state['duration_seconds'] = event[2]
+                self.play_stats.set_duration(lagu, event[2])
+        elif kind == EVENT_ADVANCED:
+            self.playback_state['current_playing'] = lagu
+            self.playback_state['current_file_path'] = lagu.audio_path if lagu else None
+        if kind in (EVENT_STARTED, EVENT_ADVANCED):
+            self.prefetch_neighbours(engine)
+            if self.waveform_worker and lagu:
+                # Cached after the first play; a no-op for songs already extracted
+                self.waveform_worker.submit(lagu)
+        return result
+
+    @writes
+    def apply_loudness_results(self):
+        """Store finished loudness measurements with the song metadata."""
+        if not self.loudness_analyzer:
+            return
+        for lagu, file_path, gain in self.loudness_analyzer.drain_results():
+            if lagu.audio_path == file_path:
+                lagu.gain = gain
+                self.state.touch(lagu)
+                # A sharded library only rewrites shards marked changed
+                self.library.mark_changed(lagu)
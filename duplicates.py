@@ -0,0 +1,341 @@
+"""
+Duplicate Detection for Music Player Application
+Finds songs that point at the same audio under different IDs or paths.
+Candidates are grouped through indexes, never by comparing every pair:
+songs are bucketed by file path, then by the length of the audio payload
+(ID3 tags excluded), and only files sharing a length are hashed in chunks
+by a worker pool. An optional acoustic fingerprint, bucketed with
+locality-sensitive bands, also catches re-encodes of the same recording.
+Hashes and fingerprints are cached by (path, size, mtime).
+"""
+
+import hashlib
+import operator
+import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import traced
+from paths import normalize_path
+
+HASH_CACHE_FILE = "music_player_hashes"
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+
+FINGERPRINT_FRAMES_PER_SECOND = 4
+FINGERPRINT_BITS = 64
+FINGERPRINT_BANDS = 4  # 16-bit bands; two prints share a bucket if any band is equal
+FINGERPRINT_MAX_DISTANCE = 6  # differing bits still counted as the same recording
+DURATION_TOLERANCE = 2  # seconds
+
+REASON_PATH = "file sama"
+REASON_CONTENT = "isi identik"
+REASON_ACOUSTIC = "mirip secara akustik"
+
+
+# ========== FILE ANALYSIS ==========
+
+def audio_payload_span(path, size):
+    """
+    Return (start, end) of the audio data, skipping an ID3v2 header and an
+    ID3v1 trailer, so retagged copies of a file hash the same.
+    """
+    start, end = 0, size
+    with open(path, 'rb') as f:
+        header = f.read(10)
+        if len(header) == 10 and header[:3] == b"ID3":
+            # Tag size is a 28-bit "syncsafe" integer, excluding the header
+            tag_size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+            start = min(size, 10 + tag_size + (10 if header[5] & 0x10 else 0))
+        if size - start >= 128:
+            f.seek(size - 128)
+            if f.read(3) == b"TAG":
+                end = size - 128
+    return start, end
+
+
+def hash_file(path, start=0, end=None):
+    """Hash a byte range of a file in CHUNK_SIZE reads (hashlib releases the GIL)."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = (end - start) if end is not None else None
+        while remaining is None or remaining > 0:
+            chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+@traced("duplicates.fingerprint")
+def acoustic_fingerprint(path):
+    """
+    Compute a FINGERPRINT_BITS-bit print from the rise and fall of loudness
+    over the first seconds of a track; re-encodes keep that shape.
+
+    Returns:
+        int, or None if the file cannot be decoded or is too short
+    """
+    from loudness import decode_samples
+
+    decoded = decode_samples(path)
+    if decoded is None:
+        return None
+    samples, offset, _, (frequency, _, channels) = decoded
+    frame_length = frequency * channels // FINGERPRINT_FRAMES_PER_SECOND
+    if len(samples) < frame_length * (FINGERPRINT_BITS + 1):
+        return None
+    energies = []
+    for i in range(FINGERPRINT_BITS + 1):
+        # Every sample counts: striding aliases differently at other mixer rates
+        frame = samples[i * frame_length:(i + 1) * frame_length]
+        if offset:
+            frame = [s - offset for s in frame]
+        energies.append(sum(map(operator.mul, frame, frame)))
+    fingerprint = 0
+    for i in range(FINGERPRINT_BITS):
+        fingerprint = (fingerprint << 1) | (energies[i + 1] > energies[i])
+    return fingerprint
+
+
+class HashCache:
+    """Content hashes and fingerprints per file, valid while size and mtime match."""
+
+    def __init__(self, path=HASH_CACHE_FILE):
+        self.path = path
+        self.entries = {}  # normalized path -> {'size', 'mtime', 'span', 'digest', 'fingerprint'}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                self.entries = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Cache hash tidak dapat dibaca, dibuat ulang: {e}")
+        return self
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            print(f"Error saat menyimpan cache hash: {e}")
+
+    def entry(self, key, stat):
+        """Return the cached entry for a file, starting a fresh one if it changed."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+                entry = {'size': stat.st_size, 'mtime': stat.st_mtime_ns,
+                         'span': None, 'digest': None, 'fingerprint': None}
+                self.entries[key] = entry
+                self._dirty = True
+            return entry
+
+    def update(self, entry, field, value):
+        with self._lock:
+            entry[field] = value
+            self._dirty = True
+
+
+# ========== GROUPING ==========
+
+class DuplicateGroup:
+    """Songs found to be the same track, and why."""
+
+    def __init__(self, songs, reasons):
+        self.songs = songs
+        self.reasons = reasons
+
+    def suggested_keeper(self):
+        """The song to keep by default: the most complete metadata, then the lowest ID."""
+        def completeness(lagu):
+            filled = sum(1 for value in (lagu.artis, lagu.album, lagu.genre)
+                         if value and value != "Tidak diketahui")
+            return (-(filled + bool(lagu.tahun)), lagu.id)
+        return min(self.songs, key=completeness)
+
+    def __str__(self):
+        return f"{len(self.songs)} lagu ({', '.join(sorted(self.reasons))})"
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+def _bucket(pairs):
+    """Group items by key, keeping only keys shared by more than one item."""
+    buckets = {}
+    for key, item in pairs:
+        buckets.setdefault(key, []).append(item)
+    return [items for items in buckets.values() if len(items) > 1]
+
+
+@traced("duplicates.scan")
+def find_duplicates(songs, cache=None, workers=DEFAULT_WORKERS, acoustic=False, progress=None):
+    """
+    Find groups of duplicate songs.
+
+    Args:
+        songs: Iterable of Lagu (e.g. the library)
+        cache: HashCache (default: loaded from HASH_CACHE_FILE and saved after the scan)
+        workers: Size of the hashing thread pool
+        acoustic: Also compare acoustic fingerprints (slower, needs the mixer)
+        progress: Optional callable(message) for status updates
+
+    Returns:
+        list of DuplicateGroup, largest first
+    """
+    own_cache = cache is None
+    if own_cache:
+        cache = HashCache().load()
+    report = progress or (lambda message: None)
+
+    by_id = {}
+    files = {}  # normalized path -> (stat, cache entry)
+    path_keys = {}  # song id -> normalized path
+    for lagu in songs:
+        by_id[lagu.id] = lagu
+        key = normalize_path(lagu.audio_path)
+        if key is None:
+            continue
+        path_keys[lagu.id] = key
+        if key not in files:
+            try:
+                stat = os.stat(key)
+            except OSError:
+                continue
+            files[key] = (stat, cache.entry(key, stat))
+
+    groups = _UnionFind()
+    reasons = {}
+
+    def link(ids, reason):
+        for other in ids[1:]:
+            groups.union(ids[0], other)
+        for id_lagu in ids:
+            reasons.setdefault(id_lagu, set()).add(reason)
+
+    # 1. The same file added under several IDs
+    songs_by_path = _bucket((key, id_lagu) for id_lagu, key in path_keys.items())
+    for ids in songs_by_path:
+        link(ids, REASON_PATH)
+    # One representative song per file for the content stages
+    owner = {}
+    for id_lagu, key in path_keys.items():
+        owner.setdefault(key, id_lagu)
+
+    def measure(key):
+        stat, entry = files[key]
+        if entry['span'] is None:
+            cache.update(entry, 'span', audio_payload_span(key, stat.st_size))
+        return key
+
+    def digest(key):
+        entry = files[key][1]
+        if entry['digest'] is None:
+            start, end = entry['span']
+            cache.update(entry, 'digest', hash_file(key, start, end))
+        return key
+
+    def fingerprint(key):
+        entry = files[key][1]
+        if entry['fingerprint'] is None:
+            value = acoustic_fingerprint(key)
+            if value is not None:
+                cache.update(entry, 'fingerprint', value)
+        return key
+
+    def run(task, keys, label):
+        done = 0
+        for key in pool.map(_guarded(task), keys):
+            done += 1
+            if done % 200 == 0:
+                report(f"{label}: {done}/{len(keys)} file")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # 2. Equal payload length -> hash just those files
+        report(f"Membaca {len(files)} file...")
+        run(measure, list(files), "Membaca")
+        length_groups = _bucket(((files[key][1]['span'][1] - files[key][1]['span'][0]), key)
+                                for key in files if files[key][1]['span'])
+        to_hash = [key for keys in length_groups for key in keys]
+        report(f"Menghitung hash {len(to_hash)} file...")
+        run(digest, to_hash, "Hash")
+        for keys in _bucket((files[key][1]['digest'], key) for key in to_hash if files[key][1]['digest']):
+            link([owner[key] for key in keys], REASON_CONTENT)
+
+        # 3. Similar fingerprints via LSH bands -> verify only bucket mates
+        if acoustic:
+            report(f"Menghitung sidik jari akustik {len(files)} file...")
+            run(fingerprint, list(files), "Sidik jari")
+            prints = {key: files[key][1]['fingerprint'] for key in files
+                      if files[key][1]['fingerprint'] is not None}
+            band_bits = FINGERPRINT_BITS // FINGERPRINT_BANDS
+            mask = (1 << band_bits) - 1
+            bands = _bucket(((band, (value >> (band * band_bits)) & mask), key)
+                            for key, value in prints.items() for band in range(FINGERPRINT_BANDS))
+            checked = set()
+            for keys in bands:
+                for i, a in enumerate(keys):
+                    for b in keys[i + 1:]:
+                        if (a, b) in checked:
+                            continue
+                        checked.add((a, b))
+                        if _same_recording(by_id[owner[a]], by_id[owner[b]], prints[a], prints[b]):
+                            link([owner[a], owner[b]], REASON_ACOUSTIC)
+
+    if own_cache:
+        cache.save()
+
+    members = {}
+    for id_lagu in reasons:
+        members.setdefault(groups.find(id_lagu), []).append(id_lagu)
+    result = []
+    for ids in members.values():
+        if len(ids) > 1:
+            group_reasons = set().union(*(reasons[id_lagu] for id_lagu in ids))
+            result.append(DuplicateGroup([by_id[id_lagu] for id_lagu in sorted(ids)], group_reasons))
+    result.sort(key=lambda group: len(group.songs), reverse=True)
+    report(f"{len(result)} grup duplikat ditemukan.")
+    return result
+
+
+def _guarded(task):
+    def wrapper(key):
+        try:
+            return task(key)
+        except OSError as e:
+            print(f"File {key} dilewati: {e}")
+            return None
+    return wrapper
+
+
+def _same_recording(a, b, print_a, print_b):
+    if a.durasi and b.durasi and abs(a.durasi - b.durasi) > DURATION_TOLERANCE:
+        return False
+    return bin(print_a ^ print_b).count("1") <= FINGERPRINT_MAX_DISTANCE
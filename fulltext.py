@@ -0,0 +1,213 @@
+"""
+Full-Text Search for Music Player Application
+Keeps an on-disk inverted index (SQLite FTS5) of each song's title, artist
+and album plus the lyrics, composer and comments embedded in its tags, and
+answers queries ranked by BM25. Only the matching song IDs are read back,
+so no song text is held in memory. Songs are (re)indexed incrementally by a
+background worker; tags are only read again when a file's size or mtime
+changes, and a song whose file and metadata are both unchanged is not
+written at all, so submitting the whole library at startup costs one
+lookup per song. mutagen is optional: without it only the metadata is
+indexed.
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+
+from instrumentation import traced
+
+INDEX_FILE = "music_player_fulltext.sqlite"
+BATCH_SIZE = 200  # songs written per transaction
+DEFAULT_LIMIT = 200
+# BM25 weight per indexed column: judul, artis, album, komposer, komentar, lirik
+COLUMN_WEIGHTS = (4.0, 3.0, 2.0, 1.5, 0.5, 1.0)
+TEXT_COLUMNS = ('komposer', 'komentar', 'lirik')
+
+mutagen = None  # optional module, imported on first use
+_mutagen_checked = False
+
+
+def _load_mutagen():
+    global mutagen, _mutagen_checked
+    if not _mutagen_checked:
+        _mutagen_checked = True
+        try:
+            import mutagen as _mutagen
+            mutagen = _mutagen
+        except ImportError:  # only title, artist and album are searchable
+            mutagen = None
+    return mutagen
+
+
+def is_available():
+    """Whether this Python's SQLite has the FTS5 extension."""
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _tag_text(tags, keys):
+    values = []
+    for key in keys:
+        try:
+            found = tags.getall(key) if hasattr(tags, 'getall') else tags.get(key)
+        except (KeyError, ValueError):
+            continue
+        for value in found or ():
+            text = getattr(value, 'text', value)  # ID3 frames carry .text
+            if isinstance(text, (list, tuple)):
+                values.extend(str(item) for item in text)
+            else:
+                values.append(str(text))
+    return "\n".join(values)
+
+
+def extract_text_tags(file_path):
+    """
+    Read lyrics, composer and comments from a file's tags.
+
+    Returns:
+        Tuple (komposer, komentar, lirik); empty strings when absent
+    """
+    if _load_mutagen() is None or not file_path:
+        return "", "", ""
+    try:
+        audio = mutagen.File(file_path)
+    except Exception:
+        return "", "", ""
+    tags = getattr(audio, 'tags', None)
+    if tags is None:
+        return "", "", ""
+    # ID3 frame names, Vorbis comments and MP4 atoms
+    return (_tag_text(tags, ('TCOM', 'COMPOSER', 'composer', '\xa9wrt')),
+            _tag_text(tags, ('COMM', 'COMMENT', 'comment', '\xa9cmt')),
+            _tag_text(tags, ('USLT', 'LYRICS', 'UNSYNCEDLYRICS', 'lyrics', '\xa9lyr')))
+
+
+def build_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class FullTextIndexer(threading.Thread):
+    """Background worker maintaining the full-text index; search() runs on the caller's thread."""
+
+    def __init__(self, path=INDEX_FILE):
+        super().__init__(name="FullTextIndexer", daemon=True)
+        self.path = path
+        self._pending = queue.Queue()
+        self._reader = None
+        self._reader_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS files (
+                doc INTEGER PRIMARY KEY, song_id TEXT UNIQUE NOT NULL,
+                path TEXT, size INTEGER, mtime_ns INTEGER, meta TEXT)""")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(files)")]
+            if 'meta' not in columns:  # indexes created before metadata was kept
+                conn.execute("ALTER TABLE files ADD COLUMN meta TEXT")
+            conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+                judul, artis, album, komposer, komentar, lirik,
+                tokenize = 'unicode61 remove_diacritics 2')""")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")  # searches keep reading while the worker writes
+        return conn
+
+    def submit(self, lagu):
+        """Queue a song for (re)indexing; its metadata is copied now, on the caller's thread."""
+        self._pending.put(('index', lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.audio_path))
+
+    def submit_many(self, songs):
+        for lagu in songs:
+            self.submit(lagu)
+
+    def remove(self, id_lagu):
+        self._pending.put(('remove', id_lagu))
+
+    @traced("search.fulltext")
+    def search(self, text, limit=DEFAULT_LIMIT):
+        """
+        Rank songs matching every word of `text` by BM25.
+
+        Returns:
+            List of song IDs, best match first
+        """
+        query = build_query(text)
+        if query is None:
+            return []
+        weights = ", ".join(str(w) for w in COLUMN_WEIGHTS)
+        with self._reader_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            rows = self._reader.execute(
+                f"""SELECT files.song_id FROM docs JOIN files ON files.doc = docs.rowid
+                    WHERE docs MATCH ? ORDER BY bm25(docs, {weights}) LIMIT ?""",
+                (query, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def _index(self, conn, id_lagu, judul, artis, album, file_path):
+        try:
+            stat = os.stat(file_path) if file_path else None
+        except OSError:
+            stat = None
+        size, mtime = (stat.st_size, stat.st_mtime_ns) if stat else (None, None)
+        judul, artis, album = judul or "", artis or "", str(album or "")
+        meta = "\x1f".join((judul, artis, album))
+        row = conn.execute("SELECT doc, path, size, mtime_ns, meta FROM files WHERE song_id = ?",
+                           (id_lagu,)).fetchone()
+        if row and row[1:4] == (file_path, size, mtime) and row[4] == meta:
+            return  # nothing changed since it was indexed
+        if row and row[1:4] == (file_path, size, mtime):
+            # Same file: keep the text already extracted, refresh only the metadata
+            text = conn.execute(f"SELECT {', '.join(TEXT_COLUMNS)} FROM docs WHERE rowid = ?", (row[0],)).fetchone()
+        else:
+            text = None
+        if text is None:
+            text = extract_text_tags(file_path) if stat else ("", "", "")
+        if row:
+            doc = row[0]
+            conn.execute("UPDATE files SET path = ?, size = ?, mtime_ns = ?, meta = ? WHERE doc = ?",
+                         (file_path, size, mtime, meta, doc))
+            conn.execute("DELETE FROM docs WHERE rowid = ?", (doc,))
+        else:
+            doc = conn.execute("INSERT INTO files (song_id, path, size, mtime_ns, meta) VALUES (?, ?, ?, ?, ?)",
+                               (id_lagu, file_path, size, mtime, meta)).lastrowid
+        conn.execute("INSERT INTO docs (rowid, judul, artis, album, komposer, komentar, lirik) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (doc, judul, artis, album, *text))
+
+    def _remove(self, conn, id_lagu):
+        row = conn.execute("SELECT doc FROM files WHERE song_id = ?", (id_lagu,)).fetchone()
+        if row:
+            conn.execute("DELETE FROM docs WHERE rowid = ?", row)
+            conn.execute("DELETE FROM files WHERE doc = ?", row)
+
+    def run(self):
+        conn = self._connect()
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:  # one transaction per batch
+                    for item in batch:
+                        if item[0] == 'index':
+                            self._index(conn, *item[1:])
+                        else:
+                            self._remove(conn, item[1])
+            except sqlite3.Error as e:
+                print(f"Error saat memperbarui indeks teks: {e}")
@@ -1,58 +1,181 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import random
+from tkinter import ttk, messagebox, simpledialog, filedialog
+import collections
+import os
+import queue
+import threading
+import time
+
+from models import SmartPlaylist, Lagu
+from utils import load_data, load_dummy_data, get_audio_engine, init_audio
+from audio_engine import EVENT_ADVANCED, EVENT_ERROR
+from loudness import LoudnessAnalyzer
+from stats import load_stats
+from sorting import SortKeyCache
+from core import MusicPlayerCore, PlayerError
+from profiles import DEFAULT_PROFILE, list_profiles
+from import_export import export_songs, iter_import
+from duplicates import HashCache, find_duplicates
+from waveform import WaveformWorker
+from artwork import ArtworkWorker, SMALL_SIZE, LARGE_SIZE
+from remote import RemoteServer, PLAYBACK_COMMANDS
+from oplog import OperationLog
+from integrity import AvailabilityMonitor, check_integrity
+from paths import get_roots, set_roots, plan_relocation
+import fulltext
+import instrumentation
+
+PLAYLIST_FILETYPES = [("Playlist M3U", "*.m3u *.m3u8"), ("CSV", "*.csv"), ("JSON Lines", "*.jsonl *.ndjson")]
+
+
+class ThumbnailImages:
+    """LRU of Tk PhotoImages for cover thumbnails; each file is loaded once."""
+
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self._images = collections.OrderedDict()  # (thumbnail path, size) -> PhotoImage
+
+    def get(self, path, size):
+        if not path:
+            return None
+        key = (path, size)
+        photo = self._images.get(key)
+        if photo is not None:
+            self._images.move_to_end(key)
+            return photo
+        try:
+            photo = tk.PhotoImage(file=path)
+        except tk.TclError:
+            return None
+        # Thumbnails are pre-scaled; unscaled PNG/GIF covers (no Pillow) are subsampled here
+        factor = -(-max(photo.width(), photo.height()) // size)
+        if factor > 1:
+            photo = photo.subsample(factor)
+        self._images[key] = photo
+        while len(self._images) > self.capacity:
+            self._images.popitem(last=False)
+        return photo
+
+
+class WaveformSeekBar(tk.Canvas):
+    """Seek bar drawn from cached peak data; click or drag to seek."""
+
+    PLAYED_COLOR = "#1e88e5"
+    REMAINING_COLOR = "#b0bec5"
+
+    def __init__(self, master, on_seek, width=400, height=48):
+        super().__init__(master, width=width, height=height, bg="white", highlightthickness=0, cursor="hand2")
+        self.on_seek = on_seek
+        self.bar_width = width
+        self.bar_height = height
+        self.file_path = None
+        self.peaks = None
+        self.duration = None
+        self.dragging = False
+        self._bars = []
+        self._played = 0  # number of bars currently drawn in PLAYED_COLOR
+        self._cursor = self.create_line(0, 0, 0, height, fill="#e53935")
+        self.bind("<ButtonPress-1>", self._press)
+        self.bind("<B1-Motion>", self._drag)
+        self.bind("<ButtonRelease-1>", self._release)
+
+    def set_track(self, file_path, peaks):
+        """Draw the waveform of a track (a flat line while its peaks are not ready)."""
+        self.file_path = file_path
+        self.peaks = peaks
+        for item in self._bars:
+            self.delete(item)
+        self._bars = []
+        self._played = 0
+        middle = self.bar_height / 2
+        for x in range(self.bar_width):
+            if peaks:
+                level = peaks[x * len(peaks) // self.bar_width] / 255
+                half = max(0.5, level * (middle - 1))
+            else:
+                half = 0.5
+            self._bars.append(self.create_line(x, middle - half, x, middle + half, fill=self.REMAINING_COLOR))
+        self.tag_raise(self._cursor)
+
+    def set_position(self, seconds, duration):
+        """Move the cursor, recolouring only the bars that changed side."""
+        self.duration = duration
+        if self.dragging or not duration:
+            return
+        self._show_fraction(seconds / duration)
+
+    def _show_fraction(self, fraction):
+        played = int(max(0.0, min(1.0, fraction)) * len(self._bars))
+        low, high = sorted((played, self._played))
+        color = self.PLAYED_COLOR if played > self._played else self.REMAINING_COLOR
+        for item in self._bars[low:high]:
+            self.itemconfig(item, fill=color)
+        self._played = played
+        x = played * self.bar_width / max(1, len(self._bars))
+        self.coords(self._cursor, x, 0, x, self.bar_height)
+
+    def _press(self, event):
+        self.dragging = True
+        self._drag(event)
 
-from models import SinglyLinkedList, DoublyLinkedList, Queue, Stack, Lagu
-from utils import save_data, load_data, load_dummy_data, play_file, stop_file, pause_file, resume_file
+    def _drag(self, event):
+        self._show_fraction(event.x / self.bar_width)
+
+    def _release(self, event):
+        self.dragging = False
+        if self.duration:
+            self.on_seek(max(0.0, min(1.0, event.x / self.bar_width)) * self.duration)
 
 
 class MusicPlayerGUI:
     """Main GUI application for the music player."""
     
-    def __init__(self, root):
+    def __init__(self, root, started_at=None):
         self.root = root
         self.root.title("Music Player")
         self.root.geometry("900x700")
         # Setup styles and fonts for better appearance
         self.setup_styles()
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+
+        # Application data starts empty; the library, statistics and the audio
+        # mixer are loaded in the background after the login screen is painted
+        self.app_ready = False
+
+        # Per-view sort key caches for the Treeviews, keyed by view name
+        self._sort_caches = {}
+
+        # All library, playlist and playback logic lives in the core; the
+        # loudness analyzer measures songs that have no gain yet, in the background
+        self.loudness_analyzer = LoudnessAnalyzer()
+        self.loudness_analyzer.start()
+        # Waveform peaks for the seek bar are extracted and cached in the background too
+        self.waveform_worker = WaveformWorker()
+        self.waveform_worker.start()
+        # Cover thumbnails: found and scaled in the background, PhotoImages cached here
+        self.artwork_worker = ArtworkWorker()
+        self.artwork_worker.start()
+        self.thumbnail_images = ThumbnailImages()
+        # Song files are checked for availability in batches, so autoplay can skip missing ones
+        self.availability_monitor = AvailabilityMonitor()
+        self.availability_monitor.start()
+        # Lyrics and tags go into an on-disk full-text index (needs SQLite with FTS5)
+        self.fulltext_indexer = fulltext.FullTextIndexer() if fulltext.is_available() else None
+        if self.fulltext_indexer:
+            self.fulltext_indexer.start()
+        # Optional LAN remote control; commands are pumped from check_music_events
+        try:
+            self.remote = RemoteServer.from_environment()
+        except ValueError as e:
+            print(f"MUSICPLAYER_REMOTE tidak valid: {e}")
+            self.remote = None
+        # Every library and playlist edit is journaled; the same records drive undo/redo
+        self.core = MusicPlayerCore(loudness_analyzer=self.loudness_analyzer, waveform_worker=self.waveform_worker,
+                                    oplog=OperationLog(), availability_monitor=self.availability_monitor,
+                                    fulltext_indexer=self.fulltext_indexer, on_error=messagebox.showerror)
 
-        # Initialize application data
-        loaded_data = load_data()
-        if loaded_data:
-            self.library = loaded_data.get('library', SinglyLinkedList())
-            self.playlists = loaded_data.get('playlists', {})
-        else:
-            # If no data file found, initialize with dummy data
-            self.library = SinglyLinkedList()
-            self.playlists = {}
-            load_dummy_data(self.library, self.playlists)
-            # Save dummy data for the first time
-            save_data(self.library, self.playlists)
-
-        # Playback state management
-        # Start event loop
-        self.check_music_events()
-
-        self.playback_state = {
-            'current_playing': None,
-            'current_file_path': None,
-            'is_playing': False,
-            '_previous_playing': None,
-            'history': Stack(),
-            'autoplay_enabled': True  # Autoplay enabled by default
-        }
-        
-        self.playback_queue = Queue()
-        self.playback_history = Stack()
-        self.current_playlist = None
-        self.current_playlist_node = None
         self.current_user_role = None
         self.now_playing_label = None  # Reference to the now playing label
-        self.is_playlist_mode = False  # Track if playing from playlist
-
-        # Setup pygame for music end events
-        import pygame
-        pygame.mixer.music.set_endevent(pygame.USEREVENT + 1)
 
         # Create main frame for navigation
         self.main_frame = tk.Frame(self.root)
@@ -65,10 +188,98 @@ class MusicPlayerGUI:
 
         # Set protocol for window close button to save data before closing
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-        
-        # Start checking for music events
-                # Show initial login screen
+
+        # Event-loop lag is only measured while instrumentation is enabled
+        self.lag_monitor = instrumentation.TkLagMonitor(self.root)
+        if instrumentation.is_enabled():
+            self.lag_monitor.start()
+        self.root.bind('<F12>', lambda _event: self.tampilkan_panel_debug())
+        self.root.bind('<Control-z>', lambda _event: self.batalkan_perubahan())
+        self.root.bind('<Control-y>', lambda _event: self.ulangi_perubahan())
+
+        # Show initial login screen, then load everything else
         self.show_login_screen()
+        self.root.after_idle(self._report_first_paint)
+        self._start_background_init()
+
+    # ========== STAGED STARTUP ==========
+
+    def _elapsed_ms(self):
+        return int((time.perf_counter() - self.started_at) * 1000)
+
+    def _report_first_paint(self):
+        """Log how long it took until the login screen was drawn."""
+        print(f"Waktu hingga tampilan pertama: {self._elapsed_ms()} ms")
+
+    def _start_background_init(self):
+        """Load data and initialize audio on a worker thread, reporting progress."""
+        self._startup_messages = queue.Queue()
+        post = self._startup_messages.put
+
+        def worker():
+            post(('progress', "Memuat library..."))
+            loaded_data = load_data(on_error=lambda title, message: post(('error', title, message)))
+            post(('progress', "Memuat statistik pemutaran..."))
+            stats = load_stats()
+            post(('progress', "Menyiapkan audio..."))
+            try:
+                init_audio()
+                audio_error = None
+            except Exception as e:
+                audio_error = e
+            post(('done', loaded_data, stats, audio_error))
+
+        threading.Thread(target=worker, name="StartupLoader", daemon=True).start()
+        self._poll_background_init()
+
+    def _poll_background_init(self):
+        """Apply startup progress on the Tk thread until loading has finished."""
+        while True:
+            try:
+                message = self._startup_messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'progress':
+                if getattr(self, 'startup_status_label', None):
+                    self.startup_status_label.config(text=message[1])
+            elif message[0] == 'error':
+                messagebox.showerror(message[1], message[2])
+            elif message[0] == 'done':
+                self._finish_startup(*message[1:])
+                return
+        self.root.after(50, self._poll_background_init)
+
+    def _finish_startup(self, loaded_data, stats, audio_error):
+        """Install the loaded data and enable the application."""
+        if audio_error is not None:
+            messagebox.showerror("Pygame init error", f"Gagal menginisialisasi pygame mixer:\n{audio_error}")
+            self.root.destroy()
+            return
+
+        if loaded_data:
+            self.core.install_data(loaded_data, stats)
+        else:
+            # If no data file found, initialize with dummy data
+            load_dummy_data(self.library, self.playlists)
+            self.core.install_data({'library': self.library, 'playlists': self.playlists}, stats)
+            # Save dummy data for the first time
+            self.core.save()
+
+        # Remote control (MUSICPLAYER_REMOTE) is served once the library is in place
+        if self.remote:
+            try:
+                self.remote.start_server()
+            except OSError as e:
+                print(f"Remote control tidak dapat dijalankan: {e}")
+                self.remote = None
+
+        # Start applying events from the audio engine thread
+        self.check_music_events()
+
+        self.app_ready = True
+        print(f"Startup selesai dalam {self._elapsed_ms()} ms")
+        if self.current_user_role is None:
+            self.show_login_screen()
 
     def clear_frame(self):
         """Clear all widgets from the main frame."""
@@ -78,7 +289,6 @@ class MusicPlayerGUI:
     def setup_styles(self):
         """Configure ttk styles and root appearance."""
         try:
-            from tkinter import ttk
             self.style = ttk.Style()
             try:
                 self.style.theme_use('clam')
@@ -96,7 +306,6 @@ class MusicPlayerGUI:
     def styled_label(self, parent, text, style='TLabel', **pack_opts):
         """Create a themed label and pack it with default padding."""
         try:
-            from tkinter import ttk
             lbl = ttk.Label(parent, text=text, style=style)
         except Exception:
             lbl = tk.Label(parent, text=text)
@@ -109,7 +318,6 @@ class MusicPlayerGUI:
     def styled_button(self, parent, text, command=None, **pack_opts):
         """Create a themed button and pack it with default padding."""
         try:
-            from tkinter import ttk
             btn = ttk.Button(parent, text=text, command=command)
         except Exception:
             btn = tk.Button(parent, text=text, command=command)
@@ -123,11 +331,88 @@ class MusicPlayerGUI:
             btn.pack(padx=padx, pady=pady)
         return btn
 
+    def fill_sortable_tree(self, tree, columns, view_name, source, rows_provider, numbered=False):
+        """
+        Fill a Treeview and make every column header sortable.
+
+        Sort keys and permutations are cached per view and reused until the
+        source list's version changes, so clicks only reorder row indices.
+        Clicking another header keeps the previous columns as tie-breakers.
+
+        Args:
+            tree: ttk.Treeview whose columns are headed by `columns`
+            columns: column headings, matching sorting.COLUMN_KEYS (plus "No")
+            view_name: cache key for this view
+            source: SinglyLinkedList/DoublyLinkedList the rows come from
+            rows_provider: callable returning the songs in list order
+            numbered: whether the first column is the "No" position column
+
+        Returns:
+            The songs shown, indexed by row iid
+        """
+        cache = self._sort_caches.setdefault(view_name, SortKeyCache())
+        rows = cache.update(rows_provider, (id(source), source.version))
+
+        with instrumentation.span("render.treeview", view=view_name, rows=len(rows)):
+            for i, lagu in enumerate(rows):
+                values = (lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.genre, lagu.tahun, lagu.file_path)
+                tree.insert('', tk.END, iid=str(i), values=((i + 1,) + values) if numbered else values)
+
+        sort_spec = []
+
+        def sort_by(column):
+            sort_spec[:] = SortKeyCache.next_spec(sort_spec, column)
+            with instrumentation.span("render.sort", view=view_name, columns=len(sort_spec)):
+                order = cache.order(sort_spec)
+                # One Tk call reorders every row; no row values are rebuilt
+                tree.set_children('', *map(str, order))
+            arrows = {col: (" \u25bc" if desc else " \u25b2") for col, desc in sort_spec}
+            for col in columns:
+                tree.heading(col, text=col + arrows.get(col, ""))
+
+        for col in columns:
+            tree.heading(col, text=col, command=lambda c=col: sort_by(c))
+        return rows
+
+    def _show_cover(self, label, lagu, size):
+        """Put a song's cover on a label; returns False while it is still being looked up."""
+        path = self.artwork_worker.thumbnail(lagu, size) if lagu else None
+        photo = self.thumbnail_images.get(path, size)
+        if photo is not None:
+            label.config(image=photo, text="")
+        else:
+            label.config(image="", text="(tidak ada sampul)")
+        return photo is not None or path is not None
+
+    def _add_cover_preview(self, tree, rows):
+        """Show the cover of the selected row under a library Treeview."""
+        cover_label = tk.Label(self.main_frame, text="(pilih lagu untuk melihat sampul)")
+        cover_label.pack()
+
+        def show(selection, attempt=0):
+            if not cover_label.winfo_exists() or tree.selection() != selection:
+                return
+            lagu = rows[int(selection[0])]
+            if not self._show_cover(cover_label, lagu, SMALL_SIZE) and attempt < 10:
+                cover_label.after(300, lambda: show(selection, attempt + 1))
+
+        def on_select(_event):
+            selection = tree.selection()
+            if selection:
+                show(selection)
+
+        tree.bind("<<TreeviewSelect>>", on_select, add="+")
+
     def on_closing(self):
         """Called when application is closing - saves data before exit."""
+        if not self.app_ready:
+            # Nothing has been loaded yet, so there is nothing to save
+            self.root.destroy()
+            return
         try:
-            # Save all data before closing
-            save_data(self.library, self.playlists)
+            # Save all data before closing; the running play ends here
+            self.core.play_stats.record_stop()
+            self.core.save()
             print("Data berhasil disimpan sebelum aplikasi ditutup.")
         except Exception as e:
             print(f"Error saat menyimpan data: {e}")
@@ -136,48 +421,17 @@ class MusicPlayerGUI:
             # Close the application
             self.root.destroy()
 
-    # This prevents multiple event loops and race conditions
+    @property
+    def library(self):
+        return self.core.library
 
+    @property
+    def playlists(self):
+        return self.core.playlists
 
-    def handle_song_end(self):
-        """Handle autoplay when a song ends."""
-        import time
-        
-        # Cooldown check: prevent rapid autoplay triggers
-        current_time = time.time()
-        if hasattr(self, '_last_autoplay_time'):
-            if current_time - self._last_autoplay_time < 2:  # 2 second cooldown
-                print("Autoplay cooldown active, skipping trigger")
-                return
-        
-        self._last_autoplay_time = current_time
-        print("Song ended, autoplay triggered")
-        
-        # Priority 1: Play from queue if available
-        if not self.playback_queue.is_empty():
-            next_song = self.playback_queue.peek()
-            if next_song and next_song.file_path:  # Check file exists
-                self._next_in_queue()
-                return
-        
-        # Priority 2: Play next in playlist if in playlist mode
-        if self.is_playlist_mode and self.current_playlist_node and self.current_playlist_node.next:
-            next_node = self.current_playlist_node.next
-            if next_node.data and next_node.data.file_path:  # Check file exists
-                self._next_in_playlist()
-                return
-        
-        # Priority 3: Play similar song (only if not in playlist mode)
-        if not self.is_playlist_mode:
-            # Check if there's at least one song with valid file
-            all_songs = self.library.get_all_lagu()
-            valid_songs = [s for s in all_songs if s.file_path and s.file_path.strip()]
-            
-            if len(valid_songs) > 1:  # Need at least 2 songs (current + next)
-                self._next_similar()
-            else:
-                print("No valid songs for autoplay, stopping")
-                self.playback_state['is_playing'] = False
+    @property
+    def playback_state(self):
+        return self.core.playback_state
 
     # ========== LOGIN SCREENS ==========
     
@@ -185,23 +439,84 @@ class MusicPlayerGUI:
         """Display the initial login screen."""
         self.clear_frame()
         self.current_user_role = None
-        self.playback_state['_previous_playing'] = None
+        with self.core.state.writing():
+            self.playback_state['_previous_playing'] = None
         self.styled_label(self.main_frame, "Selamat Datang di Music Player",style='Header.TLabel', pady=20)
         self.styled_label(self.main_frame, "Pilih Peran Anda:", pady=10)
 
-        self.styled_button(self.main_frame, "Login sebagai Admin", command=self.login_as_admin)
-        self.styled_button(self.main_frame, "Login sebagai User", command=self.login_as_user)
+        login_buttons = [
+            self.styled_button(self.main_frame, "Login sebagai Admin", command=self.login_as_admin),
+            self.styled_button(self.main_frame, "Login sebagai User", command=self.login_as_user),
+        ]
         self.styled_button(self.main_frame, "Keluar", command=self.on_closing)
 
+        if not self.app_ready:
+            # Splash: logins stay disabled until the background loader is done
+            for btn in login_buttons:
+                btn.config(state=tk.DISABLED)
+            progress = ttk.Progressbar(self.main_frame, mode='indeterminate', length=250)
+            progress.pack(pady=10)
+            progress.start(15)
+            self.startup_status_label = tk.Label(self.main_frame, text="Memuat...")
+            self.startup_status_label.pack()
+        else:
+            self.startup_status_label = None
+
     def login_as_admin(self):
         """Set role as admin and show admin menu."""
         self.current_user_role = "Admin"
         self.show_admin_menu()
 
     def login_as_user(self):
-        """Set role as user and show user menu."""
+        """Set role as user and let them pick a profile."""
         self.current_user_role = "User"
-        self.show_user_menu()
+        self.pilih_profil()
+
+    def pilih_profil(self):
+        """Show the profile picker; only the chosen profile's own files are loaded."""
+        self.clear_frame()
+        self.styled_label(self.main_frame, "Pilih Profil", style='Header.TLabel', pady=20)
+
+        profile_listbox = tk.Listbox(self.main_frame, height=8)
+        profile_listbox.pack(padx=20, pady=10)
+        names = list_profiles() or [DEFAULT_PROFILE]
+        for name in names:
+            profile_listbox.insert(tk.END, name)
+        current = self.core.profile.name if self.core.profile else DEFAULT_PROFILE
+        if current in names:
+            profile_listbox.selection_set(names.index(current))
+
+        def open_profile(name):
+            switching = self.core.profile is None or self.core.profile.name != name
+            try:
+                self.core.switch_profile(name)
+            except PlayerError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            if switching:
+                # Playback of the previous profile was stopped
+                self._clear_playback_controls()
+            self.show_user_menu()
+
+        def enter_selected():
+            selection = profile_listbox.curselection()
+            if not selection:
+                messagebox.showwarning("Peringatan", "Pilih profil terlebih dahulu.")
+                return
+            open_profile(profile_listbox.get(selection[0]))
+
+        def create_profile():
+            name = simpledialog.askstring("Profil Baru", "Masukkan nama profil baru:")
+            if name is None:
+                return
+            if name.strip() in names:
+                messagebox.showerror("Error", f"Profil '{name.strip()}' sudah ada.")
+                return
+            open_profile(name)
+
+        self.styled_button(self.main_frame, "Masuk", command=enter_selected)
+        self.styled_button(self.main_frame, "Buat Profil Baru", command=create_profile)
+        self.styled_button(self.main_frame, "Kembali", command=self.show_login_screen)
 
     # ========== ADMIN MENU ==========
     
@@ -214,8 +529,42 @@ class MusicPlayerGUI:
         self.styled_button(self.main_frame, "Lihat Semua Lagu di Library", command=self.lihat_semua_lagu)
         self.styled_button(self.main_frame, "Ubah Data Lagu", command=self.ubah_data_lagu)
         self.styled_button(self.main_frame, "Hapus Lagu", command=self.hapus_lagu)
+        if hasattr(self.library, 'shards'):
+            self.styled_button(self.main_frame, "Atur Shard Library", command=self.atur_shard)
+        self.styled_button(self.main_frame, "Impor / Ekspor Library", command=self.impor_ekspor_library)
+        self.styled_button(self.main_frame, "Cari Lagu Duplikat", command=self.cari_duplikat)
+        self.styled_button(self.main_frame, "Periksa Integritas Library", command=self.periksa_integritas)
+        self.styled_button(self.main_frame, "Folder Musik & Relokasi", command=self.atur_folder_musik)
+        oplog = self.core.oplog
+        self.styled_button(self.main_frame, f"Undo (Ctrl+Z): {oplog.undo_stack[-1].label}" if oplog.undo_stack
+                           else "Undo (Ctrl+Z)", command=self.batalkan_perubahan)
+        self.styled_button(self.main_frame, f"Redo (Ctrl+Y): {oplog.redo_stack[-1].label}" if oplog.redo_stack
+                           else "Redo (Ctrl+Y)", command=self.ulangi_perubahan)
+        self.styled_button(self.main_frame, "Panel Debug (F12)", command=self.tampilkan_panel_debug)
         self.styled_button(self.main_frame, "Logout", command=self.show_login_screen)
 
+    def batalkan_perubahan(self):
+        """Undo the last library or playlist change (admin only)."""
+        self._undo_redo(self.core.undo, "dibatalkan")
+
+    def ulangi_perubahan(self):
+        """Redo the last undone change (admin only)."""
+        self._undo_redo(self.core.redo, "diulang")
+
+    def _undo_redo(self, action, verb):
+        if self.current_user_role != "Admin":
+            return
+        try:
+            label = action()
+        except PlayerError as e:
+            messagebox.showinfo("Info", str(e))
+            return
+        self.core.commit()
+        if not self.playback_state['current_playing']:
+            self._clear_playback_controls()
+        messagebox.showinfo("Info", f"Perubahan {verb}: {label}")
+        self.show_admin_menu()
+
     def tambah_lagu_baru(self):
         """Show form to add a new song to the library."""
         self.clear_frame()
@@ -250,7 +599,6 @@ class MusicPlayerGUI:
         file_entry.pack(padx=50, pady=2)
 
         def submit():
-            import os
             id_baru = id_entry.get().strip()
             judul_baru = judul_entry.get().strip()
             artis_baru = artis_entry.get().strip()
@@ -267,18 +615,14 @@ class MusicPlayerGUI:
                 messagebox.showwarning("Peringatan", "Semua field harus diisi.")
                 return
 
-            if self.library.find_by_id(id_baru):
-                messagebox.showerror("Error", f"ID lagu '{id_baru}' sudah ada di library.")
-                return
-
-            if not os.path.isfile(file_baru):
-                messagebox.showerror("Error", f"File audio '{file_baru}' tidak ditemukan.")
+            try:
+                lagu_baru = self.core.add_song(Lagu(id_baru, judul_baru, artis_baru, album_baru,
+                                                    genre_baru, tahun_baru, file_baru))
+            except PlayerError as e:
+                messagebox.showerror("Error", str(e))
                 return
-
-            lagu_baru = Lagu(id_baru, judul_baru, artis_baru, album_baru, genre_baru, tahun_baru, file_baru)
-            self.library.append(lagu_baru)
             messagebox.showinfo("Info", f"Lagu '{lagu_baru.judul}' oleh {lagu_baru.artis} telah ditambahkan ke library.")
-            save_data(self.library, self.playlists)
+            self.core.commit()
             self.show_admin_menu()
 
         tk.Button(self.main_frame, text="Simpan Lagu", command=submit).pack(pady=20)
@@ -294,12 +638,10 @@ class MusicPlayerGUI:
         tree.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
 
         for col in columns:
-            tree.heading(col, text=col)
             tree.column(col, width=100, anchor=tk.CENTER)
 
-        for lagu in self.library.get_all_lagu():
-            tree.insert('', tk.END, values=(lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.genre, lagu.tahun, lagu.file_path))
-
+        rows = self.fill_sortable_tree(tree, columns, 'library', self.library, self.library.get_all_lagu)
+        self._add_cover_preview(tree, rows)
 
         tk.Button(self.main_frame, text="Kembali ke Menu Admin", command=self.show_admin_menu).pack(pady=10)
 
@@ -313,7 +655,6 @@ class MusicPlayerGUI:
         id_entry.pack(pady=5)
 
         def find_and_edit():
-            import os
             id_ubah = id_entry.get().strip()
             lagu_target = self.library.find_by_id(id_ubah)
 
@@ -372,33 +713,17 @@ class MusicPlayerGUI:
                     messagebox.showwarning("Peringatan", "Semua field (termasuk path file) harus diisi.")
                     return
 
-                if not os.path.isfile(file_baru):
-                    messagebox.showerror("Error", f"File audio '{file_baru}' tidak ditemukan.")
+                try:
+                    # The core updates the song in the library and in every playlist
+                    self.core.edit_song(id_ubah, judul=judul_baru, artis=artis_baru, album=album_baru,
+                                        genre=genre_baru, tahun=tahun_baru, file_path=file_baru)
+                except PlayerError as e:
+                    messagebox.showerror("Error", str(e))
                     return
 
-    
-
-                lagu_target.judul = judul_baru
-                lagu_target.artis = artis_baru
-                lagu_target.album = album_baru
-                lagu_target.genre = genre_baru
-                lagu_target.tahun = tahun_baru
-                lagu_target.file_path = file_baru
-
                 messagebox.showinfo("Info", f"Data lagu '{lagu_target.judul}' telah diperbarui.")
-
-                # Update in all playlists
-                for playlist in self.playlists.values():
-                    node = playlist.find_node_by_lagu_id(id_ubah)
-                    if node:
-                        node.data.judul = judul_baru
-                        node.data.artis = artis_baru
-                        node.data.album = album_baru
-                        node.data.genre = genre_baru
-                        node.data.tahun = tahun_baru
-                        node.data.file_path = file_baru
                 messagebox.showinfo("Info", "Data lagu juga telah diperbarui di semua playlist.")
-                save_data(self.library, self.playlists)
+                self.core.commit()
                 self.show_admin_menu()
 
             tk.Button(self.main_frame, text="Simpan Perubahan", command=submit_edit).pack(pady=20)
@@ -407,6 +732,346 @@ class MusicPlayerGUI:
         tk.Button(self.main_frame, text="Cari Lagu", command=find_and_edit).pack(pady=10)
         tk.Button(self.main_frame, text="Kembali ke Menu Admin", command=self.show_admin_menu).pack()
 
+    def atur_shard(self):
+        """Choose which library shards are loaded and shown in the merged view."""
+        self.clear_frame()
+        tk.Label(self.main_frame, text="Atur Shard Library", font=("Arial", 14)).pack(pady=10)
+        tk.Label(self.main_frame, text="Shard terpilih dimuat dan ditampilkan; shard lain tetap di disk.").pack()
+
+        shard_listbox = tk.Listbox(self.main_frame, height=12, selectmode=tk.MULTIPLE)
+        shard_listbox.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
+        names = sorted(self.library.shards)
+        active = {shard.name for shard in self.library.active_shards()}
+        for i, name in enumerate(names):
+            shard = self.library.shards[name]
+            status = "dimuat" if shard.loaded else "di disk"
+            shard_listbox.insert(tk.END, f"{name}  ({shard.size} lagu, {status})")
+            if name in active:
+                shard_listbox.selection_set(i)
+
+        def apply_selection():
+            selected = [names[i] for i in shard_listbox.curselection()]
+            try:
+                self.core.set_active_shards(None if len(selected) == len(names) else selected)
+            except PlayerError as e:
+                messagebox.showwarning("Peringatan", str(e))
+                return
+            self.core.save()
+            messagebox.showinfo("Info", f"{len(selected)} shard aktif.")
+            self.show_admin_menu()
+
+        tk.Button(self.main_frame, text="Terapkan", command=apply_selection).pack(pady=5)
+        tk.Button(self.main_frame, text="Kembali ke Menu Admin", command=self.show_admin_menu).pack()
+
+    def impor_ekspor_library(self):
+        """Export the whole library to a file or import songs from one."""
+        self.clear_frame()
+        tk.Label(self.main_frame, text="Impor / Ekspor Library", font=("Arial", 14)).pack(pady=10)
+        tk.Label(self.main_frame, text="Format: M3U/M3U8, CSV atau JSON Lines.").pack()
+        status_label = tk.Label(self.main_frame, text="")
+        status_label.pack(pady=10)
+
+        def export_library():
+            path = filedialog.asksaveasfilename(title="Ekspor Library", defaultextension=".csv",
+                                                initialfile="library.csv", filetypes=PLAYLIST_FILETYPES)
+            if not path:
+                return
+            self._export_to(self.library, path)
+
+        def import_library():
+            path = filedialog.askopenfilename(title="Impor ke Library", filetypes=PLAYLIST_FILETYPES)
+            if path:
+                self._run_import(path, status_label, on_done=self.show_admin_menu)
+
+        tk.Button(self.main_frame, text="Ekspor Library", command=export_library).pack(pady=5)
+        tk.Button(self.main_frame, text="Impor ke Library", command=import_library).pack(pady=5)
+        tk.Button(self.main_frame, text="Kembali ke Menu Admin", command=self.show_admin_menu).pack(pady=10)
+
+    def _export_to(self, songs, path):
+        try:
+            written = export_songs(songs, path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Gagal mengekspor ke {path}.\nError: {e}")
+            return
+        messagebox.showinfo("Info", f"{written} lagu diekspor ke {path}.")
+
+    def _run_import(self, path, status_label, playlist_name=None, on_done=None):
+        """
+        Import a file one batch per Tk callback, so the window keeps
+        repainting while large files are read.
+        """
+        steps = iter_import(self.core, path, playlist_name)
+        status_label.config(text="Mengimpor...")
+        progress = {'result': None}
+
+        def step():
+            try:
+                progress['result'] = next(steps)
+            except StopIteration:
+                result = progress['result']
+                self.core.save()
+                messagebox.showinfo("Info", f"Impor {path} selesai:\n{result}")
+                if on_done:
+                    on_done()
+                return
+            except (OSError, ValueError, KeyError) as e:
+                self.core.save()  # keep the batches that were already committed
+                messagebox.showerror("Error", f"Gagal mengimpor {path}.\nError: {e}")
+                return
+            if status_label.winfo_exists():
+                status_label.config(text=f"Mengimpor... {progress['result']}")
+            self.root.after(1, step)
+
+        step()
+
+    def periksa_integritas(self):
+        """Report missing files and broken playlist/queue references, and repair the references."""
+        max_rows = 1000  # the Treeview stays responsive; the summary has the full counts
+        self.clear_frame()
+        tk.Label(self.main_frame, text="Periksa Integritas Library", font=("Arial", 14)).pack(pady=10)
+        summary_label = tk.Label(self.main_frame, text="", justify=tk.LEFT)
+        summary_label.pack(pady=5)
+
+        columns = ("Masalah", "ID", "Judul", "Lokasi")
+        tree = ttk.Treeview(self.main_frame, columns=columns, show='headings', height=15)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=300 if col == "Lokasi" else 140, anchor=tk.W)
+        tree.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
+
+        def refresh():
+            if not tree.winfo_exists():
+                return
+            report = check_integrity(self.core, self.availability_monitor)
+            summary_label.config(text=str(report))
+            tree.delete(*tree.get_children())
+            rows = [("File tidak ditemukan", lagu.id, lagu.judul, lagu.file_path) for lagu in report.missing_files]
+            rows.extend(("Tidak ada di library", id_lagu, "", where) for where, id_lagu in report.orphans)
+            rows.extend(("Salinan lama", id_lagu, "", where) for where, id_lagu in report.stale)
+            for values in rows[:max_rows]:
+                tree.insert("", tk.END, values=values)
+
+        def recheck_files():
+            self.availability_monitor.submit_many(self.library.get_all_lagu(), force=True)
+            summary_label.config(text="Semua file sedang diperiksa ulang di latar belakang...")
+            self.root.after(2000, refresh)
+
+        def repair_references():
+            repointed, removed = self.core.repair_references()
+            self.core.save()
+            messagebox.showinfo("Info", f"{repointed} referensi diperbarui, {removed} referensi dihapus.")
+            refresh()
+
+        tk.Button(self.main_frame, text="Periksa Ulang Semua File", command=recheck_files).pack(pady=2)
+        tk.Button(self.main_frame, text="Perbaiki Referensi Playlist/Antrian", command=repair_references).pack(pady=2)
+        tk.Button(self.main_frame, text="Muat Ulang Laporan", command=refresh).pack(pady=2)
+        tk.Button(self.main_frame, text="Kembali ke Menu Admin", command=self.show_admin_menu).pack(pady=5)
+        refresh()
+
+    def atur_folder_musik(self):
+        """Configure the library roots and relocate songs whose files moved, in one batch."""
+        self.clear_frame()
+        tk.Label(self.main_frame, text="Folder Musik & Relokasi", font=("Arial", 14)).pack(pady=10)
+        tk.Label(self.main_frame, text="Path lagu disimpan relatif terhadap folder ini, mis. $audio/GO!.mp3.").pack()
+        roots = get_roots()
+        root_listbox = tk.Listbox(self.main_frame, height=6)
+        root_listbox.pack(padx=20, pady=10, fill=tk.X)
+        status_label = tk.Label(self.main_frame, text="", justify=tk.LEFT)
+        status_label.pack(pady=5)
+        names = []
+        messages = queue.Queue()
+
+        def show_roots():
+            root_listbox.delete(0, tk.END)
+            names[:] = sorted(roots.roots)
+            for name in names:
+                directory = roots.roots[name]
+                state = "" if os.path.isdir(directory) else "  (folder tidak ditemukan)"
+                root_listbox.insert(tk.END, f"${name} = {directory}{state}")
+
+        def roots_changed():
+            roots.save()
+            set_roots(roots)
+            # Root-relative paths now point elsewhere, so every file is checked again
+            self.availability_monitor.submit_many(self.library.get_all_lagu(), force=True)
+            show_roots()
+
+        def add_root():
+            directory = filedialog.askdirectory(title="Pilih Folder Musik")
+            if not directory:
+                return
+            name = simpledialog.askstring("Folder Musik", "Nama folder (dipakai di path, mis. audio):",
+                                          initialvalue=os.path.basename(directory))
+            if not name:
+                return
+            try:
+                roots.set(name, directory)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            roots_changed()
+
+        def remove_root():
+            selection = root_listbox.curselection()
+            if not selection:
+                messagebox.showwarning("Peringatan", "Pilih folder yang ingin dihapus.")
+                return
+            name = names[selection[0]]
+            if messagebox.askyesno("Konfirmasi", f"Hapus folder '${name}'? Lagu di dalamnya akan dianggap hilang."):
+                roots.remove(name)
+                roots_changed()
+
+        def poll():
+            while True:
+                try:
+                    kind, payload = messages.get_nowait()
+                except queue.Empty:
+                    break
+                if not status_label.winfo_exists():
+                    return
+                if kind == 'error':
+                    messagebox.showerror("Error", f"Relokasi gagal.\nError: {payload}")
+                    return
+                status_label.config(text=str(payload))
+                if payload.moves and messagebox.askyesno("Konfirmasi", f"Perbarui path {len(payload.moves)} lagu?"):
+                    relocated = self.core.relocate_songs(payload.moves)
+                    self.core.commit()
+                    messagebox.showinfo("Info", f"Path {relocated} lagu diperbarui.")
+                return
+            self.root.after(100, poll)
+
+        def relocate(directories=None):
+            def worker():
+                try:
+                    # A frozen snapshot, taken off the UI thread; edits made meanwhile cannot tear it
+                    songs = self.core.snapshot().songs
+                    # Sizes recorded by the duplicate scan tell same-named files apart
+                    size_hints = {path: entry['size'] for path, entry in HashCache().load().entries.items()}
+                    messages.put(('done', plan_relocation(songs, directories, size_hints)))
+                except Exception as e:
+                    messages.put(('error', e))
+
+            status_label.config(text="Mencari file...")
+            threading.Thread(target=worker, name="Relocation", daemon=True).start()
+            poll()
+
+        def relocate_from_folder():
+            directory = filedialog.askdirectory(title="Cari File Lagu di Folder")
+            if directory:
+                relocate(list(roots.roots.values()) + [directory])
+
+        show_roots()
+        tk.Button(self.main_frame, text="Tambah Folder", command=add_root).pack(pady=2)
+        tk.Button(self.main_frame, text="Hapus Folder", command=remove_root).pack(pady=2)
+        tk.Button(self.main_frame, text="Relokasi File yang Hilang", command=relocate).pack(pady=2)
+        tk.Button(self.main_frame, text="Relokasi dari Folder Lain...", command=relocate_from_folder).pack(pady=2)
+        tk.Button(self.main_frame, text="Kembali ke Menu Admin", command=self.show_admin_menu).pack(pady=5)
+
+    def cari_duplikat(self):
+        """Scan the library for duplicate tracks and merge them."""
+        self.clear_frame()
+        tk.Label(self.main_frame, text="Cari Lagu Duplikat", font=("Arial", 14)).pack(pady=10)
+        acoustic_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.main_frame, text="Bandingkan sidik jari akustik (lebih lambat, menemukan hasil re-encode)",
+                       variable=acoustic_var).pack()
+        status_label = tk.Label(self.main_frame, text="Pilih lagu yang dipertahankan, lalu gabungkan grupnya.")
+        status_label.pack(pady=5)
+
+        columns = ("ID", "Judul", "Artis", "Album", "File")
+        tree = ttk.Treeview(self.main_frame, columns=columns, show='tree headings', height=15)
+        tree.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
+        tree.column('#0', width=180)
+        tree.heading('#0', text="Grup")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=220 if col == "File" else 110, anchor=tk.W)
+
+        groups = {}  # tree item of a group -> DuplicateGroup
+        messages = queue.Queue()
+
+        def show_groups(found):
+            tree.delete(*tree.get_children())
+            groups.clear()
+            for number, group in enumerate(found, 1):
+                keeper = group.suggested_keeper()
+                parent = tree.insert('', tk.END, text=f"#{number}: {group}", open=True)
+                groups[parent] = group
+                for lagu in group.songs:
+                    item = tree.insert(parent, tk.END, text="dipertahankan" if lagu is keeper else "",
+                                       values=(lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.file_path or ""))
+                    if lagu is keeper:
+                        tree.selection_add(item)
+
+        def poll():
+            while True:
+                try:
+                    kind, payload = messages.get_nowait()
+                except queue.Empty:
+                    break
+                if not status_label.winfo_exists():
+                    return
+                if kind == 'progress':
+                    status_label.config(text=payload)
+                elif kind == 'error':
+                    messagebox.showerror("Error", f"Pemindaian gagal.\nError: {payload}")
+                    return
+                else:
+                    show_groups(payload)
+                    status_label.config(text=f"{len(payload)} grup duplikat. Pilih lagu yang dipertahankan per grup.")
+                    return
+            self.root.after(100, poll)
+
+        def start_scan():
+            acoustic = acoustic_var.get()
+
+            def worker():
+                try:
+                    songs = self.core.snapshot().songs
+                    found = find_duplicates(songs, acoustic=acoustic,
+                                            progress=lambda message: messages.put(('progress', message)))
+                    messages.put(('done', found))
+                except Exception as e:
+                    messages.put(('error', e))
+
+            status_label.config(text="Memindai library...")
+            threading.Thread(target=worker, name="DuplicateScan", daemon=True).start()
+            poll()
+
+        def merge_selected():
+            chosen = {}  # group item -> keeper id
+            for item in tree.selection():
+                parent = tree.parent(item)
+                if parent:
+                    if parent in chosen:
+                        messagebox.showwarning("Peringatan", "Pilih hanya satu lagu per grup.")
+                        return
+                    chosen[parent] = tree.item(item, 'values')[0]
+                elif item in groups:
+                    chosen.setdefault(item, groups[item].suggested_keeper().id)
+            if not chosen:
+                messagebox.showwarning("Peringatan", "Pilih lagu yang dipertahankan terlebih dahulu.")
+                return
+            if not messagebox.askyesno("Konfirmasi", f"Gabungkan {len(chosen)} grup? Lagu lain di grup akan dihapus "
+                                                     "dari library dan diganti di semua playlist."):
+                return
+            removed = rewritten = 0
+            for parent, keep_id in chosen.items():
+                try:
+                    n_removed, n_rewritten = self.core.merge_songs(keep_id, [l.id for l in groups[parent].songs])
+                except PlayerError as e:
+                    messagebox.showerror("Error", str(e))
+                    continue
+                removed += n_removed
+                rewritten += n_rewritten
+                tree.delete(parent)
+                del groups[parent]
+            self.core.commit()
+            messagebox.showinfo("Info", f"{removed} lagu duplikat dihapus, {rewritten} entri playlist diperbarui.")
+
+        tk.Button(self.main_frame, text="Mulai Pindai", command=start_scan).pack(side=tk.LEFT, padx=5, pady=10)
+        tk.Button(self.main_frame, text="Gabungkan Grup Terpilih", command=merge_selected).pack(side=tk.LEFT, padx=5, pady=10)
+        tk.Button(self.main_frame, text="Kembali ke Menu Admin", command=self.show_admin_menu).pack(pady=10)
+
     def hapus_lagu(self):
         """Show interface to delete a song from the library."""
         self.clear_frame()
@@ -418,60 +1083,121 @@ class MusicPlayerGUI:
 
         def confirm_and_delete():
             id_hapus = id_entry.get().strip()
-            lagu_dihapus = self.library.remove_by_id(id_hapus)
-
-            if not lagu_dihapus:
-                messagebox.showerror("Error", f"Lagu dengan ID '{id_hapus}' tidak ditemukan.")
+            try:
+                # Also removes the song from every playlist and the queue
+                lagu_dihapus, lagu_dihapus_dari_playlist, dihentikan = self.core.delete_song(id_hapus)
+            except PlayerError as e:
+                messagebox.showerror("Error", str(e))
                 return
 
-            # Remove from all playlists
-            lagu_dihapus_dari_playlist = 0
-            for playlist in self.playlists.values():
-                node = playlist.find_node_by_lagu_id(id_hapus)
-                if node:
-                    playlist.remove_node(node)
-                    lagu_dihapus_dari_playlist += 1
-
-            # Remove from queue
-            queue_lama = list(self.playback_queue.items)
-            self.playback_queue = Queue()
-            for lagu in queue_lama:
-                if lagu.id != id_hapus:
-                    self.playback_queue.enqueue(lagu)
-
-            # Stop playback if currently playing
-            if self.playback_state['current_playing'] and self.playback_state['current_playing'].id == id_hapus:
-                stop_file(self.playback_state)
-                self.playback_state['current_playing'] = None
-                self.playback_state['current_file_path'] = None
-                self.playback_state['is_playing'] = False
-                self.current_playlist = None
-                self.current_playlist_node = None
+            if dihentikan:
                 messagebox.showinfo("Info", "Pemutaran lagu yang dihapus dihentikan.")
 
             message = f"Lagu '{lagu_dihapus.judul}' oleh {lagu_dihapus.artis} telah dihapus dari library."
             if lagu_dihapus_dari_playlist > 0:
                 message += f"\nLagu juga telah dihapus dari {lagu_dihapus_dari_playlist} playlist."
             messagebox.showinfo("Info", message)
-            save_data(self.library, self.playlists)
+            self.core.commit()
             self.show_admin_menu()
 
         tk.Button(self.main_frame, text="Hapus Lagu", command=confirm_and_delete).pack(pady=10)
         tk.Button(self.main_frame, text="Kembali ke Menu Admin", command=self.show_admin_menu).pack()
 
+    def tampilkan_panel_debug(self):
+        """Show live counters and latency histograms, with Chrome trace export."""
+        if getattr(self, 'debug_window', None) and self.debug_window.winfo_exists():
+            self.debug_window.lift()
+            return
+        window = self.debug_window = tk.Toplevel(self.root)
+        window.title("Panel Debug")
+        window.geometry("760x520")
+
+        enabled_var = tk.BooleanVar(value=instrumentation.is_enabled())
+
+        def toggle_enabled():
+            if enabled_var.get():
+                instrumentation.enable()
+                self.lag_monitor.start()
+            else:
+                instrumentation.disable()
+                self.lag_monitor.stop()
+
+        tk.Checkbutton(window, text="Aktifkan instrumentasi", variable=enabled_var,
+                       command=toggle_enabled).pack(anchor="w", padx=10, pady=5)
+
+        tk.Label(window, text="Latensi (ms)").pack(anchor="w", padx=10)
+        hist_columns = ("Nama", "Jumlah", "Rata-rata", "p50", "p95", "Maks")
+        hist_tree = ttk.Treeview(window, columns=hist_columns, show='headings', height=12)
+        hist_tree.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+        for col in hist_columns:
+            hist_tree.heading(col, text=col)
+            hist_tree.column(col, width=200 if col == "Nama" else 90, anchor=tk.W if col == "Nama" else tk.E)
+
+        tk.Label(window, text="Counter").pack(anchor="w", padx=10)
+        counter_tree = ttk.Treeview(window, columns=("Nama", "Nilai"), show='headings', height=6)
+        counter_tree.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+        for col in ("Nama", "Nilai"):
+            counter_tree.heading(col, text=col)
+            counter_tree.column(col, width=200, anchor=tk.W if col == "Nama" else tk.E)
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            counters, histograms = instrumentation.summary()
+            hist_tree.delete(*hist_tree.get_children())
+            for name, n, mean, p50, p95, max_ms in histograms:
+                hist_tree.insert('', tk.END, values=(name, n, f"{mean:.2f}", f"{p50:.2f}", f"{p95:.2f}", f"{max_ms:.2f}"))
+            counter_tree.delete(*counter_tree.get_children())
+            for name in sorted(counters):
+                counter_tree.insert('', tk.END, values=(name, counters[name]))
+            window.after(1000, refresh)
+
+        def reset():
+            instrumentation.reset()
+
+        def export_trace():
+            path = filedialog.asksaveasfilename(parent=window, title="Ekspor Trace Chrome",
+                                                defaultextension=".json", initialfile="musicplayer-trace.json",
+                                                filetypes=[("Chrome trace", "*.json")])
+            if not path:
+                return
+            try:
+                written = instrumentation.export_chrome_trace(path)
+            except OSError as e:
+                messagebox.showerror("Error", f"Gagal menulis trace ke {path}.\nError: {e}", parent=window)
+                return
+            messagebox.showinfo("Info", f"{written} event disimpan ke {path}.\n"
+                                        "Buka dengan chrome://tracing atau ui.perfetto.dev.", parent=window)
+
+        buttons = tk.Frame(window)
+        buttons.pack(pady=5)
+        tk.Button(buttons, text="Reset", command=reset).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Ekspor Trace Chrome", command=export_trace).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Tutup", command=window.destroy).pack(side=tk.LEFT, padx=5)
+        refresh()
+
     # ========== USER MENU ==========
     
     def show_user_menu(self):
         """Display the user menu screen."""
         self.clear_frame()
         self.styled_label(self.main_frame, "Menu User", style='Header.TLabel', pady=20)
+        if self.core.profile:
+            self.styled_label(self.main_frame, f"Profil: {self.core.profile.name}", pady=0)
 
         self.styled_button(self.main_frame, "Cari Lagu", command=self.cari_lagu)
         self.styled_button(self.main_frame, "Putar Lagu (Dari Library)", command=self.putar_lagu_library)
         self.styled_button(self.main_frame, "Buat/Atur Playlist", command=self.buat_atur_playlist)
         self.styled_button(self.main_frame, "Lihat Antrian Pemutaran", command=self.lihat_antrian)
         self.styled_button(self.main_frame, "Lihat Riwayat Pemutaran", command=self.lihat_riwayat)
-        self.styled_button(self.main_frame, "Logout", command=self.show_login_screen)
+        self.styled_button(self.main_frame, "Lihat Statistik Pemutaran", command=self.lihat_statistik)
+        self.styled_button(self.main_frame, "Ganti Profil", command=self.pilih_profil)
+        self.styled_button(self.main_frame, "Logout", command=self.logout_user)
+
+    def logout_user(self):
+        """Save the active profile and return to the login screen."""
+        self.core.save_profile()
+        self.show_login_screen()
 
     def cari_lagu(self):
         """Show interface to search for songs."""
@@ -486,6 +1212,10 @@ class MusicPlayerGUI:
         tk.Radiobutton(search_frame, text="ID", variable=criteria_var, value="id").grid(row=0, column=1, padx=5)
         tk.Radiobutton(search_frame, text="Judul", variable=criteria_var, value="judul").grid(row=0, column=2, padx=5)
         tk.Radiobutton(search_frame, text="Artis", variable=criteria_var, value="artis").grid(row=0, column=3, padx=5)
+        tk.Radiobutton(search_frame, text="Genre", variable=criteria_var, value="genre").grid(row=0, column=4, padx=5)
+        tk.Radiobutton(search_frame, text="Tahun (mis. 2020-2024)", variable=criteria_var, value="tahun").grid(row=0, column=5, padx=5)
+        if self.fulltext_indexer:
+            tk.Radiobutton(search_frame, text="Lirik & Tag", variable=criteria_var, value="teks").grid(row=0, column=6, padx=5)
 
         tk.Label(self.main_frame, text="Masukkan nilai:").pack(pady=5)
         search_entry = tk.Entry(self.main_frame, width=30)
@@ -498,8 +1228,11 @@ class MusicPlayerGUI:
                 messagebox.showwarning("Peringatan", "Silakan masukkan nilai pencarian.")
                 return
 
-            search_kwargs = {criteria: value}
-            results = self.library.find_by_criteria(**search_kwargs)
+            try:
+                results = self.core.search(criteria, value)
+            except PlayerError as e:
+                messagebox.showerror("Error", str(e))
+                return
 
             for widget in self.main_frame.winfo_children():
                 widget.destroy()
@@ -514,8 +1247,9 @@ class MusicPlayerGUI:
                 tree.heading(col, text=col)
                 tree.column(col, width=100, anchor=tk.CENTER)
 
-            for lagu in results:
-                tree.insert('', tk.END, values=(lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.genre, lagu.tahun, lagu.file_path))
+            with instrumentation.span("render.search_results", rows=len(results)):
+                for lagu in results:
+                    tree.insert('', tk.END, values=(lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.genre, lagu.tahun, lagu.file_path))
 
             if not results:
                 tk.Label(self.main_frame, text="Lagu tidak ditemukan.").pack()
@@ -527,10 +1261,12 @@ class MusicPlayerGUI:
                     return
                 item_values = tree.item(selected_item[0], 'values')
                 id_lagu = item_values[0]
-                lagu_target = self.library.find_by_id(id_lagu)
-                if lagu_target:
-                    self.playback_queue.enqueue(lagu_target)
-                    messagebox.showinfo("Info", f"Lagu '{lagu_target.judul}' ditambahkan ke antrian pemutaran.")
+                try:
+                    lagu_target = self.core.enqueue(id_lagu)
+                except PlayerError as e:
+                    messagebox.showerror("Error", str(e))
+                    return
+                messagebox.showinfo("Info", f"Lagu '{lagu_target.judul}' ditambahkan ke antrian pemutaran.")
 
             tk.Button(self.main_frame, text="Tambah ke Antrian", command=tambah_ke_antrian).pack(pady=5)
             tk.Button(self.main_frame, text="Kembali ke Menu User", command=self.show_user_menu).pack()
@@ -548,11 +1284,10 @@ class MusicPlayerGUI:
         tree.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
 
         for col in columns:
-            tree.heading(col, text=col)
             tree.column(col, width=100, anchor=tk.CENTER)
 
-        for lagu in self.library.get_all_lagu():
-            tree.insert('', tk.END, values=(lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.genre, lagu.tahun, lagu.file_path))
+        rows = self.fill_sortable_tree(tree, columns, 'library', self.library, self.library.get_all_lagu)
+        self._add_cover_preview(tree, rows)
 
         def play_selected():
             selected_item = tree.selection()
@@ -565,8 +1300,7 @@ class MusicPlayerGUI:
             lagu_target = self.library.find_by_id(id_lagu)
 
             if lagu_target:
-                self.is_playlist_mode = False
-                play_file(lagu_target, self.playback_state)
+                self.core.play_song(lagu_target)
                 self.show_playback_controls(is_playlist=False)
                 try:
                     self._start_playback_time_updater()
@@ -580,10 +1314,12 @@ class MusicPlayerGUI:
                 return
             item_values = tree.item(selected_item[0], 'values')
             id_lagu = item_values[0]
-            lagu_target = self.library.find_by_id(id_lagu)
-            if lagu_target:
-                self.playback_queue.enqueue(lagu_target)
-                messagebox.showinfo("Info", f"Lagu '{lagu_target.judul}' ditambahkan ke antrian pemutaran.")
+            try:
+                lagu_target = self.core.enqueue(id_lagu)
+            except PlayerError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            messagebox.showinfo("Info", f"Lagu '{lagu_target.judul}' ditambahkan ke antrian pemutaran.")
 
         tk.Button(self.main_frame, text="Tambah ke Antrian", command=tambah_ke_antrian).pack(pady=5)
         tk.Button(self.main_frame, text="Putar Lagu Terpilih", command=play_selected).pack(pady=5)
@@ -600,7 +1336,12 @@ class MusicPlayerGUI:
         control_frame = tk.Frame(self.control_container, name='control_frame')
         control_frame.pack(pady=10, fill=tk.X)
         # Set playlist mode flag
-        self.is_playlist_mode = is_playlist
+        self.core.is_playlist_mode = is_playlist
+
+        # Cover of the current song
+        self.cover_label = tk.Label(control_frame)
+        self.cover_label.pack()
+        self._cover_pending = not self._show_cover(self.cover_label, self.playback_state['current_playing'], LARGE_SIZE)
 
         # Create and store reference to the now playing label
         self.now_playing_label = tk.Label(control_frame, text=f"Sedang Memutar: {self.playback_state['current_playing' ]}")
@@ -610,6 +1351,11 @@ class MusicPlayerGUI:
         self.playback_time_label = tk.Label(control_frame, text="00:00 / 00:00")
         self.playback_time_label.pack()
 
+        # Waveform seek bar: drawn from cached peaks, follows the position model
+        self.waveform_bar = WaveformSeekBar(control_frame, on_seek=self.core.seek)
+        self.waveform_bar.pack(pady=2)
+        self._refresh_waveform()
+
         # Autoplay status label
         autoplay_status = "ON" if self.playback_state.get('autoplay_enabled') else "OFF"
         autoplay_label = tk.Label(control_frame, text=f"Autoplay: {autoplay_status}", fg="green" if self.playback_state.get('autoplay_enabled') else "red")
@@ -630,38 +1376,41 @@ class MusicPlayerGUI:
         def queue_action():
             self._next_in_queue()
 
+        def rewind_action():
+            self.core.skip(-10)
+
+        def forward_action():
+            self.core.skip(10)
+
         def pause_action():
-            pause_file(self.playback_state)
+            self.core.pause()
 
         def resume_action():
-            resume_file(self.playback_state)
+            self.core.resume()
             # restart updater
             self._start_playback_time_updater()
 
         def stop_action():
-            stop_file(self.playback_state)
-            self.playback_state['current_playing'] = None
-            self.playback_state['current_file_path'] = None
-            self.current_playlist = None
-            self.current_playlist_node = None
-            self.is_playlist_mode = False
+            self.core.stop()
             messagebox.showinfo("Info", "Pemutaran dihentikan.")
             # When Stop is clicked, remove the playback console (controls)
-            try:
-                for widget in self.control_container.winfo_children():
-                    widget.destroy()
-                # stop updater if running
-                self._stop_playback_time_updater()
-                # clear label references
-                self.now_playing_label = None
-                self.playback_time_label = None
-            except Exception:
-                pass
+            self._clear_playback_controls()
+
+        def toggle_normalize():
+            new_status = "ON" if self.core.toggle_normalize() else "OFF"
+            messagebox.showinfo("Normalisasi", f"Normalisasi loudness sekarang: {new_status}\n(Berlaku mulai lagu berikutnya)")
+
+        def crossfade_action():
+            seconds = simpledialog.askinteger("Crossfade", "Durasi crossfade antar lagu (detik, 0 = mati):",
+                                              initialvalue=self.playback_state.get('crossfade_seconds', 0),
+                                              minvalue=0, maxvalue=12)
+            if seconds is not None:
+                self.core.set_crossfade(seconds)
 
         def toggle_autoplay():
-            self.playback_state['autoplay_enabled'] = not self.playback_state.get('autoplay_enabled', True)
-            new_status = "ON" if self.playback_state['autoplay_enabled'] else "OFF"
-            autoplay_label.config(text=f"Autoplay: {new_status}", fg="green" if self.playback_state['autoplay_enabled'] else "red")
+            enabled = self.core.toggle_autoplay()
+            new_status = "ON" if enabled else "OFF"
+            autoplay_label.config(text=f"Autoplay: {new_status}", fg="green" if enabled else "red")
             messagebox.showinfo("Autoplay", f"Autoplay sekarang: {new_status}")
 
         # Group action buttons in a centered horizontal frame
@@ -671,40 +1420,93 @@ class MusicPlayerGUI:
         tk.Button(actions_frame, text="Lagu Sebelumnya (Riwayat)", command=prev_action).pack(side=tk.LEFT, padx=5)
         tk.Button(actions_frame, text="Lagu Berikutnya (Mirip)", command=next_action).pack(side=tk.LEFT, padx=5)
         tk.Button(actions_frame, text="Lagu dari Antrian", command=queue_action).pack(side=tk.LEFT, padx=5)
+        tk.Button(actions_frame, text="-10 dtk", command=rewind_action).pack(side=tk.LEFT, padx=5)
         tk.Button(actions_frame, text="Pause", command=pause_action).pack(side=tk.LEFT, padx=5)
         tk.Button(actions_frame, text="Resume", command=resume_action).pack(side=tk.LEFT, padx=5)
+        tk.Button(actions_frame, text="+10 dtk", command=forward_action).pack(side=tk.LEFT, padx=5)
         tk.Button(actions_frame, text="Autoplay", command=toggle_autoplay).pack(side=tk.LEFT, padx=5)
+        tk.Button(actions_frame, text="Normalisasi", command=toggle_normalize).pack(side=tk.LEFT, padx=5)
+        tk.Button(actions_frame, text="Crossfade", command=crossfade_action).pack(side=tk.LEFT, padx=5)
         tk.Button(actions_frame, text="Hentikan", command=stop_action).pack(side=tk.LEFT, padx=5)
 
 
+    def _clear_playback_controls(self):
+        """Remove the playback console and stop its time updater."""
+        try:
+            for widget in self.control_container.winfo_children():
+                widget.destroy()
+            # stop updater if running
+            self._stop_playback_time_updater()
+            # clear label references
+            self.now_playing_label = None
+            self.playback_time_label = None
+            self.waveform_bar = None
+            self.cover_label = None
+        except Exception:
+            pass
+
     def check_music_events(self):
-        """Check for music events (simple autoplay)"""
-        import pygame
-        import os
-        
-        # Ensure pygame is initialized (required for event.get)
-        if not pygame.get_init():
+        """Apply events published by the audio engine thread (runs on the Tk thread)."""
+        engine = get_audio_engine()
+        for event in engine.drain_events():
             try:
-                os.environ['SDL_VIDEODRIVER'] = 'dummy'
-                pygame.init()
+                self._handle_audio_event(event, engine)
             except Exception as e:
-                print(f"Pygame init error: {e}")
-                return
+                print(f"Error saat memproses event audio: {e}")
+
+        self.core.apply_loudness_results()
+        for file_path, available in self.availability_monitor.drain_changes():
+            print(f"File {'kembali tersedia' if available else 'tidak ditemukan lagi'}: {file_path}")
+        if self.remote:
+            # Commands from remote clients run here, on the Tk thread that owns the core
+            ran = self.remote.pump(self.core)
+            if ran & PLAYBACK_COMMANDS:
+                self._after_remote_playback()
+        self.root.after(100, self.check_music_events)
 
+    def _after_remote_playback(self):
+        """Bring the playback console in line after a remote client changed the song."""
+        if not self.playback_state['current_playing']:
+            self._clear_playback_controls()
+        elif not self.control_container.winfo_children():
+            self.show_playback_controls(is_playlist=self.core.is_playlist_mode)
+            self._start_playback_time_updater()
+        else:
+            self._update_now_playing_label()
+            self._start_playback_time_updater()
+
+    def _handle_audio_event(self, event, engine):
+        """Let the core apply an audio engine event, then show its outcome."""
         try:
-            for event in pygame.event.get():
-                if event.type == pygame.USEREVENT + 1:
-                    if self.playback_state.get('autoplay_enabled') and self.playback_state.get('current_playing'):
-                        self.handle_song_end()
-        except Exception as e:
+            result = self.core.handle_audio_event(event, engine)
+        except PlayerError as e:
+            messagebox.showinfo("Info", str(e))
+            return
+        if event[0] == EVENT_ERROR:
+            messagebox.showerror("Error Audio", result)
+        elif event[0] == EVENT_ADVANCED:
+            self._update_now_playing_label()
+        elif result:
+            # Autoplay started the next song
+            self._after_play(*result)
+
+    def _after_play(self, lagu, was_fallback=False):
+        """Refresh the now playing label and time display after the core started a song."""
+        if was_fallback:
+            messagebox.showinfo("Info", f"Tidak ada lagu mirip ditemukan. Memutar lagu acak sebagai fallback.\nMemutar: {lagu}")
+        self._update_now_playing_label()  # Update the label
+        try:
+            self._start_playback_time_updater()
+        except Exception:
             pass
-            
-        self.root.after(100, self.check_music_events)
 
     def _update_now_playing_label(self):
         """Update the now playing label with current song information."""
         if self.now_playing_label and self.playback_state['current_playing']:
             self.now_playing_label.config(text=f"Sedang Memutar: {self.playback_state['current_playing']}")
+        if getattr(self, 'cover_label', None):
+            self._cover_pending = not self._show_cover(
+                self.cover_label, self.playback_state['current_playing'], LARGE_SIZE)
 
     def _start_playback_time_updater(self):
         """Start periodic updater for playback elapsed/total time."""
@@ -725,16 +1527,9 @@ class MusicPlayerGUI:
         """Update the playback_time_label with elapsed/total time."""
         try:
             total = self.playback_state.get('duration_seconds')
-            pos_ms = 0
-            try:
-                import pygame
-                pos_ms = pygame.mixer.music.get_pos()
-            except Exception:
-                pos_ms = -1
-
-            elapsed = 0
-            if pos_ms is not None and pos_ms >= 0:
-                elapsed = int(pos_ms // 1000)
+            # The engine's position model accounts for seeks, pauses and resumes
+            position = get_audio_engine().position.seconds()
+            elapsed = int(position)
 
             def fmt(s):
                 if s is None:
@@ -748,6 +1543,12 @@ class MusicPlayerGUI:
 
             if hasattr(self, 'playback_time_label') and self.playback_time_label:
                 self.playback_time_label.config(text=f"{elapsed_str} / {total_str}")
+            if getattr(self, 'cover_label', None) and self._cover_pending:
+                self._cover_pending = not self._show_cover(
+                    self.cover_label, self.playback_state['current_playing'], LARGE_SIZE)
+            if getattr(self, 'waveform_bar', None):
+                self._refresh_waveform()
+                self.waveform_bar.set_position(position, total)
         except Exception:
             pass
         finally:
@@ -757,105 +1558,46 @@ class MusicPlayerGUI:
             except Exception:
                 self._playback_time_updater_id = None
 
-    def _next_similar(self):
-        """Play the next similar song based on artist or genre."""
-        if not self.playback_state['current_playing']:
-            messagebox.showinfo("Info", "Tidak ada lagu yang sedang diputar.")
-            return
-
-        all_lagu = self.library.get_all_lagu()
-        
-        # Filter only songs with valid file paths
-        valid_lagu = [l for l in all_lagu if l.file_path and l.file_path.strip()]
-        
-        if len(valid_lagu) <= 1:
-            messagebox.showinfo("Info", "Tidak cukup lagu dengan file audio untuk mencari lagu berikutnya.")
-            self.playback_state['is_playing'] = False
+    def _refresh_waveform(self):
+        """Show the current song's peaks once the background worker has them."""
+        bar = self.waveform_bar
+        path = self.playback_state.get('current_file_path')
+        if bar.file_path != path or bar.peaks is None:
+            peaks = self.waveform_worker.peaks(path)
+            if bar.file_path != path or peaks is not None:
+                bar.set_track(path, peaks)
+
+    def _run_playback_action(self, action):
+        """Run a core playback call, reporting 'nothing to play' conditions to the user."""
+        try:
+            result = action()
+        except PlayerError as e:
+            messagebox.showinfo("Info", str(e))
             return
-
-        similar_lagu = []
-        for lagu in valid_lagu:
-            if lagu.id != self.playback_state['current_playing'].id:
-                if lagu.artis == self.playback_state['current_playing'].artis:
-                    similar_lagu.append((lagu, 2))
-                elif lagu.genre == self.playback_state['current_playing'].genre:
-                    similar_lagu.append((lagu, 1))
-
-        similar_lagu.sort(key=lambda x: x[1], reverse=True)
-
-        if similar_lagu:
-            next_lagu = similar_lagu[0][0]
-            # Autoplay: langsung memutar lagu mirip tanpa notifikasi
-            play_file(next_lagu, self.playback_state)
-            self._update_now_playing_label()  # Update the label
-            try:
-                self._start_playback_time_updater()
-            except Exception:
-                pass
+        if isinstance(result, tuple):
+            self._after_play(*result)
         else:
-            fallback_lagu = random.choice([l for l in all_lagu if l.id != self.playback_state['current_playing'].id])
-            messagebox.showinfo("Info", f"Tidak ada lagu mirip ditemukan. Memutar lagu acak sebagai fallback.\nMemutar: {fallback_lagu}")
-            play_file(fallback_lagu, self.playback_state)
-            self._update_now_playing_label()  # Update the label
-            try:
-                self._start_playback_time_updater()
-            except Exception:
-                pass
+            self._after_play(result)
+
+    def _next_similar(self):
+        """Play the next similar song based on artist or genre."""
+        self._run_playback_action(self.core.next_similar)
 
     def _next_in_playlist(self):
         """Play the next song in the current playlist."""
-        if not self.current_playlist or not self.current_playlist_node or not self.current_playlist_node.next:
-            messagebox.showinfo("Info", "Tidak ada lagu berikutnya dalam playlist.")
-            return
-        self.current_playlist_node = self.current_playlist_node.next
-        next_lagu = self.current_playlist_node.data
-        play_file(next_lagu, self.playback_state)
-        self._update_now_playing_label()  # Update the label
-        try:
-            self._start_playback_time_updater()
-        except Exception:
-            pass
+        self._run_playback_action(self.core.next_in_playlist)
 
     def _prev_in_playlist(self):
         """Play the previous song in the current playlist."""
-        if not self.current_playlist or not self.current_playlist_node or not self.current_playlist_node.prev:
-            messagebox.showinfo("Info", "Tidak ada lagu sebelumnya dalam playlist.")
-            return
-        self.current_playlist_node = self.current_playlist_node.prev
-        prev_lagu = self.current_playlist_node.data
-        play_file(prev_lagu, self.playback_state)
-        self._update_now_playing_label()  # Update the label
-        try:
-            self._start_playback_time_updater()
-        except Exception:
-            pass
+        self._run_playback_action(self.core.prev_in_playlist)
 
     def _prev_from_history(self):
         """Play the previous song from playback history."""
-        lagu_sebelumnya = self.playback_state['history'].pop()
-        if lagu_sebelumnya:
-            play_file(lagu_sebelumnya, self.playback_state)
-            self.playback_state['_previous_playing'] = lagu_sebelumnya
-            self._update_now_playing_label()  # Update the label
-            try:
-                self._start_playback_time_updater()
-            except Exception:
-                pass
-        else:
-            messagebox.showinfo("Info", "Tidak ada lagu sebelumnya dalam riwayat.")
+        self._run_playback_action(self.core.prev_from_history)
 
     def _next_in_queue(self):
         """Play the next song from the playback queue."""
-        if self.playback_queue.is_empty():
-            messagebox.showinfo("Info", "Antrian pemutaran kosong.")
-            return
-        lagu_berikutnya = self.playback_queue.dequeue()
-        play_file(lagu_berikutnya, self.playback_state)
-        self._update_now_playing_label()  # Update the label
-        try:
-            self._start_playback_time_updater()
-        except Exception:
-            pass
+        self._run_playback_action(self.core.next_in_queue)
 
     # ========== PLAYLIST MANAGEMENT ==========
     
@@ -872,13 +1614,41 @@ class MusicPlayerGUI:
 
         def create_playlist():
             name = simpledialog.askstring("Buat Playlist", "Masukkan nama playlist baru:")
-            if name and name not in self.playlists:
-                self.playlists[name] = DoublyLinkedList()
-                playlist_listbox.insert(tk.END, name)
-                messagebox.showinfo("Info", f"Playlist '{name}' berhasil dibuat.")
-                save_data(self.library, self.playlists)
-            elif name in self.playlists:
+            if not name:
+                return
+            try:
+                self.core.create_playlist(name)
+            except PlayerError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            playlist_listbox.insert(tk.END, name)
+            messagebox.showinfo("Info", f"Playlist '{name}' berhasil dibuat.")
+            self.core.commit()
+
+        def create_smart_playlist():
+            name = simpledialog.askstring("Buat Smart Playlist", "Masukkan nama smart playlist baru:")
+            if not name:
+                return
+            if name in self.playlists:
                 messagebox.showerror("Error", f"Playlist dengan nama '{name}' sudah ada.")
+                return
+            rules_text = simpledialog.askstring(
+                "Aturan Smart Playlist",
+                "Masukkan aturan (gabungkan dengan 'dan'), contoh:\n"
+                "genre == K-Pop dan tahun >= 2024\n"
+                "play_count > 10\n\n"
+                "Field: id, judul, artis, album, genre, tahun, play_count\n"
+                "Operator: ==, !=, >, >=, <, <=, contains")
+            if not rules_text:
+                return
+            try:
+                smart = self.core.create_smart_playlist(name, rules_text)
+            except PlayerError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            playlist_listbox.insert(tk.END, name)
+            messagebox.showinfo("Info", f"Smart playlist '{name}' berhasil dibuat dengan {smart.size} lagu.")
+            self.core.commit()
 
         def manage_selected_playlist():
             selection = playlist_listbox.curselection()
@@ -889,6 +1659,7 @@ class MusicPlayerGUI:
             self.manage_playlist_details(selected_name)
 
         tk.Button(self.main_frame, text="Buat Playlist Baru", command=create_playlist).pack(pady=5)
+        tk.Button(self.main_frame, text="Buat Smart Playlist", command=create_smart_playlist).pack(pady=5)
         tk.Button(self.main_frame, text="Atur Playlist Terpilih", command=manage_selected_playlist).pack(pady=5)
         
         def delete_selected_playlist():
@@ -900,44 +1671,49 @@ class MusicPlayerGUI:
             confirm = messagebox.askyesno("Konfirmasi Hapus", f"Yakin ingin menghapus playlist '{selected_name}'?")
             if not confirm:
                 return
-            # If the deleted playlist is currently playing, stop playback and reset state
-            try:
-                if self.current_playlist is not None and self.current_playlist == self.playlists.get(selected_name):
-                    stop_file(self.playback_state)
-                    self.playback_state['current_playing'] = None
-                    self.playback_state['current_file_path'] = None
-                    self.playback_state['is_playing'] = False
-                    self.current_playlist = None
-                    self.current_playlist_node = None
-                    self.is_playlist_mode = False
-            except Exception:
-                pass
-            # Remove playlist from internal storage and UI
-            if selected_name in self.playlists:
-                del self.playlists[selected_name]
+            # Stops playback first if the deleted playlist is the one playing
+            self.core.delete_playlist(selected_name)
             playlist_listbox.delete(selection[0])
-            save_data(self.library, self.playlists)
+            self.core.commit()
             messagebox.showinfo("Info", f"Playlist '{selected_name}' berhasil dihapus.")
 
         tk.Button(self.main_frame, text="Hapus Playlist", command=delete_selected_playlist).pack(pady=5)
+
+        status_label = tk.Label(self.main_frame, text="")
+
+        def import_playlist():
+            path = filedialog.askopenfilename(title="Impor Playlist", filetypes=PLAYLIST_FILETYPES)
+            if not path:
+                return
+            default_name = os.path.splitext(os.path.basename(path))[0]
+            name = simpledialog.askstring("Impor Playlist", "Nama playlist tujuan (lagu baru juga masuk library):",
+                                          initialvalue=default_name)
+            if not name or not name.strip():
+                return
+            self._run_import(path, status_label, playlist_name=name.strip(), on_done=self.buat_atur_playlist)
+
+        tk.Button(self.main_frame, text="Impor Playlist", command=import_playlist).pack(pady=5)
+        status_label.pack()
         tk.Button(self.main_frame, text="Kembali ke Menu User", command=self.show_user_menu).pack(pady=10)
 
     def manage_playlist_details(self, playlist_name):
         """Show detailed management interface for a specific playlist."""
         self.clear_frame()
         playlist_obj = self.playlists[playlist_name]
+        is_smart = isinstance(playlist_obj, SmartPlaylist)
         tk.Label(self.main_frame, text=f"Atur Playlist: {playlist_name}", font=("Arial", 14)).pack(pady=10)
+        if is_smart:
+            tk.Label(self.main_frame, text=f"Smart playlist, aturan: {playlist_obj.describe_rules()}").pack()
 
         columns = ("No", "ID", "Judul", "Artis", "Album", "Genre", "Tahun", "File")
         tree = ttk.Treeview(self.main_frame, columns=columns, show='headings', height=10)
         tree.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
 
         for col in columns:
-            tree.heading(col, text=col)
             tree.column(col, width=100, anchor=tk.CENTER)
 
-        for i, lagu in enumerate(playlist_obj.get_as_list(), 1):
-            tree.insert('', tk.END, values=(i, lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.genre, lagu.tahun, lagu.file_path))
+        self.fill_sortable_tree(tree, columns, f'playlist:{playlist_name}', playlist_obj,
+                                playlist_obj.get_as_list, numbered=True)
 
         def add_song_to_playlist():
             add_window = tk.Toplevel(self.root)
@@ -951,11 +1727,9 @@ class MusicPlayerGUI:
             lib_tree.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
 
             for col in lib_columns:
-                lib_tree.heading(col, text=col)
                 lib_tree.column(col, width=100, anchor=tk.CENTER)
 
-            for lagu in self.library.get_all_lagu():
-                lib_tree.insert('', tk.END, values=(lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.genre, lagu.tahun, lagu.file_path))
+            self.fill_sortable_tree(lib_tree, lib_columns, 'library', self.library, self.library.get_all_lagu)
 
             def confirm_add():
                 selected_item = lib_tree.selection()
@@ -965,17 +1739,15 @@ class MusicPlayerGUI:
 
                 item_values = lib_tree.item(selected_item[0], 'values')
                 id_lagu = item_values[0]
-                lagu_target = self.library.find_by_id(id_lagu)
-
-                if lagu_target:
-                    if playlist_obj.find_node_by_lagu_id(lagu_target.id):
-                        messagebox.showwarning("Peringatan", f"Lagu '{lagu_target.judul}' sudah ada di playlist ini.")
-                    else:
-                        playlist_obj.append(lagu_target)
-                        messagebox.showinfo("Info", f"Lagu '{lagu_target.judul}' berhasil ditambahkan ke playlist '{playlist_name}'.")
-                        add_window.destroy()
-                        save_data(self.library, self.playlists)
-                        self.manage_playlist_details(playlist_name)
+                try:
+                    lagu_target = self.core.add_to_playlist(playlist_name, id_lagu)
+                except PlayerError as e:
+                    messagebox.showwarning("Peringatan", str(e))
+                    return
+                messagebox.showinfo("Info", f"Lagu '{lagu_target.judul}' berhasil ditambahkan ke playlist '{playlist_name}'.")
+                add_window.destroy()
+                self.core.commit()
+                self.manage_playlist_details(playlist_name)
 
             tk.Button(add_window, text="Tambah ke Playlist", command=confirm_add).pack(pady=10)
             tk.Button(add_window, text="Batal", command=add_window.destroy).pack(pady=5)
@@ -988,23 +1760,19 @@ class MusicPlayerGUI:
 
             item_values = tree.item(selected_item[0], 'values')
             id_lagu = item_values[1]
-            node_to_remove = playlist_obj.find_node_by_lagu_id(id_lagu)
+            lagu_dihapus = self.core.remove_from_playlist(playlist_name, id_lagu)
 
-            if node_to_remove:
-                lagu_dihapus = node_to_remove.data
-                playlist_obj.remove_node(node_to_remove)
+            if lagu_dihapus:
                 messagebox.showinfo("Info", f"Lagu '{lagu_dihapus.judul}' berhasil dihapus dari playlist '{playlist_name}'.")
-                save_data(self.library, self.playlists)
+                self.core.commit()
                 self.manage_playlist_details(playlist_name)
 
         def play_this_playlist():
-            if playlist_obj.size == 0:
-                messagebox.showwarning("Peringatan", "Playlist kosong. Tidak ada lagu untuk diputar.")
+            try:
+                first_lagu = self.core.play_playlist(playlist_name)
+            except PlayerError as e:
+                messagebox.showwarning("Peringatan", str(e))
                 return
-            self.current_playlist = playlist_obj
-            self.current_playlist_node = playlist_obj.head
-            first_lagu = self.current_playlist_node.data
-            play_file(first_lagu, self.playback_state)
             messagebox.showinfo("Info", f"Sedang memutar playlist: {playlist_name}\nSedang memutar lagu pertama: {first_lagu}")
             self.show_playback_controls(is_playlist=True)
             try:
@@ -1012,9 +1780,19 @@ class MusicPlayerGUI:
             except Exception:
                 pass
 
-        tk.Button(self.main_frame, text="Tambah Lagu ke Playlist", command=add_song_to_playlist).pack(side=tk.LEFT, padx=5, pady=10)
-        tk.Button(self.main_frame, text="Hapus Lagu dari Playlist", command=remove_song_from_playlist).pack(side=tk.LEFT, padx=5, pady=10)
+        if not is_smart:
+            # Smart playlist contents follow their rules, so manual edits are not offered
+            tk.Button(self.main_frame, text="Tambah Lagu ke Playlist", command=add_song_to_playlist).pack(side=tk.LEFT, padx=5, pady=10)
+            tk.Button(self.main_frame, text="Hapus Lagu dari Playlist", command=remove_song_from_playlist).pack(side=tk.LEFT, padx=5, pady=10)
         tk.Button(self.main_frame, text="Putar Playlist Ini", command=play_this_playlist).pack(side=tk.LEFT, padx=5, pady=10)
+
+        def export_this_playlist():
+            path = filedialog.asksaveasfilename(title="Ekspor Playlist", defaultextension=".m3u",
+                                                initialfile=f"{playlist_name}.m3u", filetypes=PLAYLIST_FILETYPES)
+            if path:
+                self._export_to(playlist_obj, path)
+
+        tk.Button(self.main_frame, text="Ekspor Playlist", command=export_this_playlist).pack(side=tk.LEFT, padx=5, pady=10)
         tk.Button(self.main_frame, text="Kembali ke Atur Playlist", command=self.buat_atur_playlist).pack(pady=10)
 
     # ========== QUEUE AND HISTORY VIEWS ==========
@@ -1024,7 +1802,7 @@ class MusicPlayerGUI:
         self.clear_frame()
         tk.Label(self.main_frame, text="Antrian Pemutaran", font=("Arial", 14)).pack(pady=10)
 
-        if self.playback_queue.is_empty():
+        if self.core.playback_queue.is_empty():
             tk.Label(self.main_frame, text="Antrian kosong.").pack(pady=20)
         else:
             columns = ("No", "ID", "Judul", "Artis", "Album", "Genre", "Tahun", "File")
@@ -1035,7 +1813,7 @@ class MusicPlayerGUI:
                 tree.heading(col, text=col)
                 tree.column(col, width=100, anchor=tk.CENTER)
 
-            for i, lagu in enumerate(list(self.playback_queue.items), 1):
+            for i, lagu in enumerate(list(self.core.playback_queue.items), 1):
                 tree.insert('', tk.END, values=(i, lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.genre, lagu.tahun, lagu.file_path))
 
         tk.Button(self.main_frame, text="Kembali ke Menu User", command=self.show_user_menu).pack(pady=10)
@@ -1060,3 +1838,43 @@ class MusicPlayerGUI:
                 tree.insert('', tk.END, values=(i, lagu.id, lagu.judul, lagu.artis, lagu.album, lagu.genre, lagu.tahun, lagu.file_path))
 
         tk.Button(self.main_frame, text="Kembali ke Menu User", command=self.show_user_menu).pack(pady=10)
+
+    def lihat_statistik(self):
+        """Display play statistics read straight from the running aggregates."""
+        self.clear_frame()
+        tk.Label(self.main_frame, text="Statistik Pemutaran", font=("Arial", 14)).pack(pady=10)
+
+        stats = self.core.play_stats
+        total_menit = int(stats.total_listen_seconds // 60)
+        tk.Label(self.main_frame, text=f"Total diputar: {stats.total_plays} kali  |  "
+                                       f"Total waktu dengar: {total_menit} menit  |  "
+                                       f"Dilewati: {stats.total_skips} kali").pack(pady=5)
+
+        tk.Label(self.main_frame, text="Lagu Terpopuler").pack(pady=(10, 0))
+        columns = ("No", "ID", "Judul", "Artis", "Diputar", "Waktu Dengar", "Dilewati")
+        tree = ttk.Treeview(self.main_frame, columns=columns, show='headings', height=8)
+        tree.pack(padx=20, pady=5, fill=tk.BOTH, expand=True)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=100, anchor=tk.CENTER)
+        for i, (id_lagu, song) in enumerate(stats.top_songs(10), 1):
+            menit, detik = divmod(int(song.listen_seconds), 60)
+            tree.insert('', tk.END, values=(i, id_lagu, song.judul, song.artis, song.play_count,
+                                            f"{menit:02d}:{detik:02d}", song.skips))
+
+        bottom_frame = tk.Frame(self.main_frame)
+        bottom_frame.pack(padx=20, pady=5, fill=tk.BOTH, expand=True)
+
+        for title, rows in (("Artis Terpopuler", stats.top_artists(10)), ("Genre Terpopuler", stats.top_genres(10))):
+            frame = tk.Frame(bottom_frame)
+            frame.pack(side=tk.LEFT, padx=10, fill=tk.BOTH, expand=True)
+            tk.Label(frame, text=title).pack()
+            sub_tree = ttk.Treeview(frame, columns=("Nama", "Diputar"), show='headings', height=6)
+            sub_tree.pack(fill=tk.BOTH, expand=True)
+            for col in ("Nama", "Diputar"):
+                sub_tree.heading(col, text=col)
+                sub_tree.column(col, width=120, anchor=tk.CENTER)
+            for name, count in rows:
+                sub_tree.insert('', tk.END, values=(name, count))
+
+        tk.Button(self.main_frame, text="Kembali ke Menu User", command=self.show_user_menu).pack(pady=10)
@@ -0,0 +1,250 @@
+"""
+Import and Export for Music Player Application
+Streams the library or a playlist to M3U/M3U8, CSV or JSON Lines one song
+at a time, and imports those formats in batches through the core. Existing
+songs are matched by ID or file path through an index built in one pass, so
+large files are processed in bounded memory and without per-song list scans.
+"""
+
+import csv
+import json
+import os
+
+import instrumentation
+from instrumentation import traced
+from models import Lagu, SmartPlaylist
+from paths import normalize_path, portable_path, resolve_path
+
+FIELDS = ('id', 'judul', 'artis', 'album', 'genre', 'tahun', 'file_path', 'durasi')
+FORMATS = {'.m3u': 'm3u', '.m3u8': 'm3u', '.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+IMPORT_BATCH_SIZE = 1000
+IMPORTED_ID_PREFIX = "IMP"
+
+
+def detect_format(path):
+    """Return 'm3u', 'csv' or 'jsonl' based on the file extension."""
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Format file '{path}' tidak dikenali (gunakan .m3u, .m3u8, .csv atau .jsonl).")
+    return fmt
+
+
+# ========== EXPORT ==========
+
+@traced("persistence.export")
+def export_songs(songs, path, fmt=None):
+    """
+    Write songs to a file as they are iterated.
+
+    Args:
+        songs: Any iterable of Lagu (a SinglyLinkedList/DoublyLinkedList
+            iterates its nodes directly, nothing is copied)
+        path: Output file
+        fmt: 'm3u', 'csv' or 'jsonl' (default: from the extension)
+
+    Returns:
+        int: Number of songs written
+    """
+    fmt = fmt or detect_format(path)
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'm3u':
+            f.write("#EXTM3U\n")
+            for lagu in songs:
+                if not lagu.file_path:
+                    continue  # an M3U entry is a path; songs without a file cannot be listed
+                durasi = lagu.durasi if lagu.durasi is not None else -1
+                f.write(f"#EXTINF:{durasi},{lagu.artis} - {lagu.judul}\n")
+                f.write(f"#EXTALB:{lagu.album}\n#EXTGENRE:{lagu.genre}\n")
+                f.write(f"{lagu.audio_path}\n")  # where the file is on this host
+                written += 1
+        elif fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for lagu in songs:
+                writer.writerow([getattr(lagu, field) if getattr(lagu, field) is not None else ''
+                                 for field in FIELDS])
+                written += 1
+        else:
+            for lagu in songs:
+                f.write(json.dumps({field: getattr(lagu, field) for field in FIELDS}, ensure_ascii=False))
+                f.write("\n")
+                written += 1
+    print(f"{written} lagu diekspor ke {path}")
+    return written
+
+
+# ========== IMPORT ==========
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _read_m3u(path):
+    base = os.path.dirname(os.path.abspath(path))
+    info = {}
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line == "#EXTM3U":
+                continue
+            if line.startswith("#EXTINF:"):
+                durasi, _, title = line[len("#EXTINF:"):].partition(',')
+                artis, sep, judul = title.partition(' - ')
+                info = {'durasi': _int_or_none(durasi), 'judul': judul if sep else title,
+                        'artis': artis if sep else ''}
+            elif line.startswith("#EXTALB:"):
+                info['album'] = line[len("#EXTALB:"):]
+            elif line.startswith("#EXTGENRE:"):
+                info['genre'] = line[len("#EXTGENRE:"):]
+            elif line.startswith("#"):
+                continue
+            else:
+                file_path = line if os.path.isabs(line) else os.path.normpath(os.path.join(base, line))
+                info['file_path'] = file_path
+                yield info
+                info = {}
+
+
+def _read_csv(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            yield row
+
+
+def _read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Baris {number} di {path} dilewati: bukan JSON yang valid")
+
+
+READERS = {'m3u': _read_m3u, 'csv': _read_csv, 'jsonl': _read_jsonl}
+
+
+class ImportResult:
+    """Running totals of an import."""
+
+    def __init__(self):
+        self.added = 0  # new songs put into the library
+        self.matched = 0  # records resolved to songs already in the library
+        self.skipped = 0  # records without enough data to become a song
+        self.playlist_added = 0
+
+    def __str__(self):
+        return (f"{self.added} lagu baru, {self.matched} lagu sudah ada, "
+                f"{self.skipped} dilewati")
+
+
+class _SongIndex:
+    """ID and path lookups over the library, built in a single pass."""
+
+    def __init__(self, library):
+        self.by_id = {}
+        self.by_path = {}
+        for lagu in library:
+            self.add(lagu)
+        self._next_number = len(self.by_id) + 1
+
+    def add(self, lagu, path_key=None):
+        self.by_id[lagu.id] = lagu
+        path_key = path_key or normalize_path(lagu.audio_path)
+        if path_key:
+            self.by_path.setdefault(path_key, lagu)
+
+    def find(self, id_lagu, path_key):
+        return self.by_id.get(id_lagu) or self.by_path.get(path_key)
+
+    def new_id(self):
+        while f"{IMPORTED_ID_PREFIX}{self._next_number:06d}" in self.by_id:
+            self._next_number += 1
+        return f"{IMPORTED_ID_PREFIX}{self._next_number:06d}"
+
+
+def _record_to_lagu(record, index):
+    file_path = portable_path((record.get('file_path') or '').strip()) or None
+    judul = (record.get('judul') or '').strip()
+    if not judul and file_path:
+        judul = os.path.splitext(os.path.basename(file_path))[0]
+    if not judul:
+        return None
+    id_lagu = str(record.get('id') or '').strip() or index.new_id()
+    return Lagu(id_lagu, judul, (record.get('artis') or '').strip() or "Tidak diketahui",
+                (record.get('album') or '').strip() or "Tidak diketahui",
+                (record.get('genre') or '').strip() or "Tidak diketahui",
+                _int_or_none(record.get('tahun')) or 0, file_path, _int_or_none(record.get('durasi')))
+
+
+def iter_import(core, path, playlist_name=None, batch_size=IMPORT_BATCH_SIZE, fmt=None):
+    """
+    Import a file batch by batch, yielding the running ImportResult after each
+    committed batch (the GUI steps through it between Tk events).
+
+    Records are matched to existing songs by ID, then by file path. Unknown
+    songs are added to the library; with playlist_name, every resolved song
+    is also appended to that playlist (created if missing), skipping songs
+    it already contains.
+    """
+    reader = READERS[fmt or detect_format(path)]
+    index = _SongIndex(core.library)
+    playlist = None
+    in_playlist = set()
+    if playlist_name:
+        playlist = core.playlists.get(playlist_name)
+        if playlist is None:
+            playlist = core.create_playlist(playlist_name)
+        elif isinstance(playlist, SmartPlaylist):
+            raise ValueError(f"'{playlist_name}' adalah smart playlist; isinya mengikuti aturan.")
+        in_playlist = {lagu.id for lagu in playlist}
+
+    result = ImportResult()
+    new_songs = []
+    playlist_songs = []
+
+    def commit():
+        with instrumentation.span("persistence.import_batch", songs=len(new_songs)):
+            core.add_songs(new_songs)
+            if playlist_songs:
+                core.extend_playlist(playlist_name, playlist_songs)
+        new_songs.clear()
+        playlist_songs.clear()
+
+    for record in reader(path):
+        path_key = normalize_path(resolve_path((record.get('file_path') or '').strip()))
+        lagu = index.find(str(record.get('id') or '').strip(), path_key)
+        if lagu is None:
+            lagu = _record_to_lagu(record, index)
+            if lagu is None:
+                result.skipped += 1
+                continue
+            index.add(lagu, path_key)
+            new_songs.append(lagu)
+            result.added += 1
+        else:
+            result.matched += 1
+        if playlist is not None and lagu.id not in in_playlist:
+            in_playlist.add(lagu.id)
+            playlist_songs.append(lagu)
+            result.playlist_added += 1
+        if len(new_songs) + len(playlist_songs) >= batch_size:
+            commit()
+            yield result
+    commit()
+    yield result
+
+
+def import_file(core, path, playlist_name=None, batch_size=IMPORT_BATCH_SIZE, fmt=None):
+    """Run a whole import and return the final ImportResult."""
+    result = None
+    for result in iter_import(core, path, playlist_name, batch_size, fmt):
+        pass
+    print(f"Impor {path}: {result}")
+    return result
@@ -0,0 +1,261 @@
+"""
+Instrumentation for Music Player Application
+Timing spans, counters and latency histograms for the persistence, search,
+render and playback hot paths, a Tk event-loop lag monitor, and export of
+the recorded spans in Chrome trace format (chrome://tracing, Perfetto).
+
+Everything is off unless MUSICPLAYER_TRACE=1 is set or enable() is called.
+While disabled, span() returns a shared no-op context manager and traced()
+functions call straight through, so the cost is one flag check per call.
+"""
+
+import collections
+import functools
+import json
+import os
+import threading
+import time
+
+MAX_TRACE_EVENTS = 200000  # oldest spans are dropped beyond this
+LAG_INTERVAL_MS = 100  # how often the Tk lag monitor schedules itself
+LAG_REPORT_MS = 50  # lag above this is also written to the trace
+
+_enabled = os.environ.get('MUSICPLAYER_TRACE', '') not in ('', '0')
+_lock = threading.Lock()
+_events = collections.deque(maxlen=MAX_TRACE_EVENTS)
+_counters = collections.Counter()
+_histograms = {}
+_origin = time.perf_counter()
+_pid = os.getpid()
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable():
+    """Start recording spans, counters and histograms."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop recording; data recorded so far is kept until reset()."""
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """Drop every recorded span, counter and histogram."""
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _histograms.clear()
+
+
+class Histogram:
+    """Latency histogram with power-of-two millisecond buckets."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = collections.Counter()  # upper bound in ms -> samples
+
+    def record(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        bound = 0.125
+        while bound < ms:
+            bound *= 2
+        self.buckets[bound] += 1
+
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile_ms(self, fraction):
+        """Upper bucket bound below which `fraction` of the samples fall."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound in sorted(self.buckets):
+            seen += self.buckets[bound]
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+def count(name, n=1):
+    """Increment a named counter."""
+    if _enabled:
+        with _lock:
+            _counters[name] += n
+
+
+def observe(name, ms):
+    """Add a latency sample (milliseconds) to a named histogram."""
+    if _enabled:
+        with _lock:
+            _histogram(name).record(ms)
+
+
+def _histogram(name):
+    hist = _histograms.get(name)
+    if hist is None:
+        hist = _histograms[name] = Histogram()
+    return hist
+
+
+def _record_span(name, category, start, end, args):
+    duration_ms = (end - start) * 1000.0
+    event = {
+        'name': name, 'cat': category, 'ph': 'X', 'pid': _pid,
+        'tid': threading.get_ident(),
+        'ts': round((start - _origin) * 1e6, 1),
+        'dur': round(duration_ms * 1000.0, 1),
+    }
+    if args:
+        event['args'] = args
+    with _lock:
+        _events.append(event)
+        _counters[name] += 1
+        _histogram(name).record(duration_ms)
+
+
+class _Span:
+    __slots__ = ('name', 'category', 'args', 'start')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args = dict(self.args or {}, error=exc_type.__name__)
+        _record_span(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, category=None, **args):
+    """
+    Time a block of code:
+
+        with instrumentation.span("render.treeview", rows=n):
+            ...
+
+    The category defaults to the part of the name before the first dot.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, category or name.split('.', 1)[0], args)
+
+
+def traced(name, category=None):
+    """Decorator form of span() for whole functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, category or name.split('.', 1)[0], None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summary():
+    """
+    Return (counters, histograms) snapshots for display.
+
+    histograms is a list of (name, count, mean_ms, p50_ms, p95_ms, max_ms)
+    sorted by total time spent, most expensive first.
+    """
+    with _lock:
+        counters = dict(_counters)
+        rows = [(name, h.count, h.mean_ms(), h.percentile_ms(0.5), h.percentile_ms(0.95), h.max_ms, h.total_ms)
+                for name, h in _histograms.items()]
+    rows.sort(key=lambda row: row[6], reverse=True)
+    return counters, [row[:6] for row in rows]
+
+
+def export_chrome_trace(path):
+    """
+    Write the recorded spans plus final counter values as a Chrome trace JSON file.
+
+    Returns:
+        int: Number of events written
+    """
+    with _lock:
+        events = list(_events)
+        counters = dict(_counters)
+    now_us = round((time.perf_counter() - _origin) * 1e6, 1)
+    events.extend({'name': name, 'ph': 'C', 'pid': _pid, 'tid': 0, 'ts': now_us, 'args': {'value': value}}
+                  for name, value in counters.items())
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return len(events)
+
+
+class TkLagMonitor:
+    """
+    Measures Tk event-loop responsiveness.
+
+    A callback is scheduled every LAG_INTERVAL_MS; how late it actually runs
+    is recorded in the "tk.lag" histogram, and lags above LAG_REPORT_MS
+    appear as "tk.hitch" spans in the trace. The monitor stops rescheduling
+    itself while instrumentation is disabled.
+    """
+
+    def __init__(self, root, interval_ms=LAG_INTERVAL_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._expected = None
+        self._after_id = None
+
+    def start(self):
+        if self._after_id is None:
+            self._schedule()
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _schedule(self):
+        self._expected = time.perf_counter() + self.interval_ms / 1000.0
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        self._after_id = None
+        if not _enabled:
+            return
+        now = time.perf_counter()
+        lag_ms = max(0.0, (now - self._expected) * 1000.0)
+        observe('tk.lag', lag_ms)
+        if lag_ms > LAG_REPORT_MS:
+            _record_span('tk.hitch', 'tk', self._expected, now, {'lag_ms': round(lag_ms, 1)})
+        self._schedule()
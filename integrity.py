@@ -0,0 +1,211 @@
+"""
+Library Integrity for Music Player Application
+AvailabilityMonitor checks in the background, in batches, whether the audio
+file of every song is on disk, and caches each answer with the time it was
+checked. Playback pickers consult that cache with a dictionary lookup, so
+autoplay skips missing files instead of failing on them. check_integrity()
+verifies that playlists, the queue and the history only reference songs
+that are in the library.
+"""
+
+import os
+import pickle
+import queue
+import threading
+import time
+
+from instrumentation import traced
+
+AVAILABILITY_FILE = "music_player_availability"
+BATCH_SIZE = 256  # files checked per batch
+BATCH_PAUSE = 0.05  # seconds between batches, so a full sweep never saturates the disk
+RECHECK_INTERVAL = 15 * 60  # seconds before a cached answer is checked again
+
+
+class AvailabilityMonitor(threading.Thread):
+    """Background worker that keeps a cache of which song files exist."""
+
+    def __init__(self, path=AVAILABILITY_FILE, recheck_interval=RECHECK_INTERVAL):
+        super().__init__(name="AvailabilityMonitor", daemon=True)
+        self.path = path
+        self.recheck_interval = recheck_interval
+        self._pending = queue.Queue()
+        self._queued_paths = set()
+        self._changes = queue.Queue()
+        self._lock = threading.Lock()
+        self.status = {}  # file path -> (available, checked_at)
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                self.status = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Cache ketersediaan file tidak dapat dibaca, dibuat ulang: {e}")
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            status = dict(self.status)
+            self._dirty = False
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(status, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saat menyimpan cache ketersediaan file: {e}")
+
+    def submit(self, lagu, force=False):
+        """Queue a song's file for checking unless its cached answer is still fresh."""
+        path = lagu.audio_path
+        if path:
+            self._submit_path(path, force)
+
+    def submit_many(self, songs, force=False):
+        for lagu in songs:
+            self.submit(lagu, force)
+
+    def _submit_path(self, file_path, force=False):
+        with self._lock:
+            if file_path in self._queued_paths:
+                return
+            entry = self.status.get(file_path)
+            if not force and entry is not None and time.time() - entry[1] < self.recheck_interval:
+                return
+            self._queued_paths.add(file_path)
+        self._pending.put(file_path)
+
+    def available(self, file_path):
+        """
+        Cached availability of a file: True, False, or None if it has not
+        been checked yet. Never touches the disk; safe on the UI thread.
+        """
+        with self._lock:
+            entry = self.status.get(file_path)
+        return entry[0] if entry is not None else None
+
+    def missing_paths(self):
+        """Paths last seen missing."""
+        with self._lock:
+            return {path for path, (available, _) in self.status.items() if not available}
+
+    def drain_changes(self):
+        """Return (file_path, available) for files that appeared or disappeared, without blocking."""
+        changes = []
+        while True:
+            try:
+                changes.append(self._changes.get_nowait())
+            except queue.Empty:
+                return changes
+
+    def _check(self, file_path):
+        entry = (os.path.isfile(file_path), time.time())
+        with self._lock:
+            previous = self.status.get(file_path)
+            self.status[file_path] = entry
+            self._dirty = True
+        if previous is not None and previous[0] != entry[0]:
+            self._changes.put((file_path, entry[0]))
+
+    def _requeue_stale(self):
+        cutoff = time.time() - self.recheck_interval
+        with self._lock:
+            stale = [path for path, (_, checked_at) in self.status.items() if checked_at < cutoff]
+        for path in stale:
+            self._submit_path(path)
+
+    def run(self):
+        while True:
+            try:
+                batch = [self._pending.get(timeout=self.recheck_interval)]
+            except queue.Empty:
+                self._requeue_stale()
+                continue
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            for file_path in batch:
+                try:
+                    self._check(file_path)
+                except Exception as e:
+                    print(f"Error saat memeriksa file {file_path}: {e}")
+                finally:
+                    with self._lock:
+                        self._queued_paths.discard(file_path)
+            if self._pending.empty():
+                self.save()
+            time.sleep(BATCH_PAUSE)
+
+
+class IntegrityReport:
+    """Problems found by check_integrity()."""
+
+    def __init__(self):
+        self.duplicate_ids = []  # IDs used by more than one library song
+        self.orphans = []  # (where, song id): entries whose song is not in the library
+        self.stale = []  # (where, song id): entries holding another copy of a library song
+        self.missing_files = []  # Lagu whose file was last seen missing
+        self.unchecked = 0  # songs whose file has not been checked yet
+        self.without_file = 0  # songs without a file path
+
+    def is_clean(self):
+        return not (self.duplicate_ids or self.orphans or self.stale or self.missing_files)
+
+    def __str__(self):
+        lines = [f"{len(self.missing_files)} file audio tidak ditemukan",
+                 f"{self.without_file} lagu tanpa file audio"]
+        if self.unchecked:
+            lines.append(f"{self.unchecked} file belum diperiksa")
+        lines.append(f"{len(self.orphans)} referensi ke lagu yang sudah tidak ada di library")
+        lines.append(f"{len(self.stale)} referensi ke salinan lama lagu")
+        if self.duplicate_ids:
+            lines.append(f"ID ganda di library: {', '.join(sorted(set(self.duplicate_ids)))}")
+        return "\n".join(lines)
+
+
+@traced("integrity.check")
+def check_integrity(core, monitor=None):
+    """
+    Check the library and every container that references it.
+
+    Args:
+        core: MusicPlayerCore
+        monitor: Optional AvailabilityMonitor whose cache reports missing files
+
+    Returns:
+        IntegrityReport
+    """
+    report = IntegrityReport()
+    index = {}
+    for lagu in core.library:
+        if lagu.id in index:
+            report.duplicate_ids.append(lagu.id)
+        else:
+            index[lagu.id] = lagu
+        if not lagu.file_path or not str(lagu.file_path).strip():
+            report.without_file += 1
+        elif monitor is not None:
+            available = monitor.available(lagu.audio_path)
+            if available is None:
+                report.unchecked += 1
+            elif not available:
+                report.missing_files.append(lagu)
+
+    sharded = hasattr(core.library, 'shard_of')
+    for where, songs in core.song_references():
+        for lagu in songs:
+            library_lagu = index.get(lagu.id)
+            if library_lagu is None and sharded:
+                library_lagu = core.library.find_by_id(lagu.id)  # inactive shards
+            if library_lagu is None:
+                report.orphans.append((where, lagu.id))
+            elif library_lagu is not lagu:
+                report.stale.append((where, lagu.id))
+    return report
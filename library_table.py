@@ -0,0 +1,154 @@
+"""
+Columnar Library Table for Music Player Application
+Keeps the library in column form (year, duration and dictionary-encoded
+artist/album/genre codes) so analytic filters run as vectorized masks
+instead of walking Lagu objects one attribute at a time.
+"""
+
+from array import array
+
+np = None  # NumPy module once imported; it is optional and loaded on first use
+_numpy_checked = False
+
+
+def _load_numpy():
+    """Import NumPy the first time a table is built (it costs ~90 ms at startup)."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # array-based loops are used instead
+            np = None
+    return np
+
+UNKNOWN = -1  # stored for missing years/durations and for values not in a dictionary
+
+
+class LibraryTable:
+    """Column-oriented snapshot of the library with vectorized filtering."""
+
+    ENCODED_COLUMNS = ('artis', 'album', 'genre')
+
+    def __init__(self, songs, version=None):
+        _load_numpy()
+        self.rows = list(songs)  # row index -> Lagu
+        self.version = version  # library version this snapshot was built from
+        self.dictionaries = {name: {} for name in self.ENCODED_COLUMNS}  # value -> code
+        self.values = {name: [] for name in self.ENCODED_COLUMNS}  # code -> value
+
+        tahun = array('i')
+        durasi = array('i')
+        has_file = array('b')
+        codes = {name: array('i') for name in self.ENCODED_COLUMNS}
+        for lagu in self.rows:
+            tahun.append(lagu.tahun if isinstance(lagu.tahun, int) else UNKNOWN)
+            durasi.append(lagu.durasi if isinstance(lagu.durasi, int) else UNKNOWN)
+            has_file.append(1 if lagu.file_path and str(lagu.file_path).strip() else 0)
+            for name in self.ENCODED_COLUMNS:
+                codes[name].append(self._encode(name, getattr(lagu, name)))
+
+        if np is not None:
+            self.tahun = np.frombuffer(tahun, dtype=np.int32) if tahun else np.zeros(0, np.int32)
+            self.durasi = np.frombuffer(durasi, dtype=np.int32) if durasi else np.zeros(0, np.int32)
+            self.has_file = np.frombuffer(has_file, dtype=np.int8).astype(bool) if has_file else np.zeros(0, bool)
+            self.codes = {name: np.frombuffer(col, dtype=np.int32) if col else np.zeros(0, np.int32)
+                          for name, col in codes.items()}
+        else:
+            self.tahun, self.durasi, self.has_file, self.codes = tahun, durasi, has_file, codes
+
+    @classmethod
+    def from_library(cls, library):
+        """Build a table from a SinglyLinkedList (or any object with get_all_lagu)."""
+        return cls(library.get_all_lagu(), getattr(library, 'version', None))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _encode(self, name, value):
+        dictionary = self.dictionaries[name]
+        code = dictionary.get(value)
+        if code is None:
+            code = len(self.values[name])
+            dictionary[value] = code
+            self.values[name].append(value)
+        return code
+
+    def _codes_for(self, name, wanted):
+        """Translate a value (or collection of values) to the set of known codes."""
+        if isinstance(wanted, (str, int)) or wanted is None:
+            wanted = (wanted,)
+        dictionary = self.dictionaries[name]
+        return {dictionary[value] for value in wanted if value in dictionary}
+
+    def filter(self, tahun_min=None, tahun_max=None, durasi_min=None, durasi_max=None,
+               has_file=None, **encoded):
+        """
+        Return the row indices matching every given condition.
+
+        Args:
+            tahun_min, tahun_max: inclusive year range
+            durasi_min, durasi_max: inclusive duration range in seconds
+            has_file: only rows with (True) or without (False) a file path
+            **encoded: artis/album/genre, each a single value or a collection of values
+
+        Returns:
+            List of row indices, in library order; use songs() to map them back
+        """
+        for name in encoded:
+            if name not in self.ENCODED_COLUMNS:
+                raise KeyError(f"Kolom '{name}' tidak dapat difilter")
+        code_sets = {name: self._codes_for(name, wanted) for name, wanted in encoded.items()}
+        if any(not codes for codes in code_sets.values()):
+            return []
+        if np is not None:
+            return self._filter_numpy(tahun_min, tahun_max, durasi_min, durasi_max, has_file, code_sets)
+        return self._filter_arrays(tahun_min, tahun_max, durasi_min, durasi_max, has_file, code_sets)
+
+    def _filter_numpy(self, tahun_min, tahun_max, durasi_min, durasi_max, has_file, code_sets):
+        mask = np.ones(len(self.rows), dtype=bool)
+        if tahun_min is not None:
+            mask &= self.tahun >= tahun_min
+        if tahun_max is not None:
+            mask &= (self.tahun <= tahun_max) & (self.tahun != UNKNOWN)
+        if durasi_min is not None:
+            mask &= self.durasi >= durasi_min
+        if durasi_max is not None:
+            mask &= (self.durasi <= durasi_max) & (self.durasi != UNKNOWN)
+        if has_file is not None:
+            mask &= self.has_file if has_file else ~self.has_file
+        for name, codes in code_sets.items():
+            column = self.codes[name]
+            if len(codes) == 1:
+                mask &= column == next(iter(codes))
+            else:
+                mask &= np.isin(column, np.fromiter(codes, dtype=np.int32))
+        return np.flatnonzero(mask).tolist()
+
+    def _filter_arrays(self, tahun_min, tahun_max, durasi_min, durasi_max, has_file, code_sets):
+        indices = range(len(self.rows))
+        # Narrow with the dictionary-encoded columns first, then refine
+        for name, codes in code_sets.items():
+            column = self.codes[name]
+            indices = [i for i in indices if column[i] in codes]
+        if tahun_min is not None:
+            indices = [i for i in indices if self.tahun[i] >= tahun_min]
+        if tahun_max is not None:
+            indices = [i for i in indices if UNKNOWN != self.tahun[i] <= tahun_max]
+        if durasi_min is not None:
+            indices = [i for i in indices if self.durasi[i] >= durasi_min]
+        if durasi_max is not None:
+            indices = [i for i in indices if UNKNOWN != self.durasi[i] <= durasi_max]
+        if has_file is not None:
+            indices = [i for i in indices if bool(self.has_file[i]) == has_file]
+        return list(indices)
+
+    def songs(self, indices):
+        """Map row indices back to Lagu objects."""
+        rows = self.rows
+        return [rows[i] for i in indices]
+
+    def count_with_file(self):
+        """Count songs that have an audio file path."""
+        return int(self.has_file.sum()) if np is not None else sum(self.has_file)
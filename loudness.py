@@ -0,0 +1,142 @@
+"""
+Loudness Normalization for Music Player Application
+Measures each file once in a background thread and stores a ReplayGain-style
+gain (in dB) on the song, so playback only applies a cached volume scalar.
+The mixer cannot amplify, so playback levels tracks at PLAYBACK_REFERENCE_DBFS,
+below the analysis target: typical material is turned down to it rather
+than left unraised. Only tracks quieter than the reference play unchanged.
+"""
+
+import math
+import os
+import queue
+import threading
+from array import array
+
+from instrumentation import traced
+
+TARGET_DBFS = -14.0  # RMS loudness the stored gains are measured against
+PLAYBACK_REFERENCE_DBFS = -20.0  # RMS loudness playback levels tracks at
+MAX_GAIN_DB = 12.0  # limits for the stored gain
+MIN_GAIN_DB = -24.0
+SAMPLE_STRIDE = 16  # analyse every Nth sample; plenty for an RMS estimate
+
+# mixer sample size -> (array typecode, zero offset, full scale)
+_SAMPLE_FORMATS = {
+    -16: ('h', 0, 32768.0),
+    16: ('H', 32768, 32768.0),
+    -8: ('b', 0, 128.0),
+    8: ('B', 128, 128.0),
+    32: ('f', 0, 1.0),
+}
+
+
+def decode_samples(file_path):
+    """
+    Decode an audio file with the initialized mixer.
+
+    Returns:
+        Tuple (array of samples, zero offset, full scale, mixer format as
+        returned by pygame.mixer.get_init()), or None if it cannot be decoded
+    """
+    import pygame  # only needed on the analysis threads
+
+    mixer_format = pygame.mixer.get_init()
+    if not mixer_format or mixer_format[1] not in _SAMPLE_FORMATS:
+        return None
+    typecode, offset, full_scale = _SAMPLE_FORMATS[mixer_format[1]]
+    try:
+        raw = pygame.mixer.Sound(file_path).get_raw()
+    except (pygame.error, FileNotFoundError) as e:
+        print(f"Gagal mendekode {file_path}: {e}")
+        return None
+
+    samples = array(typecode)
+    samples.frombytes(raw[:len(raw) - len(raw) % samples.itemsize])
+    return samples, offset, full_scale, mixer_format
+
+
+@traced("loudness.analyse")
+def analyse_track_gain(file_path):
+    """
+    Decode an audio file and compute the gain needed to reach TARGET_DBFS.
+
+    Args:
+        file_path: Path to the audio file
+
+    Returns:
+        float: Gain in dB, or None if the file cannot be analysed
+    """
+    decoded = decode_samples(file_path)
+    if decoded is None:
+        return None
+    samples, offset, full_scale, _ = decoded
+    picked = samples[::SAMPLE_STRIDE]
+    del samples
+    if not picked:
+        return None
+    mean_square = sum((s - offset) * (s - offset) for s in picked) / len(picked)
+    if mean_square <= 0:
+        return 0.0
+    rms_dbfs = 10 * math.log10(mean_square / (full_scale * full_scale))
+    return round(max(MIN_GAIN_DB, min(MAX_GAIN_DB, TARGET_DBFS - rms_dbfs)), 2)
+
+
+def gain_to_scalar(gain_db):
+    """
+    Convert a stored gain in dB to a mixer volume multiplier (at most 1.0),
+    shifted from TARGET_DBFS down to PLAYBACK_REFERENCE_DBFS.
+    """
+    if gain_db is None:
+        return 1.0
+    return min(1.0, 10 ** ((gain_db + PLAYBACK_REFERENCE_DBFS - TARGET_DBFS) / 20.0))
+
+
+class LoudnessAnalyzer(threading.Thread):
+    """Background worker that analyses songs whose gain is still unknown."""
+
+    def __init__(self):
+        super().__init__(name="LoudnessAnalyzer", daemon=True)
+        self._pending = queue.Queue()
+        self._results = queue.Queue()
+        self._queued_paths = set()
+        self._lock = threading.Lock()
+
+    def submit(self, lagu):
+        """Queue a song for analysis unless its file is already queued."""
+        path = lagu.audio_path
+        if not path or lagu.gain is not None:
+            return
+        with self._lock:
+            if path in self._queued_paths:
+                return
+            self._queued_paths.add(path)
+        self._pending.put(lagu)
+
+    def submit_many(self, songs):
+        """Queue every song that still needs a gain value."""
+        for lagu in songs:
+            self.submit(lagu)
+
+    def drain_results(self):
+        """Return finished (lagu, file_path, gain_db) results without blocking."""
+        finished = []
+        while True:
+            try:
+                finished.append(self._results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def run(self):
+        while True:
+            lagu = self._pending.get()
+            path = lagu.audio_path
+            try:
+                gain = analyse_track_gain(path) if path and os.path.isfile(path) else None
+                if gain is not None:
+                    self._results.put((lagu, path, gain))
+            except Exception as e:
+                print(f"Error analisis loudness {path}: {e}")
+            finally:
+                with self._lock:
+                    self._queued_paths.discard(path)
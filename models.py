@@ -4,19 +4,73 @@ Contains all data structures used for managing songs, playlists, queues, and his
 """
 
 import collections
+import operator
+import re
+import sys
+
+from paths import resolve_path
+
+
+_shared_values = {}  # canonical copies of low-cardinality non-string values (years)
+
+
+def _intern(value):
+    """Share one copy of a low-cardinality field value across all songs."""
+    if type(value) is str:
+        return sys.intern(value)
+    if type(value) is int:
+        return _shared_values.setdefault(value, value)
+    return value
 
 
 class Lagu:
     """Represents a song with its metadata and file path."""
-    
-    def __init__(self, id_lagu, judul, artis, album, genre, tahun, file_path=None):
+
+    # No per-instance __dict__; field order is also the pickled state layout
+    __slots__ = ('id', 'judul', 'artis', 'album', 'genre', 'tahun', 'file_path', 'durasi', 'gain')
+    INTERNED_FIELDS = ('artis', 'album', 'genre', 'tahun')
+
+    def __init__(self, id_lagu, judul, artis, album, genre, tahun, file_path=None, durasi=None):
         self.id = id_lagu
         self.judul = judul
-        self.artis = artis
-        self.album = album
-        self.genre = genre
-        self.tahun = tahun
+        self.artis = _intern(artis)
+        self.album = _intern(album)
+        self.genre = _intern(genre)
+        self.tahun = _intern(tahun)
         self.file_path = file_path  # Path to audio file
+        self.durasi = durasi  # Duration in seconds, if known
+        self.gain = None  # Loudness normalization gain in dB, once analysed
+
+    @property
+    def audio_path(self):
+        """Where the audio file is on this host (file_path with its library root resolved)."""
+        return resolve_path(self.file_path)
+
+    def update(self, **fields):
+        """Set several metadata fields at once, interning the shared ones."""
+        for key, value in fields.items():
+            if key in self.INTERNED_FIELDS:
+                value = _intern(value)
+            setattr(self, key, value)
+
+    def __getstate__(self):
+        return tuple(getattr(self, name, None) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        # Pickles written before __slots__ carry a plain attribute dict
+        # (including the old 'durasi'); newer ones carry a tuple of slot values.
+        if isinstance(state, tuple) and len(state) == 2 and (state[0] is None or isinstance(state[0], dict)):
+            merged = dict(state[0] or {})
+            merged.update(state[1] or {})
+            state = merged
+        if isinstance(state, dict):
+            state = tuple(state.get(name) for name in self.__slots__)
+        # Fields added after a pickle was written default to None
+        state = tuple(state) + (None,) * (len(self.__slots__) - len(state))
+        for name, value in zip(self.__slots__, state):
+            if name in self.INTERNED_FIELDS:
+                value = _intern(value)
+            setattr(self, name, value)
 
     def __str__(self):
         return f"{self.judul} - {self.artis}"
@@ -27,19 +81,57 @@ class Lagu:
 
 
 
+def _restore_node(node, state):
+    """Restore a node pickled before nodes used __slots__."""
+    if isinstance(state, tuple):
+        state = {**(state[0] or {}), **(state[1] or {})}
+    for name in node.__slots__:
+        setattr(node, name, state.get(name))
+
+
 class NodeLagu:
     """Node for SinglyLinkedList containing a Song."""
+    __slots__ = ('data', 'next')
+
     def __init__(self, lagu):
         self.data = lagu
         self.next = None
 
+    __setstate__ = _restore_node
+
 
 class SinglyLinkedList:
     """Singly linked list implementation for the music library."""
     
     def __init__(self):
         self.head = None
+        self.tail = None
         self.size = 0
+        self.version = 0  # bumped on every mutation so derived views know when to rebuild
+
+    def mark_changed(self, lagu=None):
+        """Record an in-place change to one of the songs in the list (lagu is
+        only needed by sharded libraries to find the song's shard)."""
+        self.version += 1
+
+    def __getstate__(self):
+        # Store the songs as a flat list; pickling the node chain itself
+        # recurses once per node and overflows on anything but tiny libraries.
+        return {'songs': self.get_all_lagu()}
+
+    def __setstate__(self, state):
+        self.__init__()
+        if 'songs' in state:
+            for lagu in state['songs']:
+                self.append(lagu)
+        else:
+            # Old format: the raw node chain
+            self.head = state.get('head')
+            current = self.head
+            while current:
+                self.tail = current
+                self.size += 1
+                current = current.next
 
     def append(self, lagu):
         """Add a song to the end of the list."""
@@ -47,11 +139,10 @@ class SinglyLinkedList:
         if not self.head:
             self.head = new_node
         else:
-            current = self.head
-            while current.next:
-                current = current.next
-            current.next = new_node
+            self.tail.next = new_node
+        self.tail = new_node
         self.size += 1
+        self.version += 1
 
     def remove_by_id(self, id_lagu):
         """Remove a song by its ID and return it."""
@@ -63,7 +154,10 @@ class SinglyLinkedList:
                     previous.next = current.next
                 else:
                     self.head = current.next
+                if current is self.tail:
+                    self.tail = previous
                 self.size -= 1
+                self.version += 1
                 return current.data
             previous = current
             current = current.next
@@ -78,6 +172,35 @@ class SinglyLinkedList:
             current = current.next
         return None
 
+    def index_of(self, id_lagu):
+        """Return the position of a song in the list, or None."""
+        current = self.head
+        index = 0
+        while current:
+            if current.data.id == id_lagu:
+                return index
+            current = current.next
+            index += 1
+        return None
+
+    def insert(self, index, lagu):
+        """Insert a song at a position (appended if the position is past the end)."""
+        if index is None or index >= self.size or not self.head:
+            self.append(lagu)
+            return
+        new_node = NodeLagu(lagu)
+        if index <= 0:
+            new_node.next = self.head
+            self.head = new_node
+        else:
+            previous = self.head
+            for _ in range(index - 1):
+                previous = previous.next
+            new_node.next = previous.next
+            previous.next = new_node
+        self.size += 1
+        self.version += 1
+
     def find_by_criteria(self, **kwargs):
         """Find songs matching the given criteria."""
         results = []
@@ -100,6 +223,13 @@ class SinglyLinkedList:
             print(current.data)
             current = current.next
 
+    def __iter__(self):
+        """Yield the songs one by one without building a list."""
+        current = self.head
+        while current:
+            yield current.data
+            current = current.next
+
     def get_all_lagu(self):
         """Get all songs as a Python list."""
         lagu_list = []
@@ -112,11 +242,15 @@ class SinglyLinkedList:
 
 class NodePlaylist:
     """Node for doubly linked list containing a song in a playlist."""
+    __slots__ = ('data', 'next', 'prev')
+
     def __init__(self, lagu):
         self.data = lagu
         self.next = None
         self.prev = None
 
+    __setstate__ = _restore_node
+
 
 class DoublyLinkedList:
     """Doubly linked list implementation for playlists."""
@@ -125,6 +259,25 @@ class DoublyLinkedList:
         self.head = None
         self.tail = None
         self.size = 0
+        self.version = 0  # bumped on every mutation so derived views know when to rebuild
+
+    def mark_changed(self):
+        """Record an in-place change to one of the songs in the playlist."""
+        self.version += 1
+
+    def __getstate__(self):
+        return {'songs': self.get_as_list()}
+
+    def __setstate__(self, state):
+        self.__init__()
+        if 'songs' in state:
+            for lagu in state['songs']:
+                self.append(lagu)
+        else:
+            # Old format: the raw node chain
+            self.head = state.get('head')
+            self.tail = state.get('tail')
+            self.size = state.get('size', 0)
 
     def append(self, lagu):
         """Add a song to the end of the playlist."""
@@ -137,6 +290,7 @@ class DoublyLinkedList:
             self.tail.next = new_node
             self.tail = new_node
         self.size += 1
+        self.version += 1
 
     def remove_node(self, node):
         """Remove a specific node from the playlist."""
@@ -151,6 +305,7 @@ class DoublyLinkedList:
         else:
             self.tail = node.prev
         self.size -= 1
+        self.version += 1
 
     def find_node_by_lagu_id(self, id_lagu):
         """Find a node by song ID."""
@@ -161,6 +316,36 @@ class DoublyLinkedList:
             current = current.next
         return None
 
+    def position_of(self, id_lagu):
+        """Return the position of a song in the playlist, or None."""
+        current = self.head
+        position = 0
+        while current:
+            if current.data.id == id_lagu:
+                return position
+            current = current.next
+            position += 1
+        return None
+
+    def insert(self, position, lagu):
+        """Insert a song at a position (appended if the position is past the end)."""
+        if position is None or position >= self.size:
+            self.append(lagu)
+            return
+        following = self.head
+        for _ in range(max(0, position)):
+            following = following.next
+        new_node = NodePlaylist(lagu)
+        new_node.next = following
+        new_node.prev = following.prev
+        if following.prev:
+            following.prev.next = new_node
+        else:
+            self.head = new_node
+        following.prev = new_node
+        self.size += 1
+        self.version += 1
+
     def display(self):
         """Display all songs in the playlist."""
         current = self.head
@@ -168,6 +353,13 @@ class DoublyLinkedList:
             print(current.data)
             current = current.next
 
+    def __iter__(self):
+        """Yield the songs one by one without building a list."""
+        current = self.head
+        while current:
+            yield current.data
+            current = current.next
+
     def get_as_list(self):
         """Get all songs as a Python list."""
         lagu_list = []
@@ -178,6 +370,111 @@ class DoublyLinkedList:
         return lagu_list
 
 
+class SmartPlaylist(DoublyLinkedList):
+    """Playlist whose songs are selected by rules and kept up to date incrementally."""
+
+    OPERATORS = {
+        '==': operator.eq,
+        '!=': operator.ne,
+        '>': operator.gt,
+        '>=': operator.ge,
+        '<': operator.lt,
+        '<=': operator.le,
+        'contains': lambda field_value, value: str(value).lower() in str(field_value).lower(),
+    }
+    NUMERIC_FIELDS = ('tahun', 'play_count')
+    FIELDS = Lagu.__slots__ + ('play_count',)  # fields a rule may test
+
+    def __init__(self, rules):
+        self.rules = list(rules)  # (field, operator, value) tuples, all must match
+        self._nodes = {}  # song id -> node, for O(1) membership checks
+        super().__init__()
+
+    def __getstate__(self):
+        return {'songs': self.get_as_list(), 'rules': self.rules}
+
+    def __setstate__(self, state):
+        self.__init__(state['rules'])
+        for lagu in state['songs']:
+            self.append(lagu)
+
+    @classmethod
+    def parse_rules(cls, text):
+        """Parse rules such as 'genre == K-Pop dan tahun >= 2024' into tuples."""
+        rules = []
+        for part in re.split(r'\s+(?:and|dan)\s+|;', text.strip()):
+            part = part.strip()
+            if not part:
+                continue
+            match = re.match(r'^(\w+)\s*(==|!=|>=|<=|>|<|contains)\s*(.+)$', part)
+            if not match:
+                raise ValueError(f"Aturan tidak valid: '{part}'")
+            field, op, value = match.group(1), match.group(2), match.group(3).strip().strip('"\'')
+            if field not in cls.FIELDS:
+                raise ValueError(f"Aturan tidak valid: '{part}' (kolom yang tersedia: {', '.join(cls.FIELDS)})")
+            if field in cls.NUMERIC_FIELDS:
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise ValueError(f"Aturan tidak valid: '{part}' ({field} harus berupa angka)") from None
+            rules.append((field, op, value))
+        if not rules:
+            raise ValueError("Minimal satu aturan harus diisi.")
+        return rules
+
+    def describe_rules(self):
+        """Return the rules as a readable string."""
+        return " dan ".join(f"{field} {op} {value}" for field, op, value in self.rules)
+
+    def matches(self, lagu, play_count=0):
+        """Check whether a song satisfies every rule."""
+        for field, op, value in self.rules:
+            field_value = play_count if field == 'play_count' else getattr(lagu, field, None)
+            try:
+                if not self.OPERATORS[op](field_value, value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def uses_play_count(self):
+        """Check whether any rule depends on play statistics."""
+        return any(field == 'play_count' for field, _, _ in self.rules)
+
+    def update_song(self, lagu, play_count=0):
+        """Re-evaluate the rules for one song, adding or removing it as needed."""
+        node = self._nodes.get(lagu.id)
+        if self.matches(lagu, play_count):
+            if node is None:
+                self.append(lagu)
+        elif node is not None:
+            self.remove_node(node)
+
+    def rebuild(self, songs, get_play_count=None):
+        """Evaluate the rules over a whole collection (used once, on creation)."""
+        self.head = self.tail = None
+        self.size = 0
+        self._nodes = {}
+        for lagu in songs:
+            self.update_song(lagu, get_play_count(lagu.id) if get_play_count else 0)
+
+    def append(self, lagu):
+        """Add a song to the end of the playlist."""
+        super().append(lagu)
+        self._nodes[lagu.id] = self.tail
+
+    def remove_node(self, node):
+        """Remove a specific node from the playlist."""
+        if not node:
+            return
+        super().remove_node(node)
+        self._nodes.pop(node.data.id, None)
+
+    def find_node_by_lagu_id(self, id_lagu):
+        """Find a node by song ID."""
+        return self._nodes.get(id_lagu)
+
+
 class Queue:
     """Queue implementation for playback queue (FIFO)."""
     
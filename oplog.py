@@ -0,0 +1,346 @@
+"""
+Operation Log for Music Player Application
+Every library and playlist change is recorded as an Operation: a short list
+of steps, each of which knows its own inverse. Undo applies the inverse
+steps and redo the steps again, so neither needs a copy of the state. The
+same records are appended to a journal next to the data file: saving after
+an edit appends one line instead of pickling the whole library, the journal
+is replayed on top of the snapshot when the data is loaded, and it is
+truncated whenever a full snapshot (a checkpoint) is written.
+"""
+
+import json
+import os
+
+from models import Lagu, DoublyLinkedList, SmartPlaylist
+from instrumentation import traced
+
+JOURNAL_FILE = "music_player_journal"
+UNDO_LIMIT = 100  # operations kept for undo
+CHECKPOINT_OPS = 500  # journal records before commit() writes a full snapshot instead
+
+# Steps are tuples of JSON-safe values:
+#   ('song_insert' | 'song_remove', song state, library index or None)
+#   ('song_update', song id, fields before, fields after)
+#   ('playlist_create' | 'playlist_drop', name, playlist state)
+#   ('playlist_insert' | 'playlist_remove', name, song id, position or None)
+#   ('shared_playlist_insert' | 'shared_playlist_remove', the same fields), for the
+#       playlists stored with the library while another profile's are active
+#   ('queue_insert' | 'queue_remove', song id, position)
+_INVERSE = {
+    'song_insert': 'song_remove',
+    'song_remove': 'song_insert',
+    'playlist_create': 'playlist_drop',
+    'playlist_drop': 'playlist_create',
+    'playlist_insert': 'playlist_remove',
+    'playlist_remove': 'playlist_insert',
+    'shared_playlist_insert': 'shared_playlist_remove',
+    'shared_playlist_remove': 'shared_playlist_insert',
+    'queue_insert': 'queue_remove',
+    'queue_remove': 'queue_insert',
+}
+# Steps on the shared library and its playlists; the others act on the active playlists and queue
+SONG_STEPS = frozenset(('song_insert', 'song_remove', 'song_update'))
+LIBRARY_STEPS = SONG_STEPS | {'shared_playlist_insert', 'shared_playlist_remove'}
+# Enqueueing is playback, not an edit, so the queue is never journaled and
+# its steps only serve undo within a session
+QUEUE_STEPS = frozenset(('queue_insert', 'queue_remove'))
+
+
+def song_state(lagu):
+    """A song's slot values as a JSON-safe list (the same layout it pickles to)."""
+    return list(lagu.__getstate__())
+
+
+def song_from_state(state):
+    lagu = Lagu.__new__(Lagu)
+    lagu.__setstate__(tuple(state))
+    return lagu
+
+
+def playlist_state(playlist):
+    """['manual', ids] or ['smart', rules]; smart playlists are rebuilt from their rules."""
+    if isinstance(playlist, SmartPlaylist):
+        return ['smart', [list(rule) for rule in playlist.rules]]
+    return ['manual', [lagu.id for lagu in playlist]]
+
+
+def invert(step):
+    if step[0] == 'song_update':
+        return ('song_update', step[1], step[3], step[2])
+    return (_INVERSE[step[0]],) + tuple(step[1:])
+
+
+class Operation:
+    """One user-level change (e.g. deleting a song) as a list of invertible steps."""
+
+    def __init__(self, label, steps, profile=None):
+        self.label = label
+        self.steps = steps
+        self.profile = profile  # profile whose playlists and queue the steps touch; None = shared
+
+    def inverse(self):
+        return [invert(step) for step in reversed(self.steps)]
+
+    def to_record(self, action):
+        return {'action': action, 'label': self.label, 'profile': self.profile, 'steps': self.steps}
+
+    @classmethod
+    def from_record(cls, record):
+        return record['action'], cls(record['label'], [tuple(step) for step in record['steps']],
+                                     record.get('profile'))
+
+
+class StepApplier:
+    """Applies steps to a core, resolving song IDs through one index per batch."""
+
+    def __init__(self, core):
+        self.core = core
+        self._songs = None  # id -> Lagu, built on first lookup and kept current
+
+    def _index(self):
+        if self._songs is None:
+            self._songs = {lagu.id: lagu for lagu in self.core.library}
+        return self._songs
+
+    def lookup(self, id_lagu):
+        lagu = self._index().get(id_lagu)
+        if lagu is None and hasattr(self.core.library, 'shard_of'):
+            lagu = self.core.library.find_by_id(id_lagu)  # inactive shards
+        return lagu
+
+    def apply(self, steps, library=True, playlists=True, queue=True):
+        """Apply steps in order; steps on songs that no longer exist are skipped."""
+        for step in steps:
+            kind = step[0]
+            if kind in LIBRARY_STEPS:
+                enabled = library
+            elif kind in QUEUE_STEPS:
+                enabled = queue
+            else:
+                enabled = playlists
+            if enabled:
+                getattr(self, '_' + kind)(*step[1:])
+
+    def _song_insert(self, state, index):
+        lagu = song_from_state(state)
+        if self.lookup(lagu.id) is not None:
+            return  # already in the snapshot
+        self.core.library.insert(index, lagu)
+        self._index()[lagu.id] = lagu
+        self.core._sync_smart_playlists(lagu)
+
+    def _song_remove(self, state, index):
+        id_lagu = state[0]
+        if self.lookup(id_lagu) is None:
+            return
+        self.core.library.remove_by_id(id_lagu)
+        self._index().pop(id_lagu, None)
+        for playlist in self.core.playlists.values():
+            if isinstance(playlist, SmartPlaylist):
+                playlist.remove_node(playlist.find_node_by_lagu_id(id_lagu))
+        if self.core.current_playing and self.core.current_playing.id == id_lagu:
+            self.core.stop()
+
+    def _song_update(self, id_lagu, before, after):
+        lagu = self.lookup(id_lagu)
+        if lagu is None:
+            return
+        lagu.update(**after)
+        self.core.state.touch(lagu)
+        self.core.library.mark_changed(lagu)
+        for playlist in self.core.playlists.values():
+            if playlist.find_node_by_lagu_id(id_lagu):
+                playlist.mark_changed()
+        self.core._sync_smart_playlists(lagu)
+
+    def _playlist_create(self, name, state):
+        if name in self.core.playlists:
+            return
+        if state[0] == 'smart':
+            playlist = SmartPlaylist([tuple(rule) for rule in state[1]])
+            playlist.rebuild(self.core.library, self.core.play_stats.get_play_count)
+        else:
+            playlist = DoublyLinkedList()
+            for id_lagu in state[1]:
+                lagu = self.lookup(id_lagu)
+                if lagu is not None:
+                    playlist.append(lagu)
+        self.core.playlists[name] = playlist
+
+    def _playlist_drop(self, name, state):
+        playlist = self.core.playlists.pop(name, None)
+        if playlist is not None and self.core.current_playlist is playlist:
+            self.core.stop()
+
+    def _playlist_insert(self, name, id_lagu, position, playlists=None):
+        playlist = (self.core.playlists if playlists is None else playlists).get(name)
+        lagu = self.lookup(id_lagu)
+        if playlist is None or lagu is None:
+            return
+        if isinstance(playlist, SmartPlaylist):
+            playlist.update_song(lagu, self.core.play_stats.get_play_count(id_lagu))
+        elif not playlist.find_node_by_lagu_id(id_lagu):
+            playlist.insert(position, lagu)
+
+    def _playlist_remove(self, name, id_lagu, position, playlists=None):
+        playlist = (self.core.playlists if playlists is None else playlists).get(name)
+        if playlist is not None:
+            playlist.remove_node(playlist.find_node_by_lagu_id(id_lagu))
+
+    def _shared_playlist_insert(self, name, id_lagu, position):
+        self._playlist_insert(name, id_lagu, position, self.core.shared_playlists)
+
+    def _shared_playlist_remove(self, name, id_lagu, position):
+        self._playlist_remove(name, id_lagu, position, self.core.shared_playlists)
+
+    def _queue_insert(self, id_lagu, position):
+        lagu = self.lookup(id_lagu)
+        if lagu is not None:
+            self.core.playback_queue.items.insert(position, lagu)
+
+    def _queue_remove(self, id_lagu, position):
+        items = self.core.playback_queue.items
+        if position < len(items) and items[position].id == id_lagu:
+            del items[position]
+            return
+        for i, lagu in enumerate(items):
+            if lagu.id == id_lagu:
+                del items[i]
+                return
+
+
+class OperationLog:
+    """Undo/redo stacks plus the journal holding the same operations."""
+
+    def __init__(self, path=JOURNAL_FILE, limit=UNDO_LIMIT):
+        """
+        Args:
+            path: Journal file; None keeps the log in memory (undo only)
+            limit: Number of operations that can be undone
+        """
+        self.path = path
+        self.limit = limit
+        self.undo_stack = []
+        self.redo_stack = []
+        self.records = 0  # journal records since the last checkpoint
+        self._deferred = []  # (action, Operation) for profiles that are not loaded yet
+
+    def record(self, operation):
+        """Make a just-performed operation undoable and durable."""
+        if not operation.steps:
+            return
+        self.undo_stack.append(operation)
+        del self.undo_stack[:-self.limit]
+        self.redo_stack.clear()
+        self._append('do', operation)
+
+    def undo(self, core):
+        """Revert the last operation; returns it, or None if there is nothing to undo."""
+        if not self.undo_stack:
+            return None
+        operation = self.undo_stack.pop()
+        StepApplier(core).apply(operation.inverse())
+        self.redo_stack.append(operation)
+        self._append('undo', operation)
+        return operation
+
+    def redo(self, core):
+        """Re-apply the last undone operation; returns it, or None."""
+        if not self.redo_stack:
+            return None
+        operation = self.redo_stack.pop()
+        StepApplier(core).apply(operation.steps)
+        self.undo_stack.append(operation)
+        self._append('redo', operation)
+        return operation
+
+    def clear_history(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def _append(self, action, operation):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(operation.to_record(action), ensure_ascii=False) + "\n")
+            self.records += 1
+        except OSError as e:
+            print(f"Error saat menulis jurnal: {e}")
+
+    def _read(self):
+        entries = []
+        if self.path is None:
+            return entries
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entries.append(Operation.from_record(json.loads(line)))
+                    except (ValueError, KeyError):
+                        # A record cut short by a crash ends the journal
+                        print(f"Jurnal {self.path} terpotong; sisa catatan diabaikan.")
+                        break
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error saat membaca jurnal: {e}")
+        return entries
+
+    @traced("persistence.replay")
+    def replay(self, core):
+        """
+        Re-apply the journal on top of a freshly loaded snapshot. Library
+        steps of every record and the playlist steps of records without a
+        profile run now; those of a profile wait for replay_profile().
+
+        Returns:
+            Number of records replayed
+        """
+        entries = self._read()
+        self.records = len(entries)
+        self._deferred = [(action, op) for action, op in entries if op.profile is not None]
+        applier = StepApplier(core)
+        for action, operation in entries:
+            steps = operation.inverse() if action == 'undo' else operation.steps
+            applier.apply(steps, playlists=operation.profile is None, queue=False)
+        return len(entries)
+
+    def replay_profile(self, core, name):
+        """Apply the deferred playlist and queue steps of a profile that was just loaded."""
+        pending = [entry for entry in self._deferred if entry[1].profile == name]
+        if not pending:
+            return
+        self._deferred = [entry for entry in self._deferred if entry[1].profile != name]
+        applier = StepApplier(core)
+        for action, operation in pending:
+            steps = operation.inverse() if action == 'undo' else operation.steps
+            applier.apply(steps, library=False, queue=False)
+
+    def checkpoint(self):
+        """
+        Truncate the journal after a full snapshot. Only the playlist steps
+        of profiles that were never loaded (so never saved since) are kept.
+        The undo stacks are unaffected.
+        """
+        kept = []
+        for action, operation in self._deferred:
+            steps = [step for step in operation.steps
+                     if step[0] not in LIBRARY_STEPS and step[0] not in QUEUE_STEPS]
+            if steps:
+                kept.append((action, Operation(operation.label, steps, operation.profile)))
+        self._deferred = kept
+        self.records = len(kept)
+        if self.path is None:
+            return
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for action, operation in kept:
+                    f.write(json.dumps(operation.to_record(action), ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saat memperbarui jurnal: {e}")
@@ -0,0 +1,242 @@
+"""
+Library Roots for Music Player Application
+Song paths are stored relative to named music folders ("$audio/GO!.mp3"),
+so one data file works on every host once its roots point at the local
+folders; absolute paths are still accepted. Moved files are found for a
+batch relocation through a single index of file names and sizes instead of
+editing songs one at a time.
+"""
+
+import json
+import os
+import re
+
+from instrumentation import traced
+
+ROOTS_FILE = "music_player_roots"
+DEFAULT_ROOTS = {'audio': 'audio'}  # the folder shipped next to the data file
+ROOT_PREFIX = "$"
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.flac', '.m4a')
+
+_roots = None  # active LibraryRoots, loaded on first use
+_resolved = {}  # stored path -> path on this host, cleared whenever the roots change
+
+
+def normalize_path(path):
+    """Key a path the way the on-disk caches do (artwork, hashes, imports, size hints)."""
+    return os.path.normcase(os.path.abspath(path)) if path else None
+
+
+def _path_parts(path):
+    """Components of a path written on any OS (Windows paths split on Linux too)."""
+    return [part for part in re.split(r'[\\/]+', path) if part]
+
+
+class LibraryRoots:
+    """Named music folders that stored song paths are relative to."""
+
+    def __init__(self, roots=None, path=ROOTS_FILE):
+        self.path = path
+        self.roots = dict(roots if roots is not None else DEFAULT_ROOTS)  # name -> directory
+
+    @classmethod
+    def load(cls, path=ROOTS_FILE):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls(json.load(f), path)
+        except FileNotFoundError:
+            return cls(path=path)
+        except (OSError, ValueError) as e:
+            print(f"Daftar folder musik tidak dapat dibaca, memakai bawaan: {e}")
+            return cls(path=path)
+
+    def save(self):
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.roots, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saat menyimpan daftar folder musik: {e}")
+
+    def set(self, name, directory):
+        name = name.strip()
+        if not re.match(r'^\w+$', name):
+            raise ValueError("Nama folder hanya boleh berisi huruf, angka dan garis bawah.")
+        self.roots[name] = directory
+
+    def remove(self, name):
+        self.roots.pop(name, None)
+
+    def resolve(self, stored):
+        """Path on this host for a stored path ("$name/rel" or a plain path)."""
+        if not stored or not stored.startswith(ROOT_PREFIX):
+            return stored
+        name, _, relative = stored[len(ROOT_PREFIX):].partition('/')
+        directory = self.roots.get(name)
+        if directory is None:
+            return stored  # unknown root: the song shows up as missing
+        return os.path.join(directory, *_path_parts(relative))
+
+    def portable(self, path):
+        """The root-relative form of a path inside one of the roots, else the path unchanged."""
+        if not path or path.startswith(ROOT_PREFIX):
+            return path
+        absolute = os.path.abspath(path)
+        # The deepest root wins when roots are nested
+        for name, directory in sorted(self.roots.items(), key=lambda item: -len(os.path.abspath(item[1]))):
+            try:
+                relative = os.path.relpath(absolute, os.path.abspath(directory))
+            except ValueError:  # another drive on Windows
+                continue
+            if relative != os.curdir and not relative.startswith(os.pardir):
+                return ROOT_PREFIX + name + "/" + "/".join(_path_parts(relative))
+        return path
+
+
+def get_roots():
+    global _roots
+    if _roots is None:
+        _roots = LibraryRoots.load()
+    return _roots
+
+
+def set_roots(roots):
+    """Make `roots` the active LibraryRoots (e.g. after the user edited them)."""
+    global _roots
+    _roots = roots
+    _resolved.clear()
+
+
+def resolve_path(stored):
+    """Path on this host for a stored song path; cached, so O(1) after the first call."""
+    if not stored:
+        return stored
+    path = _resolved.get(stored)
+    if path is None:
+        path = _resolved[stored] = get_roots().resolve(stored)
+    return path
+
+
+def portable_path(path):
+    """Stored form for a path picked on this host."""
+    return get_roots().portable(path)
+
+
+# ========== RELOCATION ==========
+
+class RelocationPlan:
+    """New stored paths for a batch of songs, and the songs that could not be placed."""
+
+    def __init__(self):
+        self.moves = {}  # song id -> new stored path
+        self.found = 0  # missing files found elsewhere
+        self.converted = 0  # files in place whose path is now stored root-relative
+        self.unresolved = []  # Lagu whose file was not found
+        self.ambiguous = []  # Lagu matching several files
+
+    def __str__(self):
+        return (f"{self.found} file ditemukan di lokasi baru, {self.converted} path dijadikan relatif, "
+                f"{len(self.unresolved)} tidak ditemukan, {len(self.ambiguous)} ambigu")
+
+
+@traced("paths.index")
+def build_file_index(directories, extensions=AUDIO_EXTENSIONS):
+    """
+    Walk the directories once.
+
+    Returns:
+        dict lower-case file name -> list of (path, size)
+    """
+    index = {}
+    pending = [directory for directory in directories if directory and os.path.isdir(directory)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.name.lower().endswith(extensions):
+                            index.setdefault(entry.name.lower(), []).append((entry.path, entry.stat().st_size))
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Folder dilewati: {e}")
+    return index
+
+
+def _best_candidate(lagu, candidates, size_hints):
+    # Hints are keyed like HashCache entries: by the normalized path on this host
+    size = size_hints.get(normalize_path(lagu.audio_path)) if size_hints else None
+    if size is not None and len(candidates) > 1:
+        candidates = [c for c in candidates if c[1] == size] or candidates
+    if len(candidates) == 1:
+        return candidates[0][0]
+    # Prefer the file sharing the most trailing folder names with the old path
+    old_parts = [part.lower() for part in reversed(_path_parts(lagu.file_path)[:-1])]
+
+    def shared_folders(candidate):
+        count = 0
+        for old, new in zip(old_parts, (p.lower() for p in reversed(_path_parts(candidate[0])[:-1]))):
+            if old != new:
+                break
+            count += 1
+        return count
+
+    scores = sorted(((shared_folders(c), c[0]) for c in candidates), reverse=True)
+    if scores[0][0] > scores[1][0]:
+        return scores[0][1]
+    return None
+
+
+@traced("paths.relocate")
+def plan_relocation(songs, directories=None, size_hints=None):
+    """
+    Work out new paths for songs whose files moved, in one pass.
+
+    Songs whose file is still in place only have their path made
+    root-relative. Missing ones are looked up by file name in an index of
+    the directories (walked once); several files with the same name are
+    told apart by size, when size_hints knows the old size, and then by
+    the folder names they share with the old path.
+
+    Args:
+        songs: Iterable of Lagu
+        directories: Folders to search (default: every library root)
+        size_hints: Optional dict normalized old audio_path -> file size
+
+    Returns:
+        RelocationPlan
+    """
+    roots = get_roots()
+    plan = RelocationPlan()
+    missing = []
+    for lagu in songs:
+        if not lagu.file_path:
+            continue
+        current = resolve_path(lagu.file_path)
+        if os.path.isfile(current):
+            stored = roots.portable(current)
+            if stored != lagu.file_path:
+                plan.moves[lagu.id] = stored
+                plan.converted += 1
+        else:
+            missing.append(lagu)
+    if not missing:
+        return plan
+
+    index = build_file_index(directories if directories is not None else list(roots.roots.values()))
+    for lagu in missing:
+        parts = _path_parts(lagu.file_path)
+        candidates = index.get(parts[-1].lower(), []) if parts else []
+        if not candidates:
+            plan.unresolved.append(lagu)
+            continue
+        path = _best_candidate(lagu, candidates, size_hints)
+        if path is None:
+            plan.ambiguous.append(lagu)
+            continue
+        plan.moves[lagu.id] = roots.portable(os.path.abspath(path))
+        plan.found += 1
+    return plan
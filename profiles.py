@@ -0,0 +1,194 @@
+"""
+User Profiles for Music Player Application
+Each user has their own playlists, playback queue, history, settings and
+play statistics, stored in small per-profile files. Profiles keep only song
+IDs; on load the IDs are resolved against the shared library, so every
+profile references the same Lagu objects and switching profiles never
+re-reads the catalog.
+"""
+
+import os
+import pickle
+import re
+
+from instrumentation import traced
+from models import DoublyLinkedList, SmartPlaylist, Queue, Stack
+from stats import load_stats, save_stats
+
+PROFILE_DIR = "music_player_profiles"
+DEFAULT_PROFILE = "default"
+PROFILE_SETTINGS = ('autoplay_enabled', 'normalize_loudness', 'crossfade_seconds')
+
+
+def _safe_name(name):
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_') or 'profil'
+
+
+class UserProfile:
+    """Per-user state: playlists, queue, history, settings and statistics."""
+
+    def __init__(self, name, directory=PROFILE_DIR):
+        self.name = name
+        self.directory = directory
+        self.playlists = {}
+        self.queue = Queue()
+        self.history = Stack()
+        self.settings = {}
+        base = os.path.join(directory, _safe_name(name))
+        self.path = base + ".profile"
+        self.stats_path = base + ".stats"
+        self.log_path = base + ".plays.log"
+        self.stats = None
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+
+def list_profiles(directory=PROFILE_DIR):
+    """Return the names of every saved profile, sorted."""
+    names = []
+    try:
+        entries = os.listdir(directory)
+    except FileNotFoundError:
+        return names
+    for entry in entries:
+        if entry.endswith(".profile"):
+            try:
+                with open(os.path.join(directory, entry), 'rb') as f:
+                    names.append(pickle.load(f)['name'])
+            except Exception as e:
+                print(f"Profil {entry} tidak dapat dibaca: {e}")
+    return sorted(names)
+
+
+def playlist_ids(playlist):
+    """A playlist as its song IDs (plus the rules of a smart playlist)."""
+    ids = [lagu.id for lagu in playlist.get_as_list()]
+    if isinstance(playlist, SmartPlaylist):
+        return ('smart', playlist.rules, ids)
+    return ('manual', ids)
+
+
+def restore_playlist(state, resolve):
+    """Rebuild a playlist_ids() state, resolving IDs through `resolve`."""
+    if state[0] == 'smart':
+        playlist = SmartPlaylist(state[1])
+        ids = state[2]
+    else:
+        playlist = DoublyLinkedList()
+        ids = state[1]
+    for id_lagu in ids:
+        lagu = resolve(id_lagu)
+        if lagu is not None:  # songs deleted from the library are dropped
+            playlist.append(lagu)
+    return playlist
+
+
+@traced("persistence.load_profile")
+def load_profile(name, resolve, directory=PROFILE_DIR):
+    """
+    Load a profile, resolving its song IDs through `resolve`.
+
+    Args:
+        name: Profile name
+        resolve: callable(id) -> Lagu or None, backed by the shared library
+        directory: Profile directory
+
+    Returns:
+        UserProfile (empty if it has never been saved)
+    """
+    profile = UserProfile(name, directory)
+    os.makedirs(directory, exist_ok=True)  # the play log is appended to right away
+    try:
+        with open(profile.path, 'rb') as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        state = None
+    except Exception as e:
+        print(f"Error saat memuat profil {name}: {e}")
+        state = None
+    if state:
+        profile.playlists = {pname: restore_playlist(pstate, resolve) for pname, pstate in state['playlists'].items()}
+        for id_lagu in state['queue']:
+            lagu = resolve(id_lagu)
+            if lagu is not None:
+                profile.queue.enqueue(lagu)
+        for id_lagu in state['history']:
+            lagu = resolve(id_lagu)
+            if lagu is not None:
+                profile.history.push(lagu)
+        profile.settings = state.get('settings', {})
+        print(f"Profil '{name}' dimuat")
+    profile.stats = load_stats(profile.stats_path, profile.log_path)
+    return profile
+
+
+@traced("persistence.save_profile")
+def save_profile(profile):
+    """Write a profile's state and statistics to its own files."""
+    state = {
+        'name': profile.name,
+        'playlists': {pname: playlist_ids(pl) for pname, pl in profile.playlists.items()},
+        'queue': [lagu.id for lagu in profile.queue.items],
+        'history': [lagu.id for lagu in profile.history.items],
+        'settings': profile.settings,
+    }
+    try:
+        os.makedirs(profile.directory, exist_ok=True)
+        tmp_path = profile.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(tmp_path, profile.path)
+        print(f"Profil '{profile.name}' disimpan ke {profile.path}")
+    except Exception as e:
+        print(f"Error saat menyimpan profil {profile.name}: {e}")
+    if profile.stats is not None:
+        save_stats(profile.stats, profile.stats_path)
+
+
+def rewrite_song_ids(mapping, skip=None, directory=PROFILE_DIR):
+    """
+    Point song IDs in every saved profile at other IDs (after duplicates are
+    merged), without resolving anything against the library.
+
+    Args:
+        mapping: dict old id -> new id
+        skip: Name of a profile to leave alone (the active one is saved from memory)
+        directory: Profile directory
+
+    Returns:
+        int: Number of profiles rewritten
+    """
+    def rewrite(ids):
+        seen = set()
+        result = []
+        for id_lagu in ids:
+            id_lagu = mapping.get(id_lagu, id_lagu)
+            if id_lagu not in seen:
+                seen.add(id_lagu)
+                result.append(id_lagu)
+        return result
+
+    rewritten = 0
+    for name in list_profiles(directory):
+        if name == skip:
+            continue
+        profile = UserProfile(name, directory)
+        with open(profile.path, 'rb') as f:
+            state = pickle.load(f)
+        playlists = {}
+        for pname, pstate in state['playlists'].items():
+            playlists[pname] = pstate[:-1] + (rewrite(pstate[-1]),)
+        if playlists == state['playlists'] and not any(
+                id_lagu in mapping for id_lagu in state['queue'] + state['history']):
+            continue
+        state['playlists'] = playlists
+        # Queue and history may legitimately repeat a song, so only map them
+        state['queue'] = [mapping.get(id_lagu, id_lagu) for id_lagu in state['queue']]
+        state['history'] = [mapping.get(id_lagu, id_lagu) for id_lagu in state['history']]
+        tmp_path = profile.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(tmp_path, profile.path)
+        rewritten += 1
+    return rewritten
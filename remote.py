@@ -0,0 +1,485 @@
+"""
+Remote Control for Music Player Application
+A small asyncio HTTP/WebSocket server (standard library only) that lets
+scripts and other machines on the LAN drive the player and follow what it
+plays. The server runs its own event loop on a background thread; commands
+reach the thread that owns MusicPlayerCore (the Tk thread) through a
+thread-safe queue and are answered through futures, so neither loop ever
+blocks the other. Status changes are encoded once and written to every
+WebSocket subscriber without waiting on any of them.
+
+Enable it with MUSICPLAYER_REMOTE=1 (127.0.0.1:8765), =PORT or =HOST:PORT,
+and optionally require MUSICPLAYER_REMOTE_TOKEN as a bearer token; a host
+other than loopback is only served with a token. Requests whose Host or
+Origin header names another site are refused, so web pages open in a
+browser cannot drive the player.
+
+    GET  /status                        current song, state and position
+    GET  /search?criteria=judul&value=x
+    POST /play {"id": "L001"}           also /pause /resume /stop /next /prev
+    POST /enqueue {"id": "L001"}        /queue_next /seek {"seconds": 30}
+    GET  /ws                            WebSocket: status events; send
+                                        {"command": "pause"} to control
+
+From a shell:  python remote.py status | pause | play L001 | search judul x
+"""
+
+import asyncio
+import base64
+import concurrent.futures
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from core import PlayerError
+from import_export import FIELDS
+
+REMOTE_ENV = "MUSICPLAYER_REMOTE"
+TOKEN_ENV = "MUSICPLAYER_REMOTE_TOKEN"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 64 * 1024
+COMMAND_TIMEOUT = 10  # seconds to wait for the owning thread to run a command
+SUBSCRIBER_BUFFER_LIMIT = 256 * 1024  # unsent bytes before a slow subscriber is dropped
+SEARCH_LIMIT = 100
+_WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+LOOPBACK_NAMES = ('localhost', '127.0.0.1', '::1')
+WILDCARD_HOSTS = ('', '0.0.0.0', '::')
+_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+            405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _split_host(value):
+    """(host name, port or None) of a Host header or an Origin's netloc; None if malformed."""
+    try:
+        parts = urllib.parse.urlsplit('//' + value)
+        return (parts.hostname or '').lower(), parts.port
+    except ValueError:
+        return None
+
+
+def song_to_dict(lagu):
+    return {field: getattr(lagu, field) for field in FIELDS} if lagu else None
+
+
+# ========== COMMANDS (run on the thread that owns the core) ==========
+
+def _song_arg(core, args):
+    lagu = core.library.find_by_id(str(args.get('id', '')))
+    if not lagu:
+        raise PlayerError(f"Lagu dengan ID '{args.get('id')}' tidak ditemukan.")
+    return lagu
+
+
+def _played(result):
+    # next_similar returns (lagu, was_fallback); the others return the song
+    return song_to_dict(result[0] if isinstance(result, tuple) else result)
+
+
+def _cmd_play(core, args):
+    lagu = _song_arg(core, args)
+    core.play_song(lagu)
+    return song_to_dict(lagu)
+
+
+def _cmd_next(core, args):
+    return _played(core.next_in_playlist() if core.is_playlist_mode else core.next_similar())
+
+
+def _cmd_prev(core, args):
+    return _played(core.prev_in_playlist() if core.is_playlist_mode else core.prev_from_history())
+
+
+def _cmd_seek(core, args):
+    try:
+        seconds = float(args.get('seconds'))
+    except (TypeError, ValueError):
+        raise PlayerError("Parameter 'seconds' harus berupa angka.")
+    core.seek(seconds)
+
+
+def _cmd_search(core, args):
+    criteria = args.get('criteria', 'judul')
+    if criteria not in ('id', 'judul', 'artis', 'genre', 'tahun'):
+        raise PlayerError(f"Kriteria pencarian '{criteria}' tidak dikenal.")
+    return [song_to_dict(lagu) for lagu in core.search(criteria, str(args.get('value', '')))[:SEARCH_LIMIT]]
+
+
+COMMANDS = {
+    'play': _cmd_play,
+    'pause': lambda core, args: core.pause(),
+    'resume': lambda core, args: core.resume(),
+    'stop': lambda core, args: core.stop(),
+    'next': _cmd_next,
+    'prev': _cmd_prev,
+    'queue_next': lambda core, args: _played(core.next_in_queue()),
+    'enqueue': lambda core, args: song_to_dict(core.enqueue(str(args.get('id', '')))),
+    'seek': _cmd_seek,
+    'search': _cmd_search,
+}
+PLAYBACK_COMMANDS = frozenset(('play', 'stop', 'next', 'prev', 'queue_next'))
+
+
+def status_of(core):
+    state = core.playback_state
+    return {
+        'playing': song_to_dict(core.current_playing),
+        'is_playing': bool(state.get('is_playing')),
+        'duration': state.get('duration_seconds'),
+        'queue_size': core.playback_queue.size(),
+        'autoplay': bool(state.get('autoplay_enabled')),
+        'playlist_mode': core.is_playlist_mode,
+    }
+
+
+# ========== WEBSOCKET FRAMES ==========
+
+def _frame(payload, opcode=0x1):
+    """Encode a single unmasked server frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('>BB', 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack('>BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('>BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def _read_frame(reader):
+    """Read one client frame; returns (opcode, payload). Fragmented messages are not used by clients here."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('>H', await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', await reader.readexactly(8))[0]
+    if length > MAX_BODY:
+        raise ValueError("frame terlalu besar")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return first & 0x0F, payload
+
+
+# ========== SERVER ==========
+
+class RemoteServer(threading.Thread):
+    """HTTP/WebSocket remote control served from its own asyncio loop."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+        if not token and not is_loopback(host):
+            raise ValueError(f"host {host} hanya boleh dipakai bila {TOKEN_ENV} diisi")
+        super().__init__(name="RemoteServer", daemon=True)
+        self.host = host
+        self.port = port
+        self.token = token
+        self.address = None
+        self._commands = queue.Queue()  # (name, args, concurrent.futures.Future)
+        self._subscribers = set()  # StreamWriters of WebSocket clients (loop thread only)
+        self._status = {}  # replaced as a whole by pump(), read by the loop thread
+        self._status_key = None
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        self._error = None
+
+    @classmethod
+    def from_environment(cls):
+        """Build a server from MUSICPLAYER_REMOTE, or return None if it is not set."""
+        setting = os.environ.get(REMOTE_ENV, '').strip()
+        if setting in ('', '0'):
+            return None
+        host, port = DEFAULT_HOST, DEFAULT_PORT
+        if setting != '1':
+            host_part, _, port_part = setting.rpartition(':')
+            host = host_part or DEFAULT_HOST
+            port = int(port_part)
+        return cls(host, port, os.environ.get(TOKEN_ENV) or None)
+
+    def start_server(self):
+        """Start the loop thread and wait until the socket is listening."""
+        self.start()
+        self._ready.wait(5)
+        if self._error is not None:
+            raise self._error
+        print(f"Remote control aktif di http://{self.address[0]}:{self.address[1]}")
+        return self.address
+
+    def stop_server(self):
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+    def run(self):
+        try:
+            asyncio.run(self._serve())
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.address = self._server.sockets[0].getsockname()[:2]
+        self._ready.set()
+        async with self._server:
+            try:
+                await self._server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    # ----- owning thread side -----
+
+    def pump(self, core, max_commands=50):
+        """
+        Run queued commands against the core and publish status changes.
+        Call it regularly from the thread that owns the core.
+
+        Returns:
+            set of command names that were run
+        """
+        ran = set()
+        for _ in range(max_commands):
+            try:
+                name, args, future = self._commands.get_nowait()
+            except queue.Empty:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue  # the client gave up waiting
+            try:
+                future.set_result(COMMANDS[name](core, args))
+                ran.add(name)
+            except Exception as e:
+                future.set_exception(e)
+        self._publish_status(core)
+        return ran
+
+    def _publish_status(self, core):
+        status = status_of(core)
+        key = json.dumps(status, sort_keys=True)
+        status['position'] = round(core.position(), 1)
+        self._status = status
+        if key != self._status_key and self._loop is not None:
+            # Position alone changes every tick; subscribers only hear about real changes
+            self._status_key = key
+            message = json.dumps({'event': 'status', **status}).encode('utf-8')
+            self._loop.call_soon_threadsafe(self._broadcast, message)
+
+    # ----- loop thread side -----
+
+    def _broadcast(self, message):
+        frame = _frame(message)  # encoded once for every subscriber
+        for writer in list(self._subscribers):
+            if writer.transport.get_write_buffer_size() > SUBSCRIBER_BUFFER_LIMIT:
+                self._subscribers.discard(writer)  # not reading; drop it rather than buffer forever
+                writer.close()
+                continue
+            writer.write(frame)
+
+    async def _run_command(self, name, args):
+        future = concurrent.futures.Future()
+        self._commands.put((name, args, future))
+        return await asyncio.wait_for(asyncio.wrap_future(future), COMMAND_TIMEOUT)
+
+    def _same_site(self, headers):
+        """
+        Whether Host names this server and any Origin is this server, so a
+        page from another site (or a rebound DNS name) is refused.
+        """
+        host = _split_host(headers.get('host', ''))
+        if host is None or not host[0] or not self._known_host(*host):
+            return False
+        origin = headers.get('origin')
+        if origin is None:
+            return True  # not sent by a browser page
+        parts = urllib.parse.urlsplit(origin)
+        origin_host = _split_host(parts.netloc) if parts.scheme in ('http', 'https') else None
+        return origin_host is not None and self._known_host(*origin_host)
+
+    def _known_host(self, name, port):
+        if port is not None and self.address is not None and port != self.address[1]:
+            return False
+        if is_loopback(self.host):
+            return name in LOOPBACK_NAMES
+        # Bound to every interface: the token is what keeps others out
+        return self.host in WILDCARD_HOSTS or name == self.host.lower()
+
+    def _authorized(self, headers, params):
+        if not self.token:
+            return True
+        supplied = params.get('token') or headers.get('authorization', '').replace('Bearer ', '', 1)
+        return hmac.compare_digest(supplied.encode('utf-8'), self.token.encode('utf-8'))
+
+    async def _handle(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+            request_line, *header_lines = head.decode('latin-1').split("\r\n")
+            method, target, _ = request_line.split(" ", 2)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ValueError, ConnectionError):
+            writer.close()
+            return
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        url = urllib.parse.urlsplit(target)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            if not self._same_site(headers):
+                await self._respond(writer, 403, {'error': "Host atau Origin tidak diizinkan."})
+            elif not self._authorized(headers, params):
+                await self._respond(writer, 401, {'error': "Token tidak valid."})
+            elif url.path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                await self._websocket(reader, writer, headers)
+            else:
+                await self._http(reader, writer, method, url.path, headers, params)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _http(self, reader, writer, method, path, headers, params):
+        args = dict(params)
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            await self._respond(writer, 400, {'error': "Content-Length tidak valid."})
+            return
+        if length > MAX_BODY:
+            await self._respond(writer, 400, {'error': "Body terlalu besar."})
+            return
+        if length:
+            try:
+                body = json.loads(await reader.readexactly(length))
+            except ValueError:
+                await self._respond(writer, 400, {'error': "Body harus berupa JSON."})
+                return
+            if isinstance(body, dict):
+                args.update(body)
+        name = path.strip('/')
+        if name == 'status':
+            await self._respond(writer, 200, self._status)
+            return
+        if name not in COMMANDS:
+            await self._respond(writer, 404, {'error': f"Perintah '{name}' tidak dikenal."})
+            return
+        if method != 'POST' and name != 'search':
+            await self._respond(writer, 405, {'error': "Gunakan POST untuk perintah."})
+            return
+        status, payload = await self._command_reply(name, args)
+        await self._respond(writer, status, payload)
+
+    async def _command_reply(self, name, args):
+        try:
+            return 200, {'result': await self._run_command(name, args)}
+        except PlayerError as e:
+            return 409, {'error': str(e)}
+        except asyncio.TimeoutError:
+            return 503, {'error': "Pemutar tidak merespons."}
+        except Exception as e:
+            print(f"Error perintah remote {name}: {e}")
+            return 500, {'error': str(e)}
+
+    async def _respond(self, writer, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+        await writer.drain()
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get('sec-websocket-key', '')
+        accept = base64.b64encode(hashlib.sha1(key.encode('latin-1') + _WEBSOCKET_GUID).digest()).decode('ascii')
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode('latin-1'))
+        writer.write(_frame(json.dumps({'event': 'status', **self._status}).encode('utf-8')))
+        self._subscribers.add(writer)
+        try:
+            while True:
+                opcode, payload = await _read_frame(reader)
+                if opcode == 0x8:  # close
+                    writer.write(_frame(payload[:2], 0x8))
+                    break
+                if opcode == 0x9:  # ping
+                    writer.write(_frame(payload, 0xA))
+                elif opcode == 0x1:
+                    await self._websocket_command(writer, payload)
+        except ValueError:
+            pass
+        finally:
+            self._subscribers.discard(writer)
+
+    async def _websocket_command(self, writer, payload):
+        try:
+            message = json.loads(payload)
+            name = message.pop('command')
+        except (ValueError, KeyError, AttributeError, TypeError):
+            reply = {'error': "Pesan harus berupa JSON dengan field 'command'."}
+        else:
+            if name not in COMMANDS:
+                reply = {'command': name, 'error': f"Perintah '{name}' tidak dikenal."}
+            else:
+                _, reply = await self._command_reply(name, message)
+                reply['command'] = name
+        writer.write(_frame(json.dumps(reply).encode('utf-8')))
+
+
+# ========== COMMAND LINE CLIENT ==========
+
+def main(argv):
+    """Send one command to a running player and print the JSON reply."""
+    if not argv:
+        print("Pemakaian: python remote.py status | pause | resume | stop | next | prev | "
+              "queue_next | play ID | enqueue ID | seek DETIK | search KRITERIA NILAI")
+        return 1
+    server = RemoteServer.from_environment() or RemoteServer()
+    name, rest = argv[0], argv[1:]
+    args = {}
+    if name in ('play', 'enqueue') and rest:
+        args['id'] = rest[0]
+    elif name == 'seek' and rest:
+        args['seconds'] = rest[0]
+    elif name == 'search' and len(rest) >= 2:
+        args = {'criteria': rest[0], 'value': " ".join(rest[1:])}
+    base = f"http://{server.host}:{server.port}/{name}"
+    if name in ('status', 'search'):
+        request = urllib.request.Request(base + "?" + urllib.parse.urlencode(args))
+    else:
+        request = urllib.request.Request(base, data=json.dumps(args).encode('utf-8'), method='POST',
+                                         headers={'Content-Type': 'application/json'})
+    if server.token:
+        request.add_header('Authorization', f"Bearer {server.token}")
+    try:
+        with urllib.request.urlopen(request, timeout=COMMAND_TIMEOUT + 5) as response:
+            print(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        print(e.read().decode('utf-8'))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
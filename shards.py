@@ -0,0 +1,314 @@
+"""
+Sharded Library for Music Player Application
+Splits the library into several shard files (per genre, per folder, or any
+named shard such as one per user) that are loaded only when needed and are
+searched through one merged view. A small manifest keeps an index from song
+ID to shard, so ID uniqueness checks and lookups by ID never load every shard.
+
+Convert an existing single-file library with:
+    python shards.py genre        # or: folder
+"""
+
+import os
+import pickle
+import re
+import sys
+
+from instrumentation import traced
+from models import SinglyLinkedList
+
+SHARD_DIR = "music_player_shards"
+MANIFEST_NAME = "manifest"
+DEFAULT_SHARD = "default"
+
+
+def shard_by_genre(lagu):
+    return lagu.genre or "Lainnya"
+
+
+def shard_by_folder(lagu):
+    return os.path.dirname(lagu.file_path or "") or "tanpa-folder"
+
+
+# Placement policies by name, so the manifest stays picklable
+SHARD_KEYS = {
+    'genre': shard_by_genre,
+    'folder': shard_by_folder,
+    None: lambda lagu: DEFAULT_SHARD,
+}
+
+
+class LibraryShard:
+    """One shard file; its songs are unpickled on first access."""
+
+    def __init__(self, name, file_name, size=0):
+        self.name = name
+        self.file_name = file_name
+        self.size = size
+        self.library = None  # SinglyLinkedList once loaded
+        self.saved_version = None  # library.version at the last load/save
+
+    @property
+    def loaded(self):
+        return self.library is not None
+
+    @property
+    def dirty(self):
+        return self.loaded and self.library.version != self.saved_version
+
+    def load(self, directory):
+        if self.library is None:
+            path = os.path.join(directory, self.file_name)
+            try:
+                with open(path, 'rb') as f:
+                    self.library = pickle.load(f)
+            except FileNotFoundError:
+                self.library = SinglyLinkedList()
+            self.saved_version = self.library.version
+            print(f"Shard '{self.name}' dimuat ({self.library.size} lagu)")
+        return self.library
+
+    def save(self, directory):
+        path = os.path.join(directory, self.file_name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.library, f)
+        os.replace(tmp_path, path)  # a crash mid-write never leaves a half shard
+        self.saved_version = self.library.version
+
+
+class ShardedLibrary:
+    """
+    Merged view over library shards with the SinglyLinkedList interface
+    used by the core (append, insert, index_of, find_by_id, find_by_criteria,
+    remove_by_id, get_all_lagu, mark_changed, version, size).
+
+    New songs go to the shard chosen by the placement policy (or an explicit
+    shard name); edits never move a song between shards. Only the active
+    shards (all by default) make up the merged view; find_by_id reaches every
+    shard through the ID index.
+    """
+
+    def __init__(self, directory=SHARD_DIR, key=None):
+        self.directory = directory
+        self.key = key
+        self.shards = {}  # name -> LibraryShard
+        self.index = {}  # song id -> shard name
+        self.active = None  # shard names in the merged view; None = all
+        self._version = 0
+        self._manifest_dirty = False
+        self._load_listeners = []  # callables(songs) told about each shard as it loads
+        self._load_manifest()
+
+    # ----- manifest -----
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path(), 'rb') as f:
+                manifest = pickle.load(f)
+        except FileNotFoundError:
+            return
+        self.key = manifest.get('key', self.key)
+        self.index = manifest['index']
+        self.active = manifest.get('active')
+        self.shards = {name: LibraryShard(name, info['file'], info['size'])
+                       for name, info in manifest['shards'].items()}
+
+    def _save_manifest(self):
+        manifest = {
+            'key': self.key,
+            'index': self.index,
+            'active': self.active,
+            'shards': {name: {'file': s.file_name, 'size': s.size} for name, s in self.shards.items()},
+        }
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path())
+        self._manifest_dirty = False
+
+    @traced("persistence.save_shards")
+    def save_shards(self):
+        """Write every shard that changed since it was loaded, then the manifest."""
+        os.makedirs(self.directory, exist_ok=True)
+        saved = 0
+        for shard in self.shards.values():
+            if shard.dirty:
+                shard.save(self.directory)
+                saved += 1
+        if saved or self._manifest_dirty:
+            self._save_manifest()
+        print(f"{saved} shard disimpan ke {self.directory}")
+
+    def __getstate__(self):
+        # Inside the main data file only the location is stored; the songs
+        # live in the shard files and are reopened lazily.
+        return {'directory': self.directory, 'key': self.key}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'], state.get('key'))
+
+    # ----- shards -----
+
+    def _shard(self, name, create=False):
+        shard = self.shards.get(name)
+        if shard is None and create:
+            safe = re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_') or 'shard'
+            shard = self.shards[name] = LibraryShard(name, f"{safe}-{len(self.shards)}.shard")
+            shard.library = SinglyLinkedList()
+            shard.saved_version = None  # new shards are always written
+            self._manifest_dirty = True
+        return shard
+
+    def _loaded(self, shard):
+        if not shard.loaded:
+            shard.load(self.directory)
+            self._version += 1  # the merged view just gained rows
+            for callback in self._load_listeners:
+                callback(shard.library.get_all_lagu())
+        return shard.library
+
+    def add_load_listener(self, callback):
+        """Call callback(songs) with the songs of every shard loaded from now on."""
+        if callback not in self._load_listeners:
+            self._load_listeners.append(callback)
+
+    def loaded_lagu(self):
+        """Songs of the active shards that are already in memory; loads nothing."""
+        songs = []
+        for shard in self.active_shards():
+            if shard.loaded:
+                songs.extend(shard.library.get_all_lagu())
+        return songs
+
+    def active_shards(self):
+        names = self.shards if self.active is None else [n for n in self.active if n in self.shards]
+        return [self.shards[name] for name in names]
+
+    def set_active(self, names):
+        """Limit the merged view to the given shard names (None = every shard)."""
+        self.active = list(names) if names is not None else None
+        self._manifest_dirty = True
+        self._version += 1
+
+    def shard_of(self, id_lagu):
+        """Name of the shard holding a song, without loading anything."""
+        return self.index.get(id_lagu)
+
+    # ----- SinglyLinkedList interface -----
+
+    @property
+    def version(self):
+        return self._version + sum(s.library.version for s in self.shards.values() if s.loaded)
+
+    @property
+    def size(self):
+        return sum(shard.size for shard in self.active_shards())
+
+    def append(self, lagu, shard=None):
+        """Add a song to an explicit shard or the one the placement policy picks."""
+        self.insert(None, lagu, shard)
+
+    def insert(self, index, lagu, shard=None):
+        """Insert a song at a position within its shard (None appends)."""
+        name = shard or SHARD_KEYS.get(self.key, SHARD_KEYS[None])(lagu)
+        target = self._shard(name, create=True)
+        self._loaded(target).insert(index, lagu)
+        target.size += 1
+        self.index[lagu.id] = name
+        self._manifest_dirty = True
+        if self.active is not None and name not in self.active:
+            self.active.append(name)
+
+    def find_by_id(self, id_lagu):
+        name = self.index.get(id_lagu)
+        if name is None:
+            return None  # unknown IDs are answered from the index alone
+        return self._loaded(self.shards[name]).find_by_id(id_lagu)
+
+    def index_of(self, id_lagu):
+        """Position of a song within its own shard, where insert() puts it back."""
+        name = self.index.get(id_lagu)
+        if name is None:
+            return None
+        return self._loaded(self.shards[name]).index_of(id_lagu)
+
+    def remove_by_id(self, id_lagu):
+        name = self.index.get(id_lagu)
+        if name is None:
+            return None
+        shard = self.shards[name]
+        lagu = self._loaded(shard).remove_by_id(id_lagu)
+        if lagu:
+            shard.size -= 1
+            del self.index[id_lagu]
+            self._manifest_dirty = True
+        return lagu
+
+    def find_by_criteria(self, **kwargs):
+        results = []
+        for shard in self.active_shards():
+            results.extend(self._loaded(shard).find_by_criteria(**kwargs))
+        return results
+
+    def __iter__(self):
+        for shard in self.active_shards():
+            yield from self._loaded(shard)
+
+    def get_all_lagu(self):
+        songs = []
+        for shard in self.active_shards():
+            songs.extend(self._loaded(shard).get_all_lagu())
+        return songs
+
+    def mark_changed(self, lagu=None):
+        """Record an in-place edit; only the song's own shard is rewritten."""
+        name = self.index.get(lagu.id) if lagu is not None else None
+        if name is not None:
+            self._loaded(self.shards[name]).mark_changed()
+        else:
+            for shard in self.shards.values():
+                if shard.loaded:
+                    shard.library.mark_changed()
+
+    def display(self):
+        for lagu in self.get_all_lagu():
+            print(lagu)
+
+    @classmethod
+    def from_library(cls, library, directory=SHARD_DIR, key='genre'):
+        """Split an existing SinglyLinkedList into shards."""
+        sharded = cls(directory, key)
+        for lagu in library.get_all_lagu():
+            if lagu.id not in sharded.index:
+                sharded.append(lagu)
+        return sharded
+
+
+def convert_data_file(key='genre', directory=SHARD_DIR):
+    """Move the library of the main data file into shards, keeping the playlists."""
+    from utils import load_data, save_data
+
+    data = load_data(on_error=lambda title, message: print(f"{title}: {message}"))
+    if not data:
+        print("Tidak ada data untuk dikonversi.")
+        return None
+    library = data['library']
+    if isinstance(library, ShardedLibrary):
+        print(f"Library sudah berbentuk shard di {library.directory}.")
+        return library
+    sharded = ShardedLibrary.from_library(library, directory, key)
+    save_data(sharded, data.get('playlists', {}))
+    print(f"{library.size} lagu dibagi ke {len(sharded.shards)} shard berdasarkan {key}.")
+    return sharded
+
+
+if __name__ == "__main__":
+    by = sys.argv[1] if len(sys.argv) > 1 else 'genre'
+    if by not in ('genre', 'folder'):
+        print("Pemakaian: python shards.py [genre|folder]")
+        sys.exit(1)
+    convert_data_file(by)
@@ -0,0 +1,102 @@
+"""
+Sorting Helpers for Music Player Application
+Caches per-column sort keys and permutations for the library views so a
+header click only reorders row indices instead of rebuilding row tuples.
+"""
+
+from array import array
+
+
+def _text_key(value):
+    return "" if value is None else str(value).casefold()
+
+
+def _number_key(value):
+    return value if isinstance(value, int) else -1
+
+
+# Treeview column heading -> sort key for a Lagu
+COLUMN_KEYS = {
+    "ID": lambda lagu: _text_key(lagu.id),
+    "Judul": lambda lagu: _text_key(lagu.judul),
+    "Artis": lambda lagu: _text_key(lagu.artis),
+    "Album": lambda lagu: _text_key(lagu.album),
+    "Genre": lambda lagu: _text_key(lagu.genre),
+    "Tahun": lambda lagu: _number_key(lagu.tahun),
+    "File": lambda lagu: _text_key(lagu.file_path),
+}
+
+POSITION_COLUMN = "No"  # keeps the original list order
+
+
+class SortKeyCache:
+    """Cached sort permutations for one list of songs, invalidated by a version token."""
+
+    MAX_SORT_COLUMNS = 3
+
+    def __init__(self):
+        self.rows = []
+        self.version = None
+        self._ranks = {}  # column -> array of dense ranks (equal keys share a rank)
+        self._orders = {}  # (column, descending) -> cached single-column permutation
+
+    def update(self, rows_provider, version):
+        """Refresh the rows only if the underlying list changed since the last call."""
+        if self.version is None or version != self.version:
+            self.rows = list(rows_provider())
+            self.version = version
+            self._ranks.clear()
+            self._orders.clear()
+        return self.rows
+
+    def ranks(self, column):
+        """Return dense ranks of every row for a column, computing them once."""
+        ranks = self._ranks.get(column)
+        if ranks is None:
+            n = len(self.rows)
+            if column == POSITION_COLUMN:
+                ranks = array('l', range(n))
+            else:
+                key = COLUMN_KEYS[column]
+                keys = [key(lagu) for lagu in self.rows]
+                ranks = array('l', [0]) * n
+                rank, previous = -1, object()
+                for i in sorted(range(n), key=keys.__getitem__):
+                    if keys[i] != previous:
+                        rank += 1
+                        previous = keys[i]
+                    ranks[i] = rank
+            self._ranks[column] = ranks
+        return ranks
+
+    def order(self, spec):
+        """
+        Return row indices ordered by one or more columns.
+
+        Args:
+            spec: list of (column, descending) pairs, most significant first
+
+        Returns:
+            List of row indices; equal rows keep their original list order
+        """
+        if len(spec) == 1:
+            cached = self._orders.get(spec[0])
+            if cached is None:
+                column, descending = spec[0]
+                cached = sorted(range(len(self.rows)), key=self.ranks(column).__getitem__, reverse=descending)
+                self._orders[spec[0]] = cached
+            return cached
+        # Stable multi-column sort: least significant column first, each pass
+        # keyed by a cached integer rank array rather than per-row tuples
+        order = list(range(len(self.rows)))
+        for column, descending in reversed(spec):
+            order.sort(key=self.ranks(column).__getitem__, reverse=descending)
+        return order
+
+    @classmethod
+    def next_spec(cls, spec, column):
+        """Return the sort spec after a header click on column."""
+        if spec and spec[0][0] == column:
+            return [(column, not spec[0][1])] + spec[1:]
+        rest = [item for item in spec if item[0] != column]
+        return ([(column, False)] + rest)[:cls.MAX_SORT_COLUMNS]
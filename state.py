@@ -0,0 +1,213 @@
+"""
+Shared State for Music Player Application
+MusicPlayerCore is the single writer of the library, playlists, queue and
+playback state: its mutating methods run inside StateStore.writing(), which
+serializes writers on one lock and bumps a sequence number before and after
+each change. Readers on other threads never take that lock. snapshot()
+captures an immutable Snapshot and retries if a write overlapped it (a
+seqlock), so background jobs get a consistent view without blocking the UI.
+Songs are frozen into SongView tuples that are reused until the song is
+edited, so a snapshot after a small change walks references instead of
+copying the library.
+"""
+
+import collections
+import functools
+import threading
+import types
+
+from models import Lagu
+from paths import resolve_path
+
+MAX_OPTIMISTIC_READS = 3  # overlapped attempts before a reader waits for the writer lock
+PLAYBACK_EXCLUDED = ('engine', 'stats')  # live objects, not state
+
+LIBRARY, PLAYLISTS = 'library', 'playlists'  # keys of the cached song tuples
+
+
+class SongView(collections.namedtuple('SongView', Lagu.__slots__)):
+    """Immutable copy of a Lagu; read-only code can use it in place of one."""
+    __slots__ = ()
+
+    @property
+    def audio_path(self):
+        return resolve_path(self.file_path)
+
+    def __str__(self):
+        return f"{self.judul} - {self.artis}"
+
+
+class Snapshot:
+    """The core's state at one point of its write sequence. Never changes."""
+
+    def __init__(self, sequence, songs, playlists, queue, playback, profile):
+        self.sequence = sequence
+        self.songs = songs  # tuple of SongView, library order
+        self.playlists = playlists  # read-only mapping name -> tuple of SongView
+        self.queue = queue  # tuple of SongView
+        self.playback = playback  # read-only mapping; songs as SongView, history as a tuple
+        self.profile = profile
+        self._by_id = None
+
+    def __iter__(self):
+        return iter(self.songs)
+
+    def __len__(self):
+        return len(self.songs)
+
+    def get_all_lagu(self):
+        return list(self.songs)
+
+    def find_by_id(self, id_lagu):
+        if self._by_id is None:
+            self._by_id = {view.id: view for view in self.songs}
+        return self._by_id.get(id_lagu)
+
+
+class StateStore:
+    """Single-writer lock, write sequence and copy-on-write snapshots of a core."""
+
+    def __init__(self, core):
+        self.core = core
+        self.lock = threading.RLock()  # held by the writer for a whole mutating call
+        self.sequence = 0  # odd while a write is in progress
+        self._depth = 0
+        self._read_lock = threading.Lock()  # readers share the view caches
+        self._views = {}  # id(Lagu) -> (Lagu, SongView); holding the Lagu keeps its id unique
+        self._edits = 0  # bumped by touch(), invalidates cached song tuples
+        self._tuples = {}  # container key -> (id(container), version, edits, tuple)
+        self._latest = None
+
+    # ----- writer side -----
+
+    def writing(self):
+        return _WriteSection(self)
+
+    def touch(self, lagu):
+        """Record an in-place edit of a song so snapshots stop reusing its old view."""
+        self._views.pop(id(lagu), None)
+        self._edits += 1
+
+    def _begin(self):
+        self.lock.acquire()
+        self._depth += 1
+        if self._depth == 1:
+            self.sequence += 1
+
+    def _end(self):
+        try:
+            if self._depth == 1:
+                self.sequence += 1
+        finally:
+            self._depth -= 1
+            self.lock.release()
+
+    # ----- reader side -----
+
+    def snapshot(self):
+        """
+        Return a Snapshot of the current state; safe on any thread. The last
+        snapshot is returned again while nothing has been written since.
+        """
+        with self._read_lock:
+            latest = self._latest
+            if latest is not None and latest.sequence == self.sequence:
+                return latest
+            for _ in range(MAX_OPTIMISTIC_READS):
+                start = self.sequence
+                if start % 2:
+                    break  # a write is in progress
+                fresh = {}
+                try:
+                    snapshot = self._capture(start, fresh)
+                except RuntimeError:  # a container changed size while it was read
+                    snapshot = None
+                if snapshot is not None and self.sequence == start:
+                    self._commit(snapshot, fresh, start)
+                    return snapshot
+            with self.lock:
+                fresh = {}
+                snapshot = self._capture(self.sequence, fresh)
+                self._commit(snapshot, fresh, self.sequence)
+                return snapshot
+
+    def _commit(self, snapshot, fresh, sequence):
+        """Cache a validated capture and its new views, unless a write has started since."""
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            if self.sequence != sequence:
+                return
+            self._latest = snapshot
+            views = self._views
+            views.update(fresh)
+            if len(views) > 2 * (self.core.library.size + 1024):
+                # Drop views of songs that left the library
+                live = {id(lagu) for lagu in self.core.library}
+                for key in [key for key in views if key not in live]:
+                    del views[key]
+        finally:
+            self.lock.release()
+
+    def _capture(self, sequence, fresh):
+        core = self.core
+        views = self._views
+
+        def view(lagu):
+            if lagu is None:
+                return None
+            entry = views.get(id(lagu)) or fresh.get(id(lagu))
+            if entry is None or entry[0] is not lagu:
+                entry = fresh[id(lagu)] = (lagu, SongView._make(lagu.__getstate__()))
+            return entry[1]
+
+        def frozen(key, container, version):
+            cached = self._tuples.get(key)
+            if cached is not None and cached[:3] == (id(container), version, self._edits):
+                return cached[3]
+            edits = self._edits
+            songs = tuple(map(view, container))
+            self._tuples[key] = (id(container), version, edits, songs)
+            return songs
+
+        songs = frozen(LIBRARY, core.library, core.library.version)
+        playlists = {name: frozen((PLAYLISTS, name), playlist, playlist.version)
+                     for name, playlist in list(core.playlists.items())}
+        queue = tuple(map(view, tuple(core.playback_queue.items)))
+        playback = {}
+        for key, value in list(core.playback_state.items()):
+            if key in PLAYBACK_EXCLUDED:
+                continue
+            if isinstance(value, Lagu):
+                value = view(value)
+            elif key == 'history':
+                value = tuple(map(view, tuple(value.items)))
+            playback[key] = value
+        playback['is_playlist_mode'] = core.is_playlist_mode
+        profile = core.profile.name if core.profile is not None else None
+        return Snapshot(sequence, songs, types.MappingProxyType(playlists), queue,
+                        types.MappingProxyType(playback), profile)
+
+
+class _WriteSection:
+    __slots__ = ('store',)
+
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        self.store._begin()
+        return self.store
+
+    def __exit__(self, *exc_info):
+        self.store._end()
+        return False
+
+
+def writes(method):
+    """Run a MusicPlayerCore method as one write of its StateStore."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.state.writing():
+            return method(self, *args, **kwargs)
+    return wrapper
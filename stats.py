@@ -0,0 +1,276 @@
+"""
+Play Statistics for Music Player Application
+Records every play to an append-only event log and keeps the aggregates
+(per-song, per-artist and per-genre) up to date as events arrive, so the
+statistics screen reads ready-made numbers instead of rescanning the log.
+"""
+
+import heapq
+import json
+import os
+import pickle
+import time
+
+from instrumentation import traced
+
+STATS_FILE = "music_player_stats"
+PLAY_LOG_FILE = "music_player_plays.log"
+
+# A play that ends before this fraction of the track has been heard is a skip
+SKIP_THRESHOLD = 0.5
+
+
+class SongStats:
+    """Aggregated listening numbers for a single song."""
+
+    def __init__(self, judul, artis, genre):
+        self.judul = judul
+        self.artis = artis
+        self.genre = genre
+        self.play_count = 0
+        self.listen_seconds = 0.0
+        self.skips = 0
+        self.last_played = None
+
+
+class PlayStats:
+    """Incrementally maintained play statistics backed by an event log."""
+
+    def __init__(self, log_path=PLAY_LOG_FILE):
+        self.log_path = log_path  # event log this snapshot belongs to
+        self.songs = {}  # song id -> SongStats
+        self.artist_plays = {}  # artis -> play count
+        self.genre_plays = {}  # genre -> play count
+        self.total_plays = 0
+        self.total_listen_seconds = 0.0
+        self.total_skips = 0
+        self.log_offset = 0  # bytes of the log already folded into the aggregates
+        self._current = None  # the play that is still running
+        self._listeners = []  # callbacks notified with the Lagu after each recorded play
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_current'] = None
+        state['_listeners'] = []
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault('_listeners', [])
+        state.setdefault('log_path', PLAY_LOG_FILE)
+        self.__dict__.update(state)
+
+    def add_listener(self, callback):
+        """Register a callback called with the Lagu after each recorded play."""
+        self._listeners.append(callback)
+
+    # ----- event recording -----
+
+    def record_play(self, lagu, duration_seconds=None):
+        """Close the running play (if any) and start counting a new one."""
+        now = time.time()
+        self._finish_current(now)
+        self._apply_play(lagu.id, lagu.judul, lagu.artis, lagu.genre, now)
+        self._write_event({'event': 'play', 't': now, 'id': lagu.id, 'judul': lagu.judul,
+                           'artis': lagu.artis, 'genre': lagu.genre})
+        self._current = {
+            'id': lagu.id,
+            'started': now,
+            'paused_at': None,
+            'paused_total': 0.0,
+            'duration': duration_seconds,
+        }
+        for callback in self._listeners:
+            callback(lagu)
+
+    def record_pause(self):
+        """Stop the listen-time clock of the running play."""
+        if self._current and self._current['paused_at'] is None:
+            self._current['paused_at'] = time.time()
+
+    def record_resume(self):
+        """Restart the listen-time clock of the running play."""
+        if self._current and self._current['paused_at'] is not None:
+            self._current['paused_total'] += time.time() - self._current['paused_at']
+            self._current['paused_at'] = None
+
+    def record_stop(self):
+        """Close the running play without starting a new one."""
+        self._finish_current(time.time())
+
+    def set_duration(self, lagu, seconds):
+        """Give the running play of a song the length the engine probed, for skip detection."""
+        if self._current and self._current['id'] == lagu.id and seconds:
+            self._current['duration'] = seconds
+
+    def discard_play(self, lagu):
+        """
+        Retract the running play of a song whose file failed to load: it
+        counts neither as a play nor as listening time.
+
+        Returns:
+            True if a play was retracted
+        """
+        current = self._current
+        if not current or current['id'] != lagu.id:
+            return False
+        self._current = None
+        self._apply_discard(lagu.id)
+        self._write_event({'event': 'discard', 't': time.time(), 'id': lagu.id})
+        return True
+
+    def _finish_current(self, now):
+        current = self._current
+        if not current:
+            return
+        self._current = None
+        end = current['paused_at'] if current['paused_at'] is not None else now
+        listened = max(0.0, end - current['started'] - current['paused_total'])
+        duration = current['duration']
+        skipped = bool(duration) and listened < duration * SKIP_THRESHOLD
+        self._apply_end(current['id'], listened, skipped)
+        self._write_event({'event': 'end', 't': now, 'id': current['id'],
+                           'listened': round(listened, 3), 'skipped': skipped})
+
+    # ----- aggregate maintenance -----
+
+    def _apply_play(self, id_lagu, judul, artis, genre, timestamp):
+        song = self.songs.get(id_lagu)
+        if song is None:
+            song = SongStats(judul, artis, genre)
+            self.songs[id_lagu] = song
+        else:
+            # Keep the labels in sync with the latest metadata of the song
+            song.judul, song.artis, song.genre = judul, artis, genre
+        song.play_count += 1
+        song.last_played = timestamp
+        self.artist_plays[artis] = self.artist_plays.get(artis, 0) + 1
+        self.genre_plays[genre] = self.genre_plays.get(genre, 0) + 1
+        self.total_plays += 1
+
+    def _apply_end(self, id_lagu, listened, skipped):
+        song = self.songs.get(id_lagu)
+        if song is not None:
+            song.listen_seconds += listened
+            if skipped:
+                song.skips += 1
+        self.total_listen_seconds += listened
+        if skipped:
+            self.total_skips += 1
+
+    def _apply_discard(self, id_lagu):
+        song = self.songs.get(id_lagu)
+        if song is None or not song.play_count:
+            return
+        song.play_count -= 1
+        if not song.play_count and not song.listen_seconds:
+            del self.songs[id_lagu]  # it had never played before
+        # The labels were set by the play being retracted
+        for counts, key in ((self.artist_plays, song.artis), (self.genre_plays, song.genre)):
+            if counts.get(key):
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+        self.total_plays -= 1
+
+    def _apply_event(self, event):
+        if event.get('event') == 'play':
+            self._apply_play(event['id'], event.get('judul'), event.get('artis'),
+                             event.get('genre'), event.get('t'))
+        elif event.get('event') == 'end':
+            self._apply_end(event['id'], event.get('listened', 0.0), event.get('skipped', False))
+        elif event.get('event') == 'discard':
+            self._apply_discard(event['id'])
+
+    def _write_event(self, event):
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event) + "\n")
+                self.log_offset = f.tell()
+        except OSError as e:
+            print(f"Error saat menulis log pemutaran: {e}")
+
+    def replay_log_tail(self):
+        """Fold events written after the last saved snapshot into the aggregates."""
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() < self.log_offset:
+                    # Log was truncated or replaced; the snapshot is all we have
+                    self.log_offset = f.tell()
+                    return 0
+                f.seek(self.log_offset)
+                replayed = 0
+                for line in iter(f.readline, ''):
+                    try:
+                        self._apply_event(json.loads(line))
+                        replayed += 1
+                    except (ValueError, KeyError):
+                        continue
+                self.log_offset = f.tell()
+                return replayed
+        except FileNotFoundError:
+            return 0
+
+    # ----- queries -----
+
+    def get_play_count(self, id_lagu):
+        """Return how many times a song has been played."""
+        song = self.songs.get(id_lagu)
+        return song.play_count if song else 0
+
+    def top_songs(self, n=10):
+        """Return the n most played songs as (id, SongStats) pairs."""
+        return heapq.nlargest(n, self.songs.items(), key=lambda item: item[1].play_count)
+
+    def top_artists(self, n=10):
+        """Return the n most played artists as (artis, count) pairs."""
+        return heapq.nlargest(n, self.artist_plays.items(), key=lambda item: item[1])
+
+    def top_genres(self, n=10):
+        """Return the n most played genres as (genre, count) pairs."""
+        return heapq.nlargest(n, self.genre_plays.items(), key=lambda item: item[1])
+
+
+@traced("persistence.save_stats")
+def save_stats(stats, path=STATS_FILE):
+    """
+    Save the aggregated statistics snapshot using pickle. A play that is
+    still running is not part of the snapshot and keeps counting.
+
+    Args:
+        stats: PlayStats object to save
+        path: Snapshot file (a profile's own file for per-user statistics)
+    """
+    try:
+        with open(path, 'wb') as f:
+            pickle.dump(stats, f)
+        print(f"Statistik berhasil disimpan ke {path}")
+    except Exception as e:
+        print(f"Error saat menyimpan statistik: {e}")
+
+
+@traced("persistence.load_stats")
+def load_stats(path=STATS_FILE, log_path=PLAY_LOG_FILE):
+    """
+    Load the statistics snapshot and catch up with the play log.
+
+    Args:
+        path: Snapshot file
+        log_path: Event log that belongs to the snapshot
+
+    Returns:
+        PlayStats object (empty if no snapshot exists yet)
+    """
+    try:
+        with open(path, 'rb') as f:
+            stats = pickle.load(f)
+        stats.log_path = log_path
+    except FileNotFoundError:
+        stats = PlayStats(log_path)
+    except Exception as e:
+        print(f"Error saat memuat statistik: {e}")
+        stats = PlayStats(log_path)
+    replayed = stats.replay_log_tail()
+    if replayed:
+        print(f"{replayed} event pemutaran dipulihkan dari {log_path}")
+    return stats
@@ -3,43 +3,70 @@ Utility Functions for Music Player Application
 Contains audio playback and data persistence functions.
 """
 
-import pygame
 import os
 import pickle
 from tkinter import messagebox
 from models import Lagu, DoublyLinkedList
+from audio_cache import AudioBufferCache
+from loudness import gain_to_scalar
+from instrumentation import traced
+from profiles import playlist_ids, restore_playlist
 
 DATA_FILE = "music_player_data"
 
+AUDIO_CACHE_BYTES = 64 * 1024 * 1024  # memory cap for cached audio buffers
 
+_audio_engine = None  # shared AudioEngine, started on first use
 
 
 
 
-def save_data(library, playlists):
+
+
+@traced("persistence.save")
+def save_data(library, playlists, on_error=None):
     """
     Save library and playlists to file using pickle.
     
     Args:
-        library: SinglyLinkedList containing all songs
+        library: SinglyLinkedList containing all songs, or a ShardedLibrary
+            whose changed shards are written to their own files first
         playlists: Dictionary of playlist names to DoublyLinkedList objects
+        on_error: Optional callable(title, message) used instead of a messagebox,
+            e.g. when running without a display
+
+    Returns:
+        True if the data was written
     """
     data_to_save = {
         'library': library,
         'playlists': playlists
     }
     try:
+        if hasattr(library, 'save_shards'):
+            library.save_shards()
+            # The songs live in the shards; playlists keep only IDs, so after
+            # a restart they share the shards' Lagu objects instead of copies
+            data_to_save['playlists'] = None
+            data_to_save['playlist_ids'] = {name: playlist_ids(playlist) for name, playlist in playlists.items()}
         with open(DATA_FILE, 'wb') as f:
             pickle.dump(data_to_save, f)
         print(f"Data berhasil disimpan ke {DATA_FILE}")
+        return True
     except Exception as e:
-        messagebox.showerror("Error Penyimpanan", f"Gagal menyimpan data ke {DATA_FILE}.\nError: {e}")
+        (on_error or messagebox.showerror)("Error Penyimpanan", f"Gagal menyimpan data ke {DATA_FILE}.\nError: {e}")
         print(f"Error saat menyimpan data: {e}")
+        return False
 
 
-def load_data():
+@traced("persistence.load")
+def load_data(on_error=None):
     """
     Load library and playlists from file using pickle.
+
+    Args:
+        on_error: Optional callable(title, message) used instead of a messagebox,
+            e.g. when loading from a background thread
     
     Returns:
         Dictionary containing 'library' and 'playlists' or None if file not found
@@ -48,14 +75,20 @@ def load_data():
         with open(DATA_FILE, 'rb') as f:
             data = pickle.load(f)
         print(f"Data berhasil dimuat dari {DATA_FILE}")
-        
-
+        library = data.get('library')
+        if hasattr(library, 'shard_of'):
+            # Resolve through the shard ID index (only the shards they use are
+            # loaded); files written by value are re-pointed the same way
+            states = data.get('playlist_ids')
+            if states is None:
+                states = {name: playlist_ids(playlist) for name, playlist in (data.get('playlists') or {}).items()}
+            data['playlists'] = {name: restore_playlist(state, library.find_by_id) for name, state in states.items()}
         return data
     except FileNotFoundError:
         print(f"File {DATA_FILE} tidak ditemukan. Akan dibuat saat data pertama kali disimpan.")
         return None
     except Exception as e:
-        messagebox.showerror("Error Pemuatan", f"Gagal memuat data dari {DATA_FILE}.\nError: {e}")
+        (on_error or messagebox.showerror)("Error Pemuatan", f"Gagal memuat data dari {DATA_FILE}.\nError: {e}")
         print(f"Error saat memuat data: {e}")
         return None
 
@@ -88,6 +121,7 @@ def load_dummy_data(library, playlists):
     playlists["Lagu Favorit Saya"] = playlist_fav
 
 
+@traced("playback.duration_probe")
 def get_duration_seconds(file_path):
     """Return duration of audio file in seconds.
 
@@ -105,6 +139,7 @@ def get_duration_seconds(file_path):
 
     # Fallback: pygame.mixer.Sound
     try:
+        import pygame
         # Ensure mixer initialized
         if not pygame.get_init():
             pygame.init()
@@ -116,85 +151,171 @@ def get_duration_seconds(file_path):
 
 
 # Audio playback functions
+def init_audio():
+    """
+    Import pygame, initialize the mixer and start the audio engine.
+
+    Safe to call from a background thread; raises if the mixer cannot start.
+
+    Returns:
+        The shared AudioEngine
+    """
+    import pygame
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+    return get_audio_engine()
+
+
+def get_audio_engine():
+    """Return the shared audio engine, starting its thread on first use."""
+    global _audio_engine
+    if _audio_engine is None:
+        from audio_engine import AudioEngine  # pulls in pygame; kept off the import path
+        _audio_engine = AudioEngine(duration_probe=get_duration_seconds,
+                                    buffer_cache=AudioBufferCache(AUDIO_CACHE_BYTES))
+        _audio_engine.start()
+    return _audio_engine
+
+
+def _engine_for(playback_state):
+    """Return the engine a playback state uses (a NullAudioEngine when headless)."""
+    return playback_state.get('engine') or get_audio_engine()
+
+
+@traced("playback.play")
 def play_file(lagu, playback_state):
     """
-    Load and play an audio file using pygame.
-    
+    Ask the audio engine to load and play an audio file.
+
+    Loading happens on the engine thread, so this returns immediately; load
+    errors arrive later as an EVENT_ERROR from the engine.
+
     Args:
         lagu: Lagu object to play
         playback_state: Dictionary containing playback state information
     
     Returns:
-        bool: True if playback started successfully, False otherwise
-    """
-    if lagu and lagu.file_path and os.path.isfile(lagu.file_path):
-        try:
-            pygame.mixer.music.load(lagu.file_path)
-            pygame.mixer.music.play()
-            playback_state['current_playing'] = lagu
-            playback_state['current_file_path'] = lagu.file_path
-            playback_state['is_playing'] = True
-            # Try to determine duration and store in playback_state
-            try:
-                dur = get_duration_seconds(lagu.file_path)
-                playback_state['duration_seconds'] = dur
-            except Exception:
-                playback_state['duration_seconds'] = None
-            
-
-            
-            # Update history
-            if playback_state.get('_previous_playing'):
-                playback_state['history'].push(playback_state['_previous_playing'])
-            playback_state['_previous_playing'] = lagu
-            
-            print(f"Memutar: {lagu.judul} dari {lagu.file_path}")
-            return True
-        except pygame.error as e:
-            messagebox.showerror("Error Audio", f"Tidak dapat memutar file {lagu.file_path}.\nError: {e}")
-            print(f"Pygame error saat memutar {lagu.file_path}: {e}")
-            return False
+        bool: True if the play command was sent, False if the file is missing
+    """
+    path = lagu.audio_path if lagu else None
+    if path and os.path.isfile(path):
+        # Only the cached gain is applied here; analysis runs in the background
+        gain_db = lagu.gain if playback_state.get('normalize_loudness', True) else None
+        _engine_for(playback_state).play(path, lagu, gain_to_scalar(gain_db))
+        playback_state['current_playing'] = lagu
+        playback_state['current_file_path'] = path
+        playback_state['is_playing'] = True
+        # Known duration is used right away; otherwise the engine reports it
+        playback_state['duration_seconds'] = lagu.durasi
+
+        # Record the play event for the statistics screen
+        stats = playback_state.get('stats')
+        if stats:
+            stats.record_play(lagu, playback_state.get('duration_seconds'))
+
+        # Update history
+        if playback_state.get('_previous_playing'):
+            playback_state['history'].push(playback_state['_previous_playing'])
+        playback_state['_previous_playing'] = lagu
+
+        print(f"Memutar: {lagu.judul} dari {path}")
+        return True
     else:
         # Don't show messagebox for autoplay failures, just print
-        print(f"File tidak ditemukan: {lagu.file_path}")
+        print(f"File tidak ditemukan: {path}")
         playback_state['is_playing'] = False  # Mark as not playing
         return False
 
 
+@traced("playback.stop")
 def stop_file(playback_state):
     """
-    Stop audio playback using pygame.
+    Stop audio playback through the audio engine.
     
     Args:
         playback_state: Dictionary containing playback state information
     """
     if playback_state.get('is_playing'):
-        pygame.mixer.music.stop()
+        _engine_for(playback_state).stop()
         playback_state['is_playing'] = False
+        if playback_state.get('stats'):
+            playback_state['stats'].record_stop()
         print("Pemutaran dihentikan.")
 
 
 def pause_file(playback_state):
     """
-    Pause audio playback using pygame.
+    Pause audio playback through the audio engine.
     
     Args:
         playback_state: Dictionary containing playback state information
     """
-    if playback_state.get('is_playing') and pygame.mixer.music.get_busy():
-        pygame.mixer.music.pause()
+    if playback_state.get('is_playing'):
+        _engine_for(playback_state).pause()
         playback_state['is_playing'] = False
+        if playback_state.get('stats'):
+            playback_state['stats'].record_pause()
         print("Pemutaran dijeda.")
 
 
 def resume_file(playback_state):
     """
-    Resume audio playback using pygame.
+    Resume audio playback through the audio engine.
     
     Args:
         playback_state: Dictionary containing playback state information
     """
     if not playback_state.get('is_playing') and playback_state.get('current_file_path'):
-        pygame.mixer.music.unpause()
+        _engine_for(playback_state).resume()
         playback_state['is_playing'] = True
+        if playback_state.get('stats'):
+            playback_state['stats'].record_resume()
         print("Pemutaran dilanjutkan.")
+
+
+def seek_file(playback_state, seconds):
+    """
+    Jump to an absolute position in the current song.
+
+    Args:
+        playback_state: Dictionary containing playback state information
+        seconds: Target position in seconds
+    """
+    if playback_state.get('current_file_path'):
+        _engine_for(playback_state).seek(seconds)
+
+
+def skip_file(playback_state, delta_seconds):
+    """
+    Jump forward or backward relative to the current position.
+
+    Args:
+        playback_state: Dictionary containing playback state information
+        delta_seconds: Seconds to move; negative values rewind
+    """
+    if playback_state.get('current_file_path'):
+        _engine_for(playback_state).skip(delta_seconds)
+
+
+def get_position(playback_state):
+    """
+    Return the playback position of the current song in seconds.
+
+    Args:
+        playback_state: Dictionary containing playback state information
+    """
+    if not playback_state.get('current_file_path'):
+        return 0.0
+    return _engine_for(playback_state).position.seconds()
+
+
+def set_crossfade(playback_state, seconds):
+    """
+    Configure the crossfade between consecutive songs.
+
+    Args:
+        playback_state: Dictionary containing playback state information
+        seconds: Fade length in seconds; 0 disables crossfading
+    """
+    playback_state['crossfade_seconds'] = seconds
+    _engine_for(playback_state).set_crossfade(seconds)
@@ -0,0 +1,155 @@
+"""
+Waveform Peaks for Music Player Application
+Extracts a small peak envelope per audio file in a background thread and
+stores it as a compact binary file in a cache directory, so the seek bar can
+draw a waveform without ever decoding audio on the UI thread.
+"""
+
+import collections
+import hashlib
+import os
+import queue
+import threading
+from array import array
+
+from instrumentation import traced
+
+WAVEFORM_DIR = "music_player_waveforms"
+PEAK_COUNT = 400  # one byte per column of the seek bar
+MEMORY_ITEMS = 64  # peak arrays kept in memory
+_MAGIC = b"WPK1"
+
+
+def cache_path(file_path, directory=WAVEFORM_DIR):
+    """
+    Cache file for an audio file. The name covers the path, size and mtime,
+    so a changed file gets new peaks; returns None if the file is missing.
+    """
+    try:
+        stat = os.stat(file_path)
+    except (OSError, TypeError):
+        return None
+    key = f"{os.path.normcase(os.path.abspath(file_path))}|{stat.st_size}|{stat.st_mtime_ns}"
+    return os.path.join(directory, hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest() + ".peaks")
+
+
+@traced("waveform.extract")
+def compute_peaks(file_path, count=PEAK_COUNT):
+    """
+    Decode a file and reduce it to `count` peak levels.
+
+    Returns:
+        array('B') of values 0-255, or None if the file cannot be decoded
+    """
+    from loudness import decode_samples
+
+    decoded = decode_samples(file_path)
+    if decoded is None:
+        return None
+    samples, offset, full_scale, _ = decoded
+    if not samples:
+        return None
+    bucket = max(1, -(-len(samples) // count))
+    peaks = array('B')
+    for start in range(0, len(samples), bucket):
+        frame = samples[start:start + bucket]
+        # max()/min() over an array slice run in C; no per-sample Python loop
+        peak = max(max(frame) - offset, offset - min(frame))
+        peaks.append(min(255, int(peak * 255 / full_scale)))
+    return peaks
+
+
+def read_peaks(path):
+    """Read a cached peak file (a few hundred bytes); None if absent or invalid."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:4] != _MAGIC:
+        return None
+    return array('B', data[4:])
+
+
+def write_peaks(path, peaks):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(peaks.tobytes())
+    os.replace(tmp_path, path)
+
+
+class WaveformWorker(threading.Thread):
+    """Background worker that extracts and caches peaks for imported or played songs."""
+
+    def __init__(self, directory=WAVEFORM_DIR, memory_items=MEMORY_ITEMS):
+        super().__init__(name="WaveformWorker", daemon=True)
+        self.directory = directory
+        self.memory_items = memory_items
+        self._pending = queue.Queue()
+        self._queued_paths = set()
+        self._memory = collections.OrderedDict()  # file path -> peaks
+        self._lock = threading.Lock()
+
+    def submit(self, lagu):
+        """Queue a song's file unless it is already queued or in memory."""
+        path = lagu.audio_path
+        if not path:
+            return
+        with self._lock:
+            if path in self._queued_paths or path in self._memory:
+                return
+            self._queued_paths.add(path)
+        self._pending.put(path)
+
+    def submit_many(self, songs):
+        for lagu in songs:
+            self.submit(lagu)
+
+    def peaks(self, file_path):
+        """
+        Return the peaks of a file if they are ready (memory, then the cache
+        file), else None. Never decodes audio; safe to call from the UI thread.
+        """
+        if not file_path:
+            return None
+        with self._lock:
+            peaks = self._memory.get(file_path)
+            if peaks is not None:
+                self._memory.move_to_end(file_path)
+                return peaks
+            if file_path in self._queued_paths:
+                return None  # still being extracted
+        path = cache_path(file_path, self.directory)
+        peaks = read_peaks(path) if path else None
+        if peaks is not None:
+            self._remember(file_path, peaks)
+        return peaks
+
+    def _remember(self, file_path, peaks):
+        with self._lock:
+            self._memory[file_path] = peaks
+            self._memory.move_to_end(file_path)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def run(self):
+        while True:
+            file_path = self._pending.get()
+            try:
+                path = cache_path(file_path, self.directory)
+                if path is None:
+                    continue
+                peaks = read_peaks(path)
+                if peaks is None:
+                    peaks = compute_peaks(file_path)
+                    if peaks is not None:
+                        write_peaks(path, peaks)
+                if peaks is not None:
+                    self._remember(file_path, peaks)
+            except Exception as e:
+                print(f"Error ekstraksi waveform {file_path}: {e}")
+            finally:
+                with self._lock:
+                    self._queued_paths.discard(file_path)